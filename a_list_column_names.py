@@ -21,7 +21,7 @@
 # The run_dict key should be the country or country and subdivision abbreviations (for example, "DK" or "DE/THU). The
 # item should be another dictionary. In this dictionary, you should include the following keys:
 #
-# "file_encoding" - Encoding of the original GSA file
+# "file_encoding" - Encoding of the original GSA file, or "auto" to detect it from the file
 # "file_year_encoding" - [optional] use if specific years deviate from that encoding
 # "ignore_file_descr" - [optional] use if there are other geospatial datasets in your folder that are not GSA data
 #
@@ -38,9 +38,10 @@ os.environ["GDAL_DRIVER_PATH"] = os.path.join(f'{os.sep}'.join(sys.executable.sp
 from os.path import dirname, abspath
 import time
 import pandas as pd
-import chardet
 
 from my_utils import helper_functions
+from my_utils import schema_probe
+from my_utils import encoding_detection
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -69,60 +70,15 @@ def print_ogr_drivers():
         print(i)
 
 def get_geodata_column_names(path, encoding="utf-8"):
-    import os
-    from osgeo import ogr
-
-    os.environ['SHAPE_ENCODING'] = encoding
-
+    """
+    Returns the column names and the values of the first feature of a geodata file. Only the metadata and the first
+    feature are read (see my_utils/schema_probe.py).
+    """
     print(f"Get column names of geodata file. {path}")
 
-    # print_ogr_drivers()
-
-    file_name, file_extension = os.path.splitext(path)
-
-    # if file_extension == ".geoparquet":
-    #
-    # else:
-    driver_dict = {
-        ".gdb": "OpenFileGDB",
-        ".geojson": "GeoJSON",
-        ".gpkg": "GPKG",
-        ".shp": "ESRI Shapefile",
-        ".gml": "GML",
-        ".geoparquet": "Parquet"
-    }
-
-    driver = ogr.GetDriverByName(driver_dict[str.lower(file_extension)])
-    ds = driver.Open(path, 0)
-    lyr = ds.GetLayer(0)
-    lyr_def = lyr.GetLayerDefn()
-
-    # Check if file has multiple layers
-    if ds.GetLayerCount() > 1:
-        print(f"Warning: File '{path}' contains {ds.GetLayerCount()} layers. Only the first layer will be processed.")
-
-    column_names = []
-    for i in range(lyr_def.GetFieldCount()):
-        column_names.append(lyr_def.GetFieldDefn(i).GetName())
-
-    # print(path, "\n", column_names)
+    result = schema_probe.probe_file(path, encoding)
 
-    feat = lyr.GetNextFeature()
-    attr_lst = []
-    for fname in column_names:
-        attr = feat.GetField(fname)
-        # if type(feat.GetField(fname)) == str:
-        #     if decoding:
-        #         attr = feat.GetField(fname).decode(decoding)
-        #     else:
-        #         attr = feat.GetField(fname)
-        # else:
-        #     attr = feat.GetField(fname)
-        attr_lst.append(attr)
-
-    ds = None
-
-    return column_names, attr_lst
+    return list(result["columns"]), list(result["examples"])
 
 
 def get_table_column_names(path, encoding, sep=","):
@@ -155,20 +111,19 @@ def list_column_names_of_iacs_data_in_dir(in_dir, out_pth, encoding=None, file_y
         iacs_files = [file for file in iacs_files if ignore_files_descr not in file]
 
 
-    # Get column names of IACS data and save in dict along with example values
+    ## Encoding of each file
+    encodings = {}
+    for p in iacs_files:
+        encodings[p] = encoding_detection.get_file_encoding(p, encoding, file_year_encoding)
+
+    # Get column names of IACS data and save in dict along with example values. All files are probed in parallel and
+    # files that did not change since the last run are taken from the cache.
+    probes = schema_probe.probe_files(iacs_files, encodings=encodings)
     res_dict = {}
     for p in iacs_files:
         year = helper_functions.get_year_from_path(p)
-        if file_year_encoding:
-            if year in file_year_encoding:
-                year_encoding = file_year_encoding[year]
-            else:
-                year_encoding = encoding
-        else:
-            year_encoding = encoding
-        column_names, attr_examples = get_geodata_column_names(p, year_encoding)
-        res_dict[f"{year}_col"] = column_names
-        res_dict[f"{year}_ex"] = attr_examples
+        res_dict[f"{year}_col"] = list(probes[p]["columns"])
+        res_dict[f"{year}_ex"] = list(probes[p]["examples"])
 
     ## Sort by years
     keys = list(res_dict.keys())
@@ -177,25 +132,12 @@ def list_column_names_of_iacs_data_in_dir(in_dir, out_pth, encoding=None, file_y
 
     ## Append lists that do not have the maximum length
     max_len = max(len(res_dict[x]) for x in res_dict)
-    enc_lst = []
     for key in res_dict:
-        ## get file_encoding of attributes
-        sub_enc_lst = []
-        for i in res_dict[key]:
-            if type(i) == str:
-                try:
-                    e = chardet.detect(i.encode())['file_encoding']
-                    sub_enc_lst.append(e)
-                except:
-                    continue
-        enc_lst += sub_enc_lst
-
         ## append lists
         if len(res_dict[key]) < max_len:
             add = max_len - len(res_dict[key])
             for i in range(add):
                 res_dict[key].append("")
-    # enc = helper_functions.most_common(enc_lst)
 
     ## Save to df and disc
     out_df = pd.DataFrame.from_dict(res_dict)
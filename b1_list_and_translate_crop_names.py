@@ -22,7 +22,7 @@
 
 # "region_id" - basically the main key (XX), but for XX/XXX changed into XX_XXX
 # "from_lang" - input for GoogleTranslator function to indicate which language needs to be translated
-# "file_encoding" - Encoding of the original GSA file
+# "file_encoding" - Encoding of the original GSA file, or "auto" to detect it from the file
 # "skip_list_crop_names" - [optional] use if the original GSA data do not contain crop names. Sometimes they come in separate tables
 # "crop_names_pth" - [optional] the path to the separate table with crop names (see line above).
 # "file_year_encoding" - [optional] use if specific years deviate from that encoding
@@ -50,23 +50,37 @@ import sys
 os.environ["GDAL_DRIVER_PATH"] = os.path.join(f'{os.sep}'.join(sys.executable.split(os.sep)[:-1]), 'Library', 'lib', 'gdalplugins')
 
 import time
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 from osgeo import ogr
 import glob
-from deep_translator import GoogleTranslator
-from deep_translator.exceptions import TranslationNotFound
 ## LingueeTranslator --> language specification is different. Words instead of abbreviations
 ## PonsTranslator
 # from translate import Translator
 
 from my_utils import helper_functions
+from my_utils import chunked_io
+from my_utils import translation_cache
+from my_utils import encoding_detection
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(abspath(__file__)))
 os.chdir(WD)
 
+## Number of features that are read at once when extracting the unique crop names
+CROP_BATCH_SIZE = 500_000
+
+## Translations are cached in data\tables\crop_names\translation_cache.sqlite. Use the backend "stub" to test the script
+## without internet access and set TRANSLATION_OFFLINE to True to use only translations that are already in the cache.
+TRANSLATION_BACKEND = "google"
+TRANSLATION_OFFLINE = False
+## Other backends: "mymemory", "microsoft", "deepl", "libre" (package translate, API key in the environment variable
+## TRANSLATION_API_KEY). The number of parallel requests and the rate limit are set in my_utils/translation_cache.py
+## (MAX_WORKERS, REQUESTS_PER_SECOND).
+
 # ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
 def list_crop_names(in_dir, region_id, col_translate_pth, out_pth):
     ## Get list of IACS files
@@ -80,7 +94,7 @@ def list_crop_names(in_dir, region_id, col_translate_pth, out_pth):
     for pth in iacs_files:
         year = helper_functions.get_year_from_path(pth)
         print(f"Processing: {year} - {pth}")
-        gdf = helper_functions.load_geodata_safe(pth)
+        gdf = geodata_reader.read_geodata(pth)
         col_year = f"{region_id}_{year}"
         col_dict = dict(zip(tr_df["column_name"], tr_df[col_year]))
         cols = [col_dict["crop_code"], col_dict["crop_name"]]
@@ -97,6 +111,67 @@ def list_crop_names(in_dir, region_id, col_translate_pth, out_pth):
     out_df.to_csv(out_pth, index=False)
 
 
+def get_crop_code_name_pairs(batch, code_cols, name_cols, multiple_crop_entries_sep=False):
+    """
+    Derives the unique crop code - crop name combinations of a batch of features. The combinations are the same as
+    when looping over the features: the codes and the names of all crop columns of a feature (split by
+    multiple_crop_entries_sep) are paired by their position. If a feature has more names than codes, the names are
+    listed with an empty code and vice versa.
+
+    :param batch: Arrow record batch with the crop columns.
+    :param code_cols: List of crop code columns (can be empty).
+    :param name_cols: List of crop name columns (can be empty).
+    :param multiple_crop_entries_sep: Separator of multiple crops in one entry or False.
+    :return: DataFrame with the unique combinations in the columns crop_code and crop_name.
+    """
+    num_rows = batch.num_rows
+
+    def get_entries(cols):
+        ## Long table of the entries of each feature: feature index and the position of the entry in the feature
+        if not cols:
+            return pd.DataFrame({"feat": np.arange(num_rows), "pos": 0,
+                                 "value": pd.Series(np.full(num_rows, "", dtype=object), dtype=object)})
+        parts = []
+        for col in cols:
+            values = pd.Series(batch.column(col).to_pylist(), dtype=object)
+            if multiple_crop_entries_sep:
+                ## Same as str(value).split(), i.e. missing values become "None"
+                values = values.map(str).str.split(multiple_crop_entries_sep).explode()
+            parts.append(pd.DataFrame({"feat": values.index.to_numpy(),
+                                       "value": pd.Series(values.to_numpy(), dtype=object)}))
+        entries = pd.concat(parts, ignore_index=True)
+        entries = entries.sort_values("feat", kind="stable")
+        entries["pos"] = entries.groupby("feat").cumcount()
+        return entries
+
+    codes = get_entries(code_cols)
+    names = get_entries(name_cols)
+
+    num_codes = np.bincount(codes["feat"], minlength=num_rows)
+    num_names = np.bincount(names["feat"], minlength=num_rows)
+
+    ## Same number of codes and names: pair them by position
+    same = num_codes == num_names
+    paired = pd.merge(codes.loc[same[codes["feat"]]], names.loc[same[names["feat"]]], on=["feat", "pos"],
+                      suffixes=("_code", "_name"))
+    code_values = [paired["value_code"].to_numpy(dtype=object)]
+    name_values = [paired["value_name"].to_numpy(dtype=object)]
+
+    ## More names than codes or more codes than names
+    more_names = names.loc[(num_names > num_codes)[names["feat"]], "value"].to_numpy(dtype=object)
+    code_values.append(np.full(len(more_names), "", dtype=object))
+    name_values.append(more_names)
+    more_codes = codes.loc[(num_codes > num_names)[codes["feat"]], "value"].to_numpy(dtype=object)
+    code_values.append(more_codes)
+    name_values.append(np.full(len(more_codes), "", dtype=object))
+
+    ## Object columns keep the values as they are read (e.g. integer codes and None for missing values)
+    pairs = pd.DataFrame({"crop_code": pd.Series(np.concatenate(code_values), dtype=object),
+                          "crop_name": pd.Series(np.concatenate(name_values), dtype=object)})
+
+    return pairs.drop_duplicates()
+
+
 def list_crop_names_ogr(in_dir, region_id, col_translate_pth, out_pth, encoding, ignore_files_descr=None,
                         file_year_encoding=None, multiple_crop_entries_sep=False):
     print("Derive list of unique crop names from IACS files.")
@@ -112,36 +187,18 @@ def list_crop_names_ogr(in_dir, region_id, col_translate_pth, out_pth, encoding,
     tr_df = pd.read_excel(col_translate_pth)
 
     ## Loop over files to derive crop names from all files
-    res_lst = []
+    res_lst = set()
     for path in iacs_files:
         year = helper_functions.get_year_from_path(path)
-        if file_year_encoding:
-            if year in file_year_encoding:
-                year_encoding = file_year_encoding[year]
-                os.environ['SHAPE_ENCODING'] = year_encoding
-            else:
-                os.environ['SHAPE_ENCODING'] = encoding
+        ## Without year specific encodings, the encoding of the file itself is used (e.g. from the .cpg file), unless
+        ## the encoding should be detected ("auto")
+        if file_year_encoding or str(encoding).lower() == "auto":
+            file_encoding = encoding_detection.get_file_encoding(path, encoding, file_year_encoding, year=year)
+        else:
+            file_encoding = None
 
         print(f"Processing: {year} - {path}")
 
-        ## Open file and layer
-        file_name, file_extension = os.path.splitext(path)
-        driver_dict = {
-            ".gdb": "OpenFileGDB",
-            ".geojson": "GeoJSON",
-            ".gpkg": "GPKG",
-            ".shp": "ESRI Shapefile",
-            ".geoparquet": "Parquet"
-        }
-        driver = ogr.GetDriverByName(driver_dict[file_extension])
-        ds = driver.Open(path, 0)
-        lyr = ds.GetLayer(0)
-
-        # Check if file has multiple layers
-        if ds.GetLayerCount() > 1:
-            print(
-                f"Warning: File '{path}' contains {ds.GetLayerCount()} layers. Only the first layer will be processed.")
-
         col_year = f"{region_id}_{year}"
         col_dict = dict(zip(tr_df["column_name"], tr_df[col_year]))
 
@@ -156,51 +213,17 @@ def list_crop_names_ogr(in_dir, region_id, col_translate_pth, out_pth, encoding,
             print(F"No crop name or crop type column in {path}. Skipping.")
             continue
 
-        ## Loop over features to derive crop names of current file
-        for feat in lyr:
-            names = []
-            codes = []
-            if type(col_dict["crop_code"]) != float:
-                for c_code in col_dict["crop_code"]:
-                    if multiple_crop_entries_sep:
-                        crop_codes = str(feat.GetField(c_code)).split(multiple_crop_entries_sep)
-                        codes += crop_codes
-                    else:
-                        crop_code = feat.GetField(c_code)
-                        codes.append(crop_code)
-            else:
-                crop_code = ""
-                codes.append(crop_code)
-            if type(col_dict["crop_name"]) != float:
-                for c_name in col_dict["crop_name"]:
-                    if multiple_crop_entries_sep:
-                        crop_names = str(feat.GetField(c_name)).split(multiple_crop_entries_sep)
-                        names += crop_names
-                    else:
-                        crop_name = feat.GetField(c_name)
-                        names.append(crop_name)
-            else:
-                crop_name = ""
-                names.append(crop_name)
-
-            if len(names) == len(codes):
-                for i, name in enumerate(names):
-                    # res_lst.append((codes[i], name, year))
-                    res_lst.append((codes[i], name))
-            elif len(names) > len(codes):
-                for i, name in enumerate(names):
-                    # res_lst.append(("", name, year))
-                    res_lst.append(("", name))
-            elif len(codes) > len(names):
-                for i, code in enumerate(codes):
-                    # res_lst.append((code, "", year))
-                    res_lst.append((code, ""))
-
-        lyr.ResetReading()
-        ds = None
+        code_cols = col_dict["crop_code"] if type(col_dict["crop_code"]) != float else []
+        name_cols = col_dict["crop_name"] if type(col_dict["crop_name"]) != float else []
+
+        ## Read only the crop columns (no geometries) in batches and keep the unique combinations of each batch
+        columns = list(dict.fromkeys(code_cols + name_cols))
+        for batch in chunked_io.iter_attribute_batches(path, columns, CROP_BATCH_SIZE, encoding=file_encoding):
+            pairs = get_crop_code_name_pairs(batch, code_cols, name_cols, multiple_crop_entries_sep)
+            res_lst.update(zip(pairs["crop_code"], pairs["crop_name"]))
 
     ## Get unique crop code-crop name combinations
-    res_lst = list(set(res_lst))
+    res_lst = list(res_lst)
 
     ## Turn into df and save to file
     # out_df = pd.DataFrame(res_lst, columns=["crop_code", "crop_name", "year"])
@@ -253,16 +276,28 @@ def safe_translate(text, source_lang, target_lang):
     """
     Translates text with error handling for missing translations.
     """
-    if not text or pd.isna(text):
-        return None
-    try:
-        translator = GoogleTranslator(source=source_lang, target=target_lang)
-        return translator.translate(text)
-    except TranslationNotFound:
-        return None
-    except Exception as e:
-        print(f"Warning: Could not translate '{text}'. Error: {e}")
-        return None
+    return translate_values([text], source_lang, target_lang)[0]
+
+
+def translate_values(values, source_lang, target_lang):
+    """
+    Translates all values at once. Each unique value is only translated once and translations of earlier runs are
+    taken from the translation cache (see my_utils/translation_cache.py). Missing values and failed translations
+    become None.
+    """
+    return translation_cache.translate_texts(values, source_lang, target_lang, backend=TRANSLATION_BACKEND,
+                                             offline=TRANSLATION_OFFLINE)
+
+
+def translate_values_multi(values, source_lang, target_langs):
+    """
+    Translates all values into several languages at once. The requests for all languages are sent concurrently
+    (see translation_cache.translate_texts_multi).
+
+    :return: Dictionary target language -> list of translations.
+    """
+    return translation_cache.translate_texts_multi(values, source_lang, target_langs, backend=TRANSLATION_BACKEND,
+                                                   offline=TRANSLATION_OFFLINE)
 
 
 def match_crop_names_with_eurocrops_classification(crop_names_pth, eurocrops_cl_pth, from_lang, out_pth):
@@ -283,16 +318,9 @@ def match_crop_names_with_eurocrops_classification(crop_names_pth, eurocrops_cl_
     # translator_de = Translator(provider="mymemory", to_lang="de", from_lang=from_lang)
     # df_cnames["crop_name_en"] = df_cnames["crop_name"].apply(translator_en.translate)
     # df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(translator_de.translate)
-    df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(
-        safe_translate,
-        source_lang=from_lang,
-        target_lang='de'
-    )
-    df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(
-        safe_translate,
-        source_lang=from_lang,
-        target_lang='en'
-    )
+    translations = translate_values_multi(df_cnames["crop_name"], from_lang, ["de", "en"])
+    df_cnames["crop_name_de"] = translations["de"]
+    df_cnames["crop_name_en"] = translations["en"]
 
     ## Rename columns in EuroCrops classification
     col_dict = {
@@ -318,16 +346,9 @@ def match_crop_names_with_eurocrops_classification(crop_names_pth, eurocrops_cl_
         df_match = pd.merge(df_cnames[cn_cols], df_eucr[ec_cols + ["original_code"]], how="outer", left_on="crop_code", right_on="original_code")
         df_match.sort_values(by="crop_code", inplace=True)
         df_match.loc[df_match["crop_name"].isna(), "crop_name"] = ""
-        df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(
-            safe_translate,
-            source_lang=from_lang,
-            target_lang='de'
-        )
-        df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(
-            safe_translate,
-            source_lang=from_lang,
-            target_lang='en'
-        )
+        translations = translate_values_multi(df_match["crop_name"], from_lang, ["de", "en"])
+        df_match["crop_name_de"] = translations["de"]
+        df_match["crop_name_en"] = translations["en"]
         df_match = df_match[["crop_code", "crop_name", "crop_name_de", "crop_name_en", "EC_trans_n", "EC_hcat_n", "EC_hcat_c"]]
     else:
         df_match = pd.merge(df_cnames, df_eucr[ec_cols], how="outer", on="crop_name")
@@ -355,16 +376,9 @@ def translate_crop_names(crop_names_pth, from_lang, country_code, out_pth):
     #     source_lang=from_lang,
     #     target_lang='de'
     # )
-    df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(
-        safe_translate,
-        source_lang=from_lang,
-        target_lang='en'
-    )
-    df_cnames["crop_name_de"] = df_cnames["crop_name"].apply(
-        safe_translate,
-        source_lang=from_lang,
-        target_lang='dk'
-    )
+    translations = translate_values_multi(df_cnames["crop_name"], from_lang, ["en", "de"])
+    df_cnames["crop_name_en"] = translations["en"]
+    df_cnames["crop_name_de"] = translations["de"]
     ## Merge tables
     df_cnames.sort_values(by="crop_name", inplace=True)
     df_cnames["EC_trans_n"] = ""
@@ -888,6 +902,8 @@ def main():
                 country_code=region_id,
                 out_pth = os.path.join("data", "tables", "crop_names", f"{region_id}_crop_names_w_translation.xlsx"))
 
+    translation_cache.print_translation_stats()
+
     etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
     print("end: " + etime)
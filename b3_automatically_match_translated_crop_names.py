@@ -33,10 +33,12 @@ import os
 from os.path import dirname, abspath
 import time
 import pandas as pd
-import glob
 import jaro
 from typing import Literal, get_args
 
+from my_utils import fuzzy_matcher
+from my_utils import crop_corpus
+
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(abspath(__file__)))
@@ -48,6 +50,11 @@ COL_NAMES_FOLDER = os.path.join("data", "tables", "column_names")
 CROP_NAMES_FOLDER = os.path.join("data", "tables", "crop_names")
 CROP_CLASSIFICATION_FOLDER = os.path.join("data", "tables", "crop_classifications")
 
+## Number of matching candidates per crop name in the output (best match and alternatives) and number of processes
+## for the matching
+TOP_K = 3
+N_WORKERS = 1
+
 # ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
 
 def find_string_with_highest_jaro_winkler(str1, str_lst):
@@ -66,6 +73,25 @@ def find_string_with_highest_jaro_winkler(str1, str_lst):
     return best_match
 
 
+def find_best_matches(values, str_lst, k=TOP_K):
+    """
+    Finds the strings of str_lst (a list or a prebuilt fuzzy_matcher.TrigramMatcher) with the highest Jaro-Winkler
+    similarity for all values. The best match is the same as find_string_with_highest_jaro_winkler, but candidates are
+    preselected with a trigram index (see my_utils/fuzzy_matcher.py).
+
+    :return: DataFrame indexed by the unique values with the columns best_match, match_score and other_matches
+    (the next k-1 candidates with their scores).
+    """
+    matches = fuzzy_matcher.match_names(values, str_lst, k=k, n_workers=N_WORKERS)
+    matches["label"] = matches["match"] + " (" + matches["score"].round(3).astype(str) + ")"
+
+    best = matches.loc[matches["rank"] == 1].set_index("query")
+    others = matches.loc[matches["rank"] > 1].groupby("query", sort=False)["label"].agg("; ".join)
+
+    return pd.DataFrame({"best_match": best["match"], "match_score": best["score"],
+                         "other_matches": others.reindex(best.index).fillna("")})
+
+
 def find_best_matching_ec_crop_code_with_jaro(df_pth, crop_class_folder, out_pth):
 
     ## Read tabel with unclassified crops
@@ -80,31 +106,15 @@ def find_best_matching_ec_crop_code_with_jaro(df_pth, crop_class_folder, out_pth
     df["crop_name_en"] = df["crop_name_en"].str.lower()
     # df["crop_name_de"] = df["crop_name_de"].str.lower()
 
-    ## Read existing crop classification, but not use EL because it has too many unuseful names in it
-    df_lst = glob.glob(os.path.join(crop_class_folder, "*.xlsx"))
-    df_lst = [pth for pth in df_lst if "EL_crop" not in pth]
-    df_lst = [pd.read_excel(pth) for pth in df_lst]
-
-    ## Concatenate them to one df
-    sub_cols = ["crop_code", "crop_name", "crop_name_de", "crop_name_en", "EC_trans_n", "EC_hcat_n", "EC_hcat_c"]
-    df_lst = [df[sub_cols] for df in df_lst]
-    df_class = pd.concat(df_lst)
-
-    ## Drop NAs and duplicates
-    df_class = df_class.loc[df_class["crop_name_en"].notna()].copy()
-    # df_class = df_class.loc[df_class["crop_name_de"].notna()].copy()
-    df_class.drop_duplicates(inplace=True)
-
-    ## crop translations to lower, because this might affect the jaro-winkler metric matching
-    df_class["crop_name_en"] = df_class["crop_name_en"].str.lower()
-    # df_class["crop_name_de"] = df_class["crop_name_de"].str.lower()
-
-    ## Extract crop translations of existing classifications to list. Will be used for matching. Do it for GER and EN
-    crop_names_en = df_class["crop_name_en"].tolist()
-    # crop_names_de = df_class["crop_name_en"].tolist()
+    ## Existing crop classifications as matching candidates (without EL, because it has too many unuseful names in
+    ## it). The classifications and the search index are compiled once and only updated for changed files.
+    df_class, matcher_en = crop_corpus.get_matcher("crop_name_en", crop_class_folder=crop_class_folder)
 
     ## Find the best matches
-    df["best_match_en"] = df["crop_name_en"].apply(find_string_with_highest_jaro_winkler, str_lst=crop_names_en)
+    matches = find_best_matches(df["crop_name_en"], matcher_en)
+    df["best_match_en"] = df["crop_name_en"].map(matches["best_match"])
+    df["match_score"] = df["crop_name_en"].map(matches["match_score"])
+    df["other_matches"] = df["crop_name_en"].map(matches["other_matches"])
     # df["best_match_de"] = df["crop_name_de"].apply(find_string_with_highest_jaro_winkler, str_lst=crop_names_de)
 
     ## Merge the matches with the EC classification from existing classifications EN
@@ -113,7 +123,8 @@ def find_best_matching_ec_crop_code_with_jaro(df_pth, crop_class_folder, out_pth
     df_class_en.drop_duplicates(subset=["crop_name_en"], inplace=True)
     df_class_en.rename(columns={"crop_name_en": "best_match_en"}, inplace=True)
 
-    sub_cols2_en = ["crop_code", "crop_name", "crop_name_de", "crop_name_en", "best_match_en"]
+    sub_cols2_en = ["crop_code", "crop_name", "crop_name_de", "crop_name_en", "best_match_en", "match_score",
+                    "other_matches"]
     df_out_en = pd.merge(df[sub_cols2_en], df_class_en, on="best_match_en")
     df_out_en.drop_duplicates(inplace=True)
     df_out_en["match_on"] = "en"
@@ -161,7 +172,10 @@ def find_best_matching_ec_crop_code_with_jaro_two_dfs(df_pth1, df_pth2, match_co
     crop_names = df_class[match_col].tolist()
 
     ## Find the best matches
-    df["best_match"] = df[match_col].apply(find_string_with_highest_jaro_winkler, str_lst=crop_names)
+    matches = find_best_matches(df[match_col], crop_names)
+    df["best_match"] = df[match_col].map(matches["best_match"])
+    df["match_score"] = df[match_col].map(matches["match_score"])
+    df["other_matches"] = df[match_col].map(matches["other_matches"])
 
     ## Merge the matches with the EC classification from existing classifications EN
     ## Make sure the names are uniform for GER df and EN df
@@ -169,7 +183,8 @@ def find_best_matching_ec_crop_code_with_jaro_two_dfs(df_pth1, df_pth2, match_co
     df_class_en.drop_duplicates(subset=[match_col], inplace=True)
     df_class_en.rename(columns={match_col: "best_match"}, inplace=True)
 
-    sub_cols2_en = ["crop_code", "crop_name", "crop_name_de", "crop_name_en", "best_match"]
+    sub_cols2_en = ["crop_code", "crop_name", "crop_name_de", "crop_name_en", "best_match", "match_score",
+                    "other_matches"]
     df_out_en = pd.merge(df[sub_cols2_en], df_class_en, on="best_match")
     df_out_en.drop_duplicates(inplace=True)
 
@@ -8,7 +8,6 @@ from os.path import dirname, abspath
 os.environ['PYDEVD_USE_CYTHON'] = 'NO'
 import time
 import pandas as pd
-import geopandas as gpd
 import numpy as np
 
 import sys
@@ -16,6 +15,13 @@ script_dir = abspath(__file__)
 project_root = dirname(script_dir)
 sys.path.append(project_root)
 from my_utils import helper_functions
+from my_utils import region_tables
+from my_utils import encoding_detection
+from my_utils import geodata_reader
+from my_utils import stage_columns
+from my_utils import gsa_cleaning
+from my_utils import run_metrics
+from my_utils import profiling
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -24,7 +30,6 @@ os.chdir(WD)
 
 COL_NAMES_FOLDER = os.path.join("data", "tables", "column_names")
 CROP_CLASSIFICATION_FOLDER = os.path.join("data", "tables", "crop_classifications")
-_TRANSLATION_CACHE = {}
 
 # ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
 def truncate_coord(value, p):
@@ -32,11 +37,7 @@ def truncate_coord(value, p):
     factor = 10 ** p
     return np.floor(value * factor) / factor
 
-def get_translation_df(col_translate_pth):
-    if col_translate_pth not in _TRANSLATION_CACHE:
-        _TRANSLATION_CACHE[col_translate_pth] = pd.read_excel(col_translate_pth, engine="openpyxl")
-    return _TRANSLATION_CACHE[col_translate_pth]
-
+@run_metrics.track_run("b4_check_unique_ids")
 def check_uniqueness_of_field_ids_duplicates_and_non_geometries(iacs_pth, file_encoding, col_translate_pth, region_id, year, csv_sep=","):
     """
       Validates data integrity by checking for unique field IDs, removing invalid
@@ -83,76 +84,35 @@ def check_uniqueness_of_field_ids_duplicates_and_non_geometries(iacs_pth, file_e
     ## Open files
     print("Reading GSA data:")
 
-    if ext in ['.gpkg', '.gdb', '.shp', '.geojson']:
-        iacs = helper_functions.load_geodata_safe(iacs_pth, encoding=file_encoding)
-    elif ext in ['.geoparquet']:
-        iacs = gpd.read_parquet(iacs_pth)
-    elif ext in ['.csv']:
-        iacs = pd.read_csv(iacs_pth, sep=csv_sep)
     print("Reading Translation table.")
-    tr_df_orig = pd.read_csv(col_translate_pth) #get_translation_df(col_translate_pth)
+    ## The translation table of the region is only read once per process (see region_tables.get_resolver)
+    resolver = region_tables.get_resolver(col_translate_pth, region_id)
+
+    ## Only the field ID column and the geometries are read
+    columns = stage_columns.get_raw_stage_columns("b4_check_unique_ids", iacs_pth, resolver, year,
+                                                  encoding=file_encoding, csv_sep=csv_sep)
+    iacs = geodata_reader.read_geodata(iacs_pth, columns=columns, encoding=file_encoding, csv_sep=csv_sep)
 
     nrows_in = len(iacs)
     for col in iacs.columns:
         n_unique_col = len(iacs[col].unique())
         print("Num. input features:", nrows_in, f"Num. unique values {col}:", n_unique_col)
 
-    ## Optional: Subset the columns that should be in the final file
     print("Unifying column names.")
-    tr_df = tr_df_orig.loc[tr_df_orig["prelim"] == 1].copy()
-    del tr_df_orig
 
     ## Create a dictionary that renames the original assumed unique ID to "field_id"
-    col_year = f"{region_id}_{year}"
-    col_dict = dict(zip(tr_df.loc[tr_df[col_year].notna(), col_year], tr_df.loc[tr_df[col_year].notna(), "column_name"]))
-    col_dict = {k: v for k, v in col_dict.items() if v == "field_id"}
+    col_dict = resolver.get_field_id_translation(year)
 
     ## Create a reversed dictionary to be able to retrieve original field_id name
     col_dict_rev = {v: k for k, v in col_dict.items()}
     iacs.rename(columns=col_dict, inplace=True)
 
-    ## Remove duplicate geometries and non geometries
-    if "field_id" in iacs.columns:
-        unique_fids_in = len(iacs["field_id"].unique())
-    iacs = helper_functions.drop_non_geometries(iacs)
-    nrows_non_geom_clean= len(iacs)
-    iacs = helper_functions.remove_geometry_duplicates(iacs)
-    nrows_dup_geom_clean = len(iacs)
-
-    out_txt_pth = os.path.join("data", "vector", "IACS", "countries_with_non-unique_field_ids.txt")
-
-    if "field_id" not in col_dict.values():
-        print("No 'field_id' provided.")
-
-        ## Get modification date of input data
-        mod_date = os.path.getmtime(iacs_pth)
-        pretty_date = time.strftime("%d %b %Y %H:%M:%S", time.localtime(mod_date))
-        txt = (f"{region_id}\n{pretty_date} - {iacs_pth}\n\t"
-               f"No field ID in original file.\n\t"
-               f"Number of input features: {nrows_in}\n\t"
-               f"Number of features after dropping non-geometries: {nrows_non_geom_clean}\n\t"
-               f"Number of features after dropping duplicate geometries: {nrows_dup_geom_clean}\n\t")
-        with open(out_txt_pth, "a") as file:
-            file.write(txt)
-
-    else:
-
-        unique_fids_clean = len(iacs["field_id"].unique())
-        with open(out_txt_pth, "a") as file:
-            ## Get modification date of input data
-            mod_date = os.path.getmtime(iacs_pth)
-            pretty_date = time.strftime("%d %b %Y %H:%M:%S", time.localtime(mod_date))
-            txt = (f"{region_id}\n{pretty_date} - {iacs_pth}\n\t"
-                   f"Number of input features: {nrows_in}\n\t"
-                   f"Number of input unique IDs: {unique_fids_in}\n\t"
-                   f"Number of features after dropping non-geometries: {nrows_non_geom_clean}\n\t"
-                   f"Number of features after dropping duplicate geometries: {nrows_dup_geom_clean}\n\t"
-                   f"Number of unique IDs after cleaning: {unique_fids_clean}\n\t"
-                   f"Field ID column: {col_dict_rev['field_id']}\n\n")
-            file.write(txt)
+    ## Remove duplicate geometries and non geometries and write the counts to the report
+    field_id_col = "field_id" if "field_id" in col_dict.values() else None
+    iacs, stats = gsa_cleaning.clean_gsa_data(iacs, field_id_col)
+    gsa_cleaning.write_uniqueness_report(stats, iacs_pth, region_id, col_dict_rev.get("field_id"))
 
     del iacs
-    del tr_df
 
 
 def main():
@@ -160,6 +120,9 @@ def main():
     print("start: " + stime)
     os.chdir(WD)
 
+    ## Start the script with --profile (or set IACS_PROFILE=1) to print and save the time spent in each step
+    profiling.enable_from_args()
+
     ## Input for uniquenss check
 
     ## To turn off/on the check for a specific country, just comment/uncomment the specific line
@@ -303,14 +266,10 @@ def main():
             if "col_transl_descr_overwrite" in run_dict[country_code]:
                 region_id = run_dict[country_code]["col_transl_descr_overwrite"]
 
-            ## If a file encoding dictionary for specific years is provided, fetch the current version here
-            if file_year_encoding:
-                if year in file_year_encoding:
-                    file_encoding = file_year_encoding[year]
-                else:
-                    file_encoding = run_dict[country_code]["file_encoding"]
-            else:
-                file_encoding = run_dict[country_code]["file_encoding"]
+            ## If a file encoding dictionary for specific years is provided, fetch the current version here. With
+            ## "auto", the encoding is detected from the file (see my_utils/encoding_detection.py).
+            file_encoding = encoding_detection.get_file_encoding(
+                iacs_pth, run_dict[country_code]["file_encoding"], file_year_encoding, year=year)
 
             check_uniqueness_of_field_ids_duplicates_and_non_geometries(
                 iacs_pth=iacs_pth,
@@ -321,6 +280,8 @@ def main():
             )
 
 
+    geodata_reader.print_read_timings()
+
     etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
     print("end: " + etime)
@@ -7,10 +7,16 @@ from os.path import dirname, abspath
 # os.environ['GDAL_DATA'] = os.path.join(f'{os.sep}'.join(sys.executable.split(os.sep)[:-1]), 'Library', 'share', 'gdal')
 import time
 import pandas as pd
-import geopandas as gpd
 import numpy as np
 
 from my_utils import helper_functions
+from my_utils import region_tables
+from my_utils import encoding_detection
+from my_utils import geodata_reader
+from my_utils import geometry_repair
+from my_utils import gsa_cleaning
+from my_utils import run_metrics
+from my_utils import profiling
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -19,7 +25,6 @@ os.chdir(WD)
 
 COL_NAMES_FOLDER = os.path.join("data", "tables", "column_names")
 CROP_CLASSIFICATION_FOLDER = os.path.join("data", "tables", "crop_classifications")
-_TRANSLATION_CACHE = {}
 
 # ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
 def truncate_coord(value, p):
@@ -27,12 +32,7 @@ def truncate_coord(value, p):
     factor = 10 ** p
     return np.floor(value * factor) / factor
 
-def get_translation_df(col_translate_pth):
-    if col_translate_pth not in _TRANSLATION_CACHE:
-        _TRANSLATION_CACHE[col_translate_pth] = pd.read_excel(col_translate_pth, engine="openpyxl")
-    return _TRANSLATION_CACHE[col_translate_pth]
-
-
+@run_metrics.track_run("b5_create_unique_ids")
 def remove_duplicates_and_non_geometries_and_correct_unique_fid(iacs_pth, file_encoding, col_translate_pth, region_id, year, out_pth):
     """
        Cleans spatial data by removing geometry errors and ensuring every record
@@ -73,67 +73,49 @@ def remove_duplicates_and_non_geometries_and_correct_unique_fid(iacs_pth, file_e
        """
 
     root, ext = os.path.splitext(iacs_pth)
-    print(f"Remove non geometries and duplicate geometries, make the field ID unique if necessary.")
+    print("Remove non geometries and duplicate geometries, make the field ID unique if necessary.")
 
     ## Open files
     print("Reading GSA data:")
 
-    if ext in ['.gpkg', '.gdb', '.shp', '.geojson']:
-        iacs = helper_functions.load_geodata_safe(iacs_pth, encoding=file_encoding)
-    elif ext in ['.geoparquet']:
-        iacs = gpd.read_parquet(iacs_pth)
+    if ext in geodata_reader.OGR_EXTENSIONS + ['.geoparquet']:
+        iacs = geodata_reader.read_geodata(iacs_pth, encoding=file_encoding)
     else:
         print("No geodata provided.")
         return
 
     print("Reading Translation table.")
-    # tr_df_orig = get_translation_df(col_translate_pth)
-    tr_df_orig = pd.read_csv(col_translate_pth)
+    ## The translation table of the region is only read once per process (see region_tables.get_resolver)
+    resolver = region_tables.get_resolver(col_translate_pth, region_id)
 
     nrows_in = len(iacs)
     print("Number of input features:", nrows_in)
 
-    ## Optional: Subset the columns that should be in the final file
     print("Unifying column names.")
-    tr_df = tr_df_orig.loc[tr_df_orig["prelim"] == 1].copy()
 
     ## Create a dictionary that renames the original assumed unique ID to "field_id"
-    col_year = f"{region_id}_{year}"
-    col_dict = dict(zip(tr_df.loc[tr_df[col_year].notna(), col_year], tr_df.loc[tr_df[col_year].notna(), "column_name"]))
-    col_dict = {k: v for k, v in col_dict.items() if v == "field_id"}
+    col_dict = resolver.get_field_id_translation(year)
 
     ## Create a reversed dictionary to be able to retrieve original field_id name
     col_dict_rev = {v: k for k, v in col_dict.items()}
 
     ## Remove duplicate geometries and non geometries
-    iacs = helper_functions.drop_non_geometries(iacs)
-    iacs = helper_functions.remove_geometry_duplicates(iacs)
-    nrows_dup_geom_clean = len(iacs)
+    field_id_col = col_dict_rev.get("field_id")
+    iacs, stats = gsa_cleaning.clean_gsa_data(iacs, field_id_col)
 
-    if "field_id" not in col_dict.values():
-        print("No 'field_id' provided.")
+    ## Create field IDs or make them unique
+    iacs, unique_id_col = gsa_cleaning.add_unique_field_ids(iacs, field_id_col)
 
-        iacs["EL_field_id"] = helper_functions.create_unique_field_ids(iacs.geometry)
-        print(f"Final number of features: {len(iacs)}, and unique IDs: {len(iacs["EL_field_id"].unique())}")
-    else:
-
-        field_id_col = col_dict_rev["field_id"]
-        unique_fids_clean = len(iacs[field_id_col].unique())
-
-        if nrows_dup_geom_clean != unique_fids_clean:
-            iacs["uni_id"] = helper_functions.make_id_unique_by_adding_cumcount(iacs[field_id_col])
-            print(f"Final number of features: {len(iacs)}, and unique IDs: {len(iacs["uni_id"].unique())}")
-        else:
-            print(f"Final number of features: {len(iacs)}, and unique IDs: {len(iacs[field_id_col].unique())}")
-
-    iacs['geometry'] = iacs['geometry'].buffer(0)
-    iacs['geometry'] = iacs.normalize()
+    ## Repair only the invalid geometries and normalize all of them
+    iacs['geometry'] = geometry_repair.repair_geometries(iacs['geometry'])
 
+    run_metrics.add_counts(nrows_out=len(iacs))
     root, ext = os.path.splitext(out_pth)
-    if ext in ['.gpkg', '.gdb', '.shp', '.geojson']:
-        iacs.to_file(out_pth, encoding=file_encoding)
-    elif ext in ['.geoparquet']:
-        iacs.to_parquet(out_pth)
+    with profiling.step("write"):
+        if ext in ['.gpkg', '.gdb', '.shp', '.geojson']:
+            iacs.to_file(out_pth, encoding=file_encoding)
+        elif ext in ['.geoparquet']:
+            iacs.to_parquet(out_pth)
 
     del iacs
 
@@ -143,6 +125,9 @@ def main():
     print("start: " + stime)
     os.chdir(WD)
 
+    ## Start the script with --profile (or set IACS_PROFILE=1) to print and save the time spent in each step
+    profiling.enable_from_args()
+
     ## Input for uniquenss check
 
     ## To turn off/on the check for a specific country, just comment/uncomment the specific line
@@ -293,14 +278,10 @@ def main():
             if "col_transl_descr_overwrite" in run_dict[country_code]:
                 region_id = run_dict[country_code]["col_transl_descr_overwrite"]
 
-            ## If a file encoding dictionary for specific years is provided, fetch the current version here
-            if file_year_encoding:
-                if year in file_year_encoding:
-                    file_encoding = file_year_encoding[year]
-                else:
-                    file_encoding = run_dict[country_code]["file_encoding"]
-            else:
-                file_encoding = run_dict[country_code]["file_encoding"]
+            ## If a file encoding dictionary for specific years is provided, fetch the current version here. With
+            ## "auto", the encoding is detected from the file (see my_utils/encoding_detection.py).
+            file_encoding = encoding_detection.get_file_encoding(
+                iacs_pth, run_dict[country_code]["file_encoding"], file_year_encoding, year=year)
 
             remove_duplicates_and_non_geometries_and_correct_unique_fid(
                 iacs_pth=iacs_pth,
@@ -312,6 +293,8 @@ def main():
             )
 
 
+    geodata_reader.print_read_timings()
+
     etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
     print("end: " + etime)
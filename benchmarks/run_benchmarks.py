@@ -0,0 +1,277 @@
+# Benchmarks of the processing steps on synthetic GSA data (see benchmarks/synthetic_data.py), so that optimizations
+# can be measured without the restricted original data.
+
+# For each scale (number of parcels), a synthetic GSA file is written as geoparquet, GPKG and Latin-1 shapefile
+# together with a matching column name translation table and crop classification table. Then each benchmark is run
+# REPEATS times and the minimum and median times are saved as JSON to data\benchmarks\results\. If a baseline exists
+# (data\benchmarks\baseline.json, create it with --save-baseline), the results are compared to it.
+
+# Usage (from the repository folder):
+# python -m benchmarks.run_benchmarks --scales 1000 100000 --repeats 3
+# python -m benchmarks.run_benchmarks --only remove_geometry_duplicates create_unique_field_ids --save-baseline
+
+# ------------------------------------------ LOAD PACKAGES ---------------------------------------------------#
+import os
+from os.path import dirname, abspath
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import subprocess
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+import pyarrow as pa
+import pyogrio
+
+script_dir = abspath(__file__)
+project_root = dirname(dirname(script_dir))
+sys.path.append(project_root)
+from my_utils import helper_functions
+from my_utils import geometry_repair
+from my_utils import geoparquet_writer
+from my_utils import geodata_reader
+from my_utils import region_tables
+from my_utils import validity_check
+from my_utils import run_metrics
+from benchmarks import synthetic_data
+import b5_create_unique_ids
+import c3_classify_crops_and_unify_column_names as c3
+
+# ------------------------------------------ USER VARIABLES ------------------------------------------------#
+# Get parent directory of the repository, like the scripts
+WD = dirname(project_root)
+os.chdir(WD)
+
+BENCHMARK_FOLDER = os.path.join("data", "benchmarks")
+BASELINE_PTH = os.path.join(BENCHMARK_FOLDER, "baseline.json")
+
+## Number of parcels of the synthetic files. Scales up to 20_000_000 are possible, but need a lot of memory and time
+## for the generation (the files are generated once per scale and seed and reused afterwards).
+SCALES = [1_000, 100_000]
+REPEATS = 3
+## Runs before the timed runs, so that caches (e.g. the compiled lookup tables, imports) do not count
+WARMUP = 1
+SEED = 0
+REGION_ID = "XX"
+YEAR = 2021
+
+## A benchmark is reported as slower or faster if its median time differs by more than this factor from the baseline
+REGRESSION_THRESHOLD = 1.2
+
+# ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
+def prepare_data(n, regenerate=False):
+    """
+    Writes the synthetic files of a scale (if they do not exist yet) and prepares the in-memory inputs of the
+    benchmarks: the raw parcels, the cleaned parcels, the renamed parcels and the classification table.
+    """
+    folder = os.path.join(BENCHMARK_FOLDER, "data", f"n{n}_seed{SEED}")
+    paths = {fmt: os.path.join(folder, f"GSA_{REGION_ID}_{YEAR}.{fmt}") for fmt in ["geoparquet", "gpkg", "shp"]}
+    paths["col_translate_pth"] = os.path.join(folder, f"{REGION_ID}_column_name_translation.csv")
+    paths["crop_class_pth"] = os.path.join(folder, f"{REGION_ID}_crop_classification_final.csv")
+
+    if regenerate or not all(os.path.exists(pth) for pth in paths.values()):
+        print(f"Generating {n} synthetic parcels in {folder}.")
+        paths = synthetic_data.write_synthetic_dataset(folder, n, region_id=REGION_ID, year=YEAR, seed=SEED)
+
+    gdf = gpd.read_parquet(paths["geoparquet"])
+    clean = gdf.loc[gdf.geometry.notna()].copy()
+    resolver = region_tables.get_resolver(paths["col_translate_pth"], REGION_ID, paths["crop_class_pth"])
+    tr_df, col_dict = resolver.get_column_translation(str(YEAR))
+    renamed = clean.rename(columns=col_dict)
+
+    return {"n": n, "folder": folder, "paths": paths, "gdf": gdf, "clean": clean, "renamed": renamed,
+            "tr_df": tr_df, "cl_df": resolver.get_crop_classification()}
+
+
+def _harmonize_in_memory(data):
+    iacs = c3.classify_crops(data["renamed"].copy(), data["cl_df"].copy(), "automatic")
+    iacs, check = c3.finalize_harmonized_columns(iacs, data["tr_df"], ".geoparquet")
+    return iacs.to_crs(3035)
+
+
+def _get_crop_pairs(data):
+    ## b1 needs GDAL (osgeo), so it is only imported if this benchmark is run
+    import b1_list_and_translate_crop_names as b1
+
+    batch = pa.Table.from_pandas(data["gdf"][["KULTURCODE", synthetic_data.MULTI_CROP_COLUMN]])
+    return b1.get_crop_code_name_pairs(batch, ["KULTURCODE"], [synthetic_data.MULTI_CROP_COLUMN], "|")
+
+
+def _out_pth(data, name):
+    return os.path.join(data["folder"], "out", name)
+
+
+## Benchmarks: name -> function of the prepared data. The functions should only do the work that is measured.
+BENCHMARKS = {
+    "drop_non_geometries": lambda d: helper_functions.drop_non_geometries(d["gdf"]),
+    "remove_geometry_duplicates": lambda d: helper_functions.remove_geometry_duplicates(d["clean"]),
+    "create_unique_field_ids": lambda d: helper_functions.create_unique_field_ids(d["clean"].geometry),
+    "make_id_unique_by_adding_cumcount": lambda d: helper_functions.make_id_unique_by_adding_cumcount(
+        d["gdf"]["FLIK"]),
+    "repair_geometries": lambda d: geometry_repair.repair_geometries(d["clean"].geometry),
+    "classify_crops": lambda d: c3.classify_crops(d["renamed"].copy(), d["cl_df"].copy(), "automatic"),
+    "to_crs_3035": lambda d: d["clean"].to_crs(3035),
+    "write_geoparquet": lambda d: geoparquet_writer.write_geoparquet(
+        d["harmonized"], _out_pth(d, "harmonized.geoparquet"), **c3.GEOPARQUET_OPTIONS),
+    "read_geoparquet": lambda d: geodata_reader.read_geodata(d["paths"]["geoparquet"]),
+    "read_gpkg": lambda d: geodata_reader.read_geodata(d["paths"]["gpkg"], encoding="utf-8"),
+    "read_shp_latin1": lambda d: geodata_reader.read_geodata(d["paths"]["shp"], encoding="ISO-8859-1"),
+    "b1_crop_code_name_pairs": _get_crop_pairs,
+    "b5_clean_gpkg": lambda d: b5_create_unique_ids.remove_duplicates_and_non_geometries_and_correct_unique_fid(
+        d["paths"]["gpkg"], "utf-8", d["paths"]["col_translate_pth"], REGION_ID, str(YEAR),
+        _out_pth(d, "b5.geoparquet")),
+    "c3_harmonize_gpkg": lambda d: c3.unify_column_names_in_vector_data(
+        d["paths"]["gpkg"], "utf-8", d["paths"]["col_translate_pth"], d["paths"]["crop_class_pth"], REGION_ID,
+        str(YEAR), _out_pth(d, "c3.geoparquet"), organic_dict={"J": 1, "N": 0}, remove_geometry_duplicates=True),
+    "c4_validity_check": lambda d: validity_check.check_file(_out_pth(d, "c3.geoparquet")),
+}
+
+## Benchmarks that need the output of another benchmark
+DEPENDENCIES = {"c4_validity_check": "c3_harmonize_gpkg"}
+
+
+def time_benchmark(func, data, repeats, warmup=WARMUP):
+    """
+    Runs a benchmark warmup times without and repeats times with timing (its prints are suppressed) and returns the
+    times in seconds.
+    """
+    times = []
+    for i in range(warmup + repeats):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stime = time.perf_counter()
+            func(data)
+            seconds = time.perf_counter() - stime
+        if i >= warmup:
+            times.append(seconds)
+
+    return times
+
+
+def get_environment():
+    """Returns the versions and the machine that the benchmarks ran on."""
+    try:
+        commit = subprocess.run(["git", "-C", project_root, "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__,
+            "geopandas": gpd.__version__, "shapely": shapely.__version__, "geos": shapely.geos_version_string,
+            "pyarrow": pa.__version__, "pyogrio": pyogrio.__version__}
+
+
+def run_benchmarks(scales, repeats, names=None, regenerate=False):
+    """
+    Runs the benchmarks on all scales.
+
+    :param scales: List of numbers of parcels.
+    :param repeats: Number of runs of each benchmark.
+    :param names: Names of the benchmarks to run (see BENCHMARKS). None runs all.
+    :param regenerate: If True, the synthetic files are generated again.
+    :return: List of dictionaries with the benchmark, n, the times and the throughput.
+    """
+    names = names or list(BENCHMARKS)
+    ## Benchmarks that others depend on are run first
+    names = [DEPENDENCIES[name] for name in names if name in DEPENDENCIES and DEPENDENCIES[name] not in names] + names
+
+    results = []
+    for n in scales:
+        data = prepare_data(n, regenerate)
+        helper_functions.create_folder(os.path.join(data["folder"], "out"))
+        if "write_geoparquet" in names:
+            data["harmonized"] = _harmonize_in_memory(data)
+
+        for name in names:
+            try:
+                times = time_benchmark(BENCHMARKS[name], data, repeats)
+            except ImportError as e:
+                print(f"Skipping {name} (n={n}): {e}")
+                continue
+            result = {"benchmark": name, "n": n, "repeats": repeats, "min_seconds": min(times),
+                      "median_seconds": float(np.median(times)), "times": times,
+                      "rows_per_second": n / float(np.median(times)) if np.median(times) > 0 else None}
+            results.append(result)
+            print(f"{name:<35} n={n:<10} median {result['median_seconds']:9.3f}s  min {result['min_seconds']:9.3f}s")
+
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares the median times to a baseline.
+
+    :param results: Results of run_benchmarks.
+    :param baseline: Dictionary of a saved results file.
+    :param threshold: Factor above which a benchmark is reported as slower (or below 1 / threshold as faster).
+    :return: DataFrame with the median times, their ratio and the status of each benchmark and scale.
+    """
+    current = pd.DataFrame(results)[["benchmark", "n", "median_seconds"]]
+    base = pd.DataFrame(baseline["results"])[["benchmark", "n", "median_seconds"]]
+    df = pd.merge(base, current, on=["benchmark", "n"], suffixes=("_baseline", "_current"))
+    df["ratio"] = df["median_seconds_current"] / df["median_seconds_baseline"]
+    df["status"] = "same"
+    df.loc[df["ratio"] > threshold, "status"] = "slower"
+    df.loc[df["ratio"] < 1 / threshold, "status"] = "faster"
+
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the processing steps on synthetic GSA data.")
+    parser.add_argument("--scales", nargs="+", type=int, default=SCALES, help="Numbers of parcels.")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Runs per benchmark.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run (default: all).")
+    parser.add_argument("--baseline", default=BASELINE_PTH, help="Results file to compare to.")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline.")
+    parser.add_argument("--regenerate", action="store_true", help="Generate the synthetic files again.")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with code 1 if a benchmark is slower than the baseline.")
+    args = parser.parse_args()
+
+    stime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
+    print("start: " + stime)
+
+    ## The end-to-end benchmarks record their run metrics in the benchmark folder, not with the real runs
+    run_metrics.METRICS_PTH = os.path.join(BENCHMARK_FOLDER, "run_metrics.jsonl")
+
+    results = run_benchmarks(args.scales, args.repeats, args.only, args.regenerate)
+    output = {"created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()), "environment": get_environment(),
+              "settings": {"repeats": args.repeats, "warmup": WARMUP, "seed": SEED}, "results": results}
+
+    out_pth = os.path.join(BENCHMARK_FOLDER, "results", f"benchmarks_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    helper_functions.create_folder(os.path.dirname(out_pth))
+    with open(out_pth, "w") as file:
+        json.dump(output, file, indent=2)
+    print(f"Results written to {out_pth}.")
+
+    num_slower = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        comparison = compare_to_baseline(results, baseline)
+        num_slower = int((comparison["status"] == "slower").sum())
+        print(f"\nComparison to {args.baseline} (commit {baseline['environment'].get('commit')}):")
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(comparison.round(3).to_string(index=False))
+        print(f"{num_slower} benchmarks are slower than the baseline.")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(output, file, indent=2)
+        print(f"Saved as baseline: {args.baseline}")
+
+    etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
+    print("start: " + stime)
+    print("end: " + etime)
+
+    if args.fail_on_regression and num_slower > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+## Synthetic crops: original code, original name (with characters that need Latin-1 or UTF-8), English name and
+## HCAT class. The names are written to the files as they are, so the encodings of the readers are exercised.
+CROPS = [
+    (115, "Winterweichweizen", "winter soft wheat", "winter_common_soft_wheat", 3301011101),
+    (131, "Wintergerste", "winter barley", "winter_barley", 3301010401),
+    (132, "Sommergerste", "spring barley", "spring_barley", 3301010402),
+    (171, "Mais", "maize", "grain_maize_corn_popcorn", 3301010601),
+    (311, "Winterraps", "winter rapeseed", "winter_rapeseed_rape", 3301060701),
+    (602, "Kartoffeln", "potatoes", "potatoes", 3301030100),
+    (603, "Zuckerrüben", "sugar beets", "sugar_beet", 3301290700),
+    (422, "Kleegras", "clover grass", "clover_grass", 3302000000),
+    (459, "Grünland (Dauergrünland)", "permanent grassland", "pasture_meadow_grassland_grass", 3302000000),
+    (480, "Mähweide", "mowing pasture", "pasture_meadow_grassland_grass", 3302000000),
+    (591, "Brache ohne Erzeugung", "fallow without production", "fallow_land_not_crop", 3303000000),
+    (811, "Blé tendre d'hiver", "winter soft wheat", "winter_common_soft_wheat", 3301011101),
+    (812, "Maïs grain", "grain maize", "grain_maize_corn_popcorn", 3301010601),
+    (813, "Jachère", "fallow", "fallow_land_not_crop", 3303000000),
+]
+## Crops that are not in the classification table, so that the misses of c3 and c4 are exercised as well
+UNCLASSIFIED_CROPS = [(990, "Sonstige Flächen", None, None, None), (991, "Mischkultur Öllein", None, None, None)]
+
+## Original column names of the synthetic GSA files and their unified names (see create_translation_table)
+COLUMNS = {"FLIK": "field_id", "KULTURCODE": "crop_code", "KULTURART": "crop_name", "OEKO": "organic",
+           "FLAECHE": "field_size"}
+## Column with several crops per parcel, e.g. "Mais|Kleegras" (shapefile column names have at most 10 characters)
+MULTI_CROP_COLUMN = "KULTUREN"
+
+## Extent of the parcels in EPSG:25832 (about the size of a large German state)
+EXTENT = (300_000, 5_300_000, 800_000, 5_900_000)
+
+
+def create_parcel_geometries(n, mean_vertices=12, max_vertices=80, seed=0, chunk_size=500_000):
+    """
+    Creates n parcel-like polygons: irregular, convex-ish rings with a log-normally distributed number of vertices
+    (mean about mean_vertices) and sizes of up to about 10 ha, spread over EXTENT.
+
+    :param n: Number of polygons.
+    :param mean_vertices: Mean number of vertices of the rings.
+    :param max_vertices: Maximum number of vertices.
+    :param seed: Seed of the random numbers.
+    :param chunk_size: Number of polygons that are created at once, to limit the memory for large n.
+    :return: numpy array of shapely polygons.
+    """
+    rng = np.random.default_rng(seed)
+    geometries = np.empty(n, dtype=object)
+
+    for start in range(0, n, chunk_size):
+        size = min(chunk_size, n - start)
+        num_vertices = np.clip(rng.lognormal(np.log(mean_vertices), 0.5, size).astype(int), 4, max_vertices)
+        cx = rng.uniform(EXTENT[0], EXTENT[2], size)
+        cy = rng.uniform(EXTENT[1], EXTENT[3], size)
+        radius = rng.uniform(30, 180, size)
+
+        ## Polygons with the same number of vertices are created together
+        for k in np.unique(num_vertices):
+            idx = np.flatnonzero(num_vertices == k)
+            angles = np.sort(rng.uniform(0, 2 * np.pi, (len(idx), k)), axis=1)
+            radii = radius[idx, None] * rng.uniform(0.7, 1.0, (len(idx), k))
+            coords = np.stack([cx[idx, None] + radii * np.cos(angles), cy[idx, None] + radii * np.sin(angles)],
+                              axis=2)
+            ## Round to cm like most GSA data and close the rings
+            coords = np.round(np.concatenate([coords, coords[:, :1]], axis=1), 2)
+            geometries[start + idx] = shapely.polygons(coords)
+
+    return geometries
+
+
+def create_parcels(n, duplicate_ratio=0.05, invalid_ratio=0.001, missing_geometry_ratio=0.001, multi_crop_ratio=0.1,
+                   unclassified_ratio=0.01, duplicate_id_ratio=0.01, mean_vertices=12, crs=25832, seed=0):
+    """
+    Creates a synthetic GSA GeoDataFrame with the columns of COLUMNS and MULTI_CROP_COLUMN.
+
+    :param n: Number of parcels.
+    :param duplicate_ratio: Share of parcels whose geometry is a copy of another parcel.
+    :param invalid_ratio: Share of parcels with a self-intersecting (bow-tie) geometry.
+    :param missing_geometry_ratio: Share of parcels without geometry.
+    :param multi_crop_ratio: Share of parcels with several crops in MULTI_CROP_COLUMN (separated by "|").
+    :param unclassified_ratio: Share of parcels with a crop that is not in the classification table.
+    :param duplicate_id_ratio: Share of parcels whose field ID is also used by another parcel.
+    :param mean_vertices: Mean number of vertices of the polygons.
+    :param crs: Coordinate reference system of the parcels (the coordinates are generated in EPSG:25832).
+    :param seed: Seed of the random numbers.
+    :return: GeoDataFrame.
+    """
+    rng = np.random.default_rng(seed)
+    geometries = create_parcel_geometries(n, mean_vertices=mean_vertices, seed=seed)
+
+    ## Copies of other geometries
+    num_duplicates = int(n * duplicate_ratio)
+    if num_duplicates and n > 1:
+        targets = rng.choice(n, num_duplicates, replace=False)
+        geometries[targets] = geometries[rng.integers(0, n, num_duplicates)]
+
+    ## Bow-ties: the first two vertices are swapped
+    num_invalid = int(n * invalid_ratio)
+    for i in rng.choice(n, num_invalid, replace=False):
+        coords = shapely.get_coordinates(geometries[i])
+        coords[[0, 1]] = coords[[1, 0]]
+        coords[-1] = coords[0]
+        geometries[i] = shapely.Polygon(coords)
+
+    geometries[rng.choice(n, int(n * missing_geometry_ratio), replace=False)] = None
+
+    ## Field IDs in the German FLIK format, some of them used twice
+    field_ids = np.char.add("DEBBLI", np.char.zfill(np.arange(n).astype(str), 10)).astype(object)
+    num_duplicate_ids = int(n * duplicate_id_ratio)
+    if num_duplicate_ids and n > 1:
+        field_ids[rng.choice(n, num_duplicate_ids, replace=False)] = field_ids[rng.integers(0, n, num_duplicate_ids)]
+
+    ## Crops, most parcels with classified crops
+    crops = CROPS + UNCLASSIFIED_CROPS
+    crop_index = rng.integers(0, len(CROPS), n)
+    unclassified = rng.random(n) < unclassified_ratio
+    crop_index[unclassified] = rng.integers(len(CROPS), len(crops), unclassified.sum())
+    codes = np.array([crop[0] for crop in crops])
+    names = np.array([crop[1] for crop in crops], dtype=object)
+
+    ## Several crops per parcel, separated by "|"
+    multi_crop = names[crop_index].copy()
+    multi = np.flatnonzero(rng.random(n) < multi_crop_ratio)
+    second = names[rng.integers(0, len(CROPS), len(multi))]
+    multi_crop[multi] = multi_crop[multi] + "|" + second
+
+    gdf = gpd.GeoDataFrame({
+        "FLIK": field_ids,
+        "KULTURCODE": codes[crop_index],
+        "KULTURART": names[crop_index],
+        MULTI_CROP_COLUMN: multi_crop,
+        "OEKO": rng.choice(np.array(["J", "N"], dtype=object), n, p=[0.1, 0.9]),
+        "FLAECHE": np.round(shapely.area(geometries) / 10000, 4)
+    }, geometry=geometries, crs=25832)
+
+    if crs != 25832:
+        gdf = gdf.to_crs(crs)
+
+    return gdf
+
+
+def create_translation_table(region_id, years):
+    """
+    Creates the column name translation table of the synthetic files in the format of
+    data/tables/column_name_translations (column_name, prelim and one column per region and year).
+    """
+    unified_columns = ["field_id", "crop_code", "crop_name", "EC_trans_n", "EC_hcat_n", "EC_hcat_c", "organic",
+                       "field_size"]
+    original_columns = {unified: original for original, unified in COLUMNS.items()}
+    tr_df = pd.DataFrame({"column_name": unified_columns, "prelim": 1})
+    for year in years:
+        tr_df[f"{region_id}_{year}"] = [original_columns.get(col) for col in unified_columns]
+
+    return tr_df
+
+
+def create_crop_classification_table():
+    """Creates the crop classification table of the synthetic crops (without UNCLASSIFIED_CROPS)."""
+    return pd.DataFrame(CROPS, columns=["crop_code", "crop_name", "EC_trans_n", "EC_hcat_n", "EC_hcat_c"])
+
+
+def write_synthetic_dataset(out_folder, n, region_id="XX", year=2021, formats=("geoparquet", "gpkg", "shp"),
+                            shp_encoding="ISO-8859-1", seed=0, **kwargs):
+    """
+    Writes a synthetic GSA file in each format and the matching translation and classification tables.
+
+    :param out_folder: Output folder. Use one folder per n, because the file names only contain the region and year.
+    :param n: Number of parcels.
+    :param formats: File formats of the GSA file. Shapefiles are written with shp_encoding (and a .cpg file), all
+        other formats in UTF-8.
+    :param kwargs: Further arguments of create_parcels.
+    :return: Dictionary with the paths of the GSA files per format and of the tables ("col_translate_pth" and
+        "crop_class_pth").
+    """
+    os.makedirs(out_folder, exist_ok=True)
+    gdf = create_parcels(n, seed=seed, **kwargs)
+
+    paths = {}
+    for file_format in formats:
+        pth = os.path.join(out_folder, f"GSA_{region_id}_{year}.{file_format}")
+        if file_format in ["geoparquet", "parquet"]:
+            gdf.to_parquet(pth)
+        elif file_format == "shp":
+            gdf.to_file(pth, encoding=shp_encoding)
+        else:
+            gdf.to_file(pth)
+        paths[file_format] = pth
+
+    paths["col_translate_pth"] = os.path.join(out_folder, f"{region_id}_column_name_translation.csv")
+    create_translation_table(region_id, [year]).to_csv(paths["col_translate_pth"], index=False)
+    paths["crop_class_pth"] = os.path.join(out_folder, f"{region_id}_crop_classification_final.csv")
+    create_crop_classification_table().to_csv(paths["crop_class_pth"], index=False)
+
+    return paths
@@ -20,7 +20,7 @@
 # item should be another dictionary. In this dictionary, you should include the following keys:
 
 # "region_id" - basically the main key (XX), but for XX/XXX changed into XX_XXX
-# "file_encoding" - Encoding of the original GSA file
+# "file_encoding" - Encoding of the original GSA file, or "auto" to detect it from the file
 # "file_year_encoding" - [optional] use if specific years deviate from that encoding
 # "organic_dict" - [optional] use if there is an organic column in the original GSA data and the information
 # is not already in the right form (0, 1 and 2 should indicate conventional, organic, and in transition)
@@ -29,6 +29,17 @@
 # "skip_years" - [optional] can be used to provide a list of years that should not be harmonized
 # "ignore_file_descr" - [optional] use if there are other geospatial datasets in your folder that are not GSA data
 # "pre_transformation_crs" - [optional] provide an epsg code for input files that are not correctly defined in the files, e.g. in Croatia
+# "chunked" - [optional] set to True to read and process the input files in batches, e.g. for FR, ES or PL, so that
+# country-scale files never have to be loaded fully into memory
+# "memory_budget_mb" - [optional] peak memory per batch if "chunked" is used (default: 4096)
+# "repair_geometries" - [optional] set to True to repair invalid geometries and normalize all geometries
+# (see my_utils/geometry_repair.py)
+# "clean_raw_input" - [optional] set to True to run on the original GSA files instead of the outputs of b5. Each file
+# is then read once to write the uniqueness report of b4, to remove the non-geometries and duplicate geometries and
+# make the field IDs unique like b5 and to harmonize it (geometries are repaired unless "repair_geometries" is False).
+# The files in the pre_processed_data folder are then ignored automatically. Not combined with "chunked".
+# "write_cleaned_data" - [optional] set to True to also write the cleaned files of "clean_raw_input" to
+# data\vector\IACS\XX\pre_processed_data\, like b5
 
 # To turn off/on the processing of a specific country, set the key "switch" in the dictionary to "off" or "on"
 
@@ -40,11 +51,24 @@ import sys
 os.environ["GDAL_DRIVER_PATH"] = os.path.join(f'{os.sep}'.join(sys.executable.split(os.sep)[:-1]), 'Library', 'lib', 'gdalplugins')
 import time
 import pandas as pd
-import geopandas as gpd
 import warnings
 import numpy as np
 
 from my_utils import helper_functions
+from my_utils import chunked_io
+from my_utils import job_scheduler
+from my_utils import fingerprints
+from my_utils import crop_classification
+from my_utils import lookup_store
+from my_utils import region_tables
+from my_utils import geoparquet_writer
+from my_utils import encoding_detection
+from my_utils import geodata_reader
+from my_utils import stage_columns
+from my_utils import geometry_repair
+from my_utils import gsa_cleaning
+from my_utils import run_metrics
+from my_utils import profiling
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -53,47 +77,151 @@ os.chdir(WD)
 
 COL_NAMES_FOLDER = os.path.join("data", "tables", "column_names")
 CROP_CLASSIFICATION_FOLDER = os.path.join("data", "tables", "crop_classifications")
-_TRANSLATION_CACHE = {}
-_CROP_CLASSIFICATION_CACHE = {}
+LOG_FOLDER = os.path.join("data", "vector", "IACS_EU_Land", "logs", "c3")
+
+## Number of parallel processes for the harmonization of the GSA files. With 1, all files are processed one after
+## another in this process. With more workers, each job writes its prints to a log file in LOG_FOLDER.
+N_WORKERS = 1
+## Memory in megabytes that all parallel jobs may use together. A job is only started if its estimated memory
+## (see job_scheduler.estimate_job_memory_mb) fits into the remaining budget, so two very large files (e.g. FR) are
+## not processed at the same time.
+MEMORY_BUDGET_MB = 64000
+
+## Settings of the output geoparquets. The rows are sorted spatially ("hilbert", "grid" or None) and written in row
+## groups with a bbox column (GeoParquet 1.1), so that regional queries only read the row groups they need. In
+## chunked mode, the sorted batches are spilled next to the output and merged at the end (needs about the size of the
+## output as additional temporary disk space).
+GEOPARQUET_OPTIONS = {
+    "compression": geoparquet_writer.COMPRESSION,  # "zstd" or "snappy"
+    "compression_level": geoparquet_writer.COMPRESSION_LEVEL,
+    "row_group_size": geoparquet_writer.ROW_GROUP_SIZE,
+    "dictionary_columns": geoparquet_writer.DICTIONARY_COLUMNS,
+    "spatial_sort": geoparquet_writer.SPATIAL_SORT,
+    "write_bbox": True
+}
+
+## The manifest records the fingerprints of all inputs of each harmonized file. Files whose inputs did not change
+## since the last successful run are skipped. Set FORCE_REBUILD to True to rebuild all files anyway.
+MANIFEST_PTH = os.path.join("data", "vector", "IACS_EU_Land", "harmonization_manifest.json")
+FORCE_REBUILD = False
+
+## Subfolder of data\vector\IACS\XX\ with the cleaned files of b5 (and of c3 with "write_cleaned_data")
+PRE_PROCESSED_FOLDER = "pre_processed_data"
+
 # ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
-def get_translation_df(col_translate_pth):
+@profiling.step("classify_crops")
+def classify_crops(iacs, cl_df, classify_on="automatic"):
+    """
+    Classifies the crops of the IACS data by merging the crop classification table either on the crop name or on
+    the crop code. Only the unique crop names or codes are matched against the classification table (see
+    crop_classification.merge_on_unique_values), the result is the same as with a left merge.
+
+    :param iacs: (Geo)DataFrame with harmonized column names.
+    :param cl_df: Crop classification table.
+    :param classify_on: "crop_code", "crop_name" or "automatic". See unify_column_names_in_vector_data.
+    :return: Classified (Geo)DataFrame or None if neither the crop names nor the crop codes could be used.
     """
-    Loads a translation Excel file into a DataFrame with memoization.
+    ## Merge on crop name if it is available in IACS data
+    ## Then it is also likely it is available in classification table but we check anyways
+    print("Classifying crops.")
+    if (("crop_name" in iacs.columns) & ("crop_name" in cl_df.columns)) and (classify_on in ["crop_name", "automatic"]):
+        print("Classifying (i.e. merging) on crop name.")
 
-    Checks the global _TRANSLATION_CACHE for the provided path; if missing,
-    reads the file using openpyxl and caches the result to optimize
-    subsequent calls.
+        ## Retain the original crop codes (if they are present) to assign them later back (they will be replaced in the meantime)
+        crop_codes_bool = False
 
-    Personal note: It seemed that using this approach caused some strange behaviour during the crop classification.
-    Therefore, I switched to using csv-files. I keep it here for now for reproducibility.
+        if ("crop_code" in iacs.columns) & ("crop_code" in cl_df.columns):
+            crop_codes = iacs["crop_code"].to_numpy()
+            ## Drop crop_code because otherwise it will occur twice with appendix _x and _y
+            iacs = iacs.drop(columns="crop_code")
+            crop_codes_bool = True
 
-    :param col_translate_pth: String path to the translation Excel file.
-    :return: pandas.DataFrame containing the translation data.
-    """
-    if col_translate_pth not in _TRANSLATION_CACHE:
-        _TRANSLATION_CACHE[col_translate_pth] = pd.read_excel(col_translate_pth, engine="openpyxl")
-    return _TRANSLATION_CACHE[col_translate_pth]
+        ## remove any line breaks that could not be captured in the crop classification tables
+        ## (for the IACS data this is only done for the unique crop names)
+        cl_df['crop_name'] = crop_classification.remove_line_breaks(cl_df['crop_name'])
+
+        ## As we are classifying on crop name, we drop duplicates in the classification table that might have arisen
+        ## because of different codes between years (or names that only differed by line breaks). Like this, the merge
+        ## keeps the rows of the IACS data and the original crop codes can be assigned back by position.
+        cl_df.drop_duplicates(subset=["crop_name"], inplace=True)
+        if iacs["crop_name"].dtype != 'object':
+            iacs["crop_name"] = iacs["crop_name"].astype(str)
+
+        iacs = crop_classification.merge_on_unique_values(iacs, cl_df, on="crop_name",
+                                                          clean_func=crop_classification.remove_line_breaks)
+
+        ## As we are merging on crop names, it is possible that codes from other years are assigned to the
+        ## original crop code column (e.g. BRB 2005, crop nan -->710). To be correct, we assign the code back.
+        if crop_codes_bool:
+            iacs.drop(columns="crop_code", inplace=True)
+            iacs["crop_code"] = crop_codes
+
+    ## If not merged on crop name, merge on crop code if available
+    elif (("crop_code" in iacs.columns) & ("crop_code" in cl_df.columns)) and (classify_on in ["crop_code", "automatic"]):
+        print("Classifying (i.e. merging) on crop code")
+
+        if ("crop_name" in iacs.columns) & ("crop_name" in cl_df.columns):
+            iacs.drop(columns="crop_name", inplace=True)
+        if iacs["crop_code"].dtype != 'object':
+            iacs["crop_code"] = iacs["crop_code"].astype(int)
 
-def get_crop_classification_df(crop_class_pth):
+        ## As we are classifying on crop codes, we drop duplicates that might have arisen, because of different names
+        cl_df.drop_duplicates(subset=["crop_code"], inplace=True)
+        cl_df.dropna(subset="crop_code", inplace=True)
+        iacs["crop_code"] = iacs["crop_code"].astype(cl_df["crop_code"].dtype)
+        iacs = crop_classification.merge_on_unique_values(iacs, cl_df, on="crop_code")
+    else:
+        warnings.warn("Could not classify the crop names or crop codes. Either one of them has to be in the IACS file and the classification table.")
+        return None
+
+    return iacs
+
+@profiling.step("finalize_harmonized_columns")
+def finalize_harmonized_columns(iacs, tr_df, ext, organic_dict=None):
     """
-        Retrieves a crop classification DataFrame, using a cache to avoid repeated file reads.
+    Maps the organic information, subsets the IACS data to the harmonized columns and assigns the HCAT classes for
+    entries without crop information or without classification.
+
+    :param iacs: Classified (Geo)DataFrame.
+    :param tr_df: Column name translation table (only the rows with prelim == 1).
+    :param ext: File extension of the input file.
+    :param organic_dict: Dictionary mapping the original organic information to 0, 1 and 2.
+    :return: Tuple of the harmonized (Geo)DataFrame and a DataFrame of the entries that were not classified.
+    """
+    if organic_dict:
+        if "organic" in iacs.columns:
+            iacs["organic"] = iacs["organic"].map(organic_dict)
+            iacs.loc[iacs["organic"].isna(), "organic"] = 0
 
-        If the file path is not in _CROP_CLASSIFICATION_CACHE, it reads the Excel file
-        into memory. Otherwise, it returns the previously loaded version.
+    ### Get all column names that should appear in final file
+    cols = tr_df["column_name"].tolist() #[col_dict[k] for k in col_dict]
+    if ext in ['.gpkg', '.gdb', '.shp', '.geojson', '.geoparquet']:
+        cols.append("geometry")
 
-        Personal note: It seemed that using this approach caused some Windows-related Cache error. Therefore, I switched
-        to using csv-files. I keep it here for now for reproducibility.
+    ### Check if all columns are in the file
+    ## If not add the column and then subset file to the selected columns
+    for col in cols:
+        if col not in iacs.columns:
+            iacs[col] = ""
+    iacs = iacs[cols].copy()
 
-        :param crop_class_pth: Path to the crop classification Excel file.
-        :return: pandas.DataFrame containing crop classification mapping.
-        """
-    if crop_class_pth not in _CROP_CLASSIFICATION_CACHE:
-        _CROP_CLASSIFICATION_CACHE[crop_class_pth] = pd.read_excel(crop_class_pth, engine="openpyxl")
-    return _CROP_CLASSIFICATION_CACHE[crop_class_pth]
+    ## Classify entries with no crop as unkown
+    check = iacs.loc[iacs["EC_hcat_n"].isna()].copy()
+    iacs.loc[iacs["crop_name"].isna(), "EC_hcat_n"] = "not_known_and_other"
+    iacs.loc[iacs["crop_name"].isna(), "EC_hcat_c"] = 3399000000
+    iacs.loc[iacs["EC_hcat_n"].isna(), "EC_hcat_n"] = "missing"
+    iacs.loc[iacs["EC_hcat_c"].isna(), "EC_hcat_c"] = 1000000000
+
+    iacs["EC_hcat_c"] = iacs["EC_hcat_c"].astype(np.int64)
+
+    return iacs, check
 
+
+@run_metrics.track_run("c3_classify_crops_and_unify_column_names")
 def unify_column_names_in_vector_data(iacs_pth, file_encoding, col_translate_pth, crop_class_pth, region_id, year,
                                       iacs_new_pth, csv_sep=",", pre_transformation_crs=None, organic_dict=None,
-                                      classify_on="automatic", remove_geometry_duplicates=True):
+                                      classify_on="automatic", remove_geometry_duplicates=True,
+                                      repair_geometries=False):
     """
        Unify column names in vector data.
 
@@ -127,6 +255,9 @@ def unify_column_names_in_vector_data(iacs_pth, file_encoding, col_translate_pth
            - "crop_name"
            - "automatic"
            Default is "automatic".
+       repair_geometries : bool, optional
+           If True, invalid geometries are repaired and all geometries are normalized with
+           geometry_repair.repair_geometries (default is False).
 
        Raises:
        ------
@@ -148,50 +279,65 @@ def unify_column_names_in_vector_data(iacs_pth, file_encoding, col_translate_pth
     ## Open files
     print("Reading input.")
 
-    if ext in ['.gpkg', '.gdb', '.shp', '.geojson']:
-        iacs = helper_functions.load_geodata_safe(iacs_pth, encoding=file_encoding)
-    elif ext in ['.geoparquet']:
-        iacs = gpd.read_parquet(iacs_pth)
-    elif ext in ['.csv']:
-        iacs = pd.read_csv(iacs_pth, sep=csv_sep)
+    ## The tables of the region are only read once per process (see region_tables.get_resolver)
+    resolver = region_tables.get_resolver(col_translate_pth, region_id, crop_class_pth)
+    cl_df = resolver.get_crop_classification()
 
-    tr_df = pd.read_csv(col_translate_pth) #get_translation_df(col_translate_pth) #pd.read_excel(col_translate_pth)
-    cl_df = pd.read_csv(crop_class_pth) #get_crop_classification_df(crop_class_pth) #dtype={"EC_hcat_c": int}
+    ## Only the columns that are translated to the harmonized columns are read
+    columns = stage_columns.get_raw_stage_columns("c3_classify_crops_and_unify_column_names", iacs_pth, resolver, year,
+                                                  encoding=file_encoding, csv_sep=csv_sep)
+    iacs = geodata_reader.read_geodata(iacs_pth, columns=columns, encoding=file_encoding, csv_sep=csv_sep)
+    run_metrics.add_counts(nrows_in=len(iacs))
 
-    ## Optional: Subset the columns that should be in the final file
     print("Unifying column names.")
-    tr_df = tr_df.loc[tr_df["prelim"] == 1].copy()
-
-    ## Create a dictionary that translates old column names to unified column names
-    col_year = f"{region_id}_{year}"
-    col_dict = dict(zip(tr_df.loc[tr_df[col_year].notna(), col_year], tr_df.loc[tr_df[col_year].notna(), "column_name"]))
+    tr_df, col_dict = resolver.get_column_translation(year)
 
-    ## In some cases, multiple columns are provided (e.g. for crops in field blocks), therefore the dictionary has to
-    ## be corrected.
-    keys = list(col_dict.keys())
-    keys_dict = {i: i.split('|')[0] for i in keys}
-    col_dict = {keys_dict[key]: col_dict[key] for key in keys_dict}
+    harmonize_vector_data(iacs, ext, tr_df, col_dict, cl_df, iacs_new_pth, file_encoding=file_encoding,
+                          pre_transformation_crs=pre_transformation_crs, organic_dict=organic_dict,
+                          classify_on=classify_on, remove_geometry_duplicates=remove_geometry_duplicates,
+                          repair_geometries=repair_geometries)
 
+def harmonize_vector_data(iacs, ext, tr_df, col_dict, cl_df, iacs_new_pth, file_encoding="utf-8",
+                          pre_transformation_crs=None, organic_dict=None, classify_on="automatic",
+                          remove_geometry_duplicates=True, repair_geometries=False):
+    """
+    Harmonizes GSA data that are already in memory: renames the columns, cleans the geometries, adds the field size
+    and field ID if missing, classifies the crops, reprojects and writes the harmonized file (see
+    unify_column_names_in_vector_data for the parameters).
+
+    :param iacs: (Geo)DataFrame with the original column names.
+    :param ext: File extension of the original file.
+    :param tr_df: Column name translation table (only the rows with prelim == 1).
+    :param col_dict: Dictionary that renames the original columns to the harmonized columns.
+    :param cl_df: Crop classification table.
+    """
     ## Rename columns
-    iacs.rename(columns=col_dict, inplace=True)
+    with profiling.step("rename"):
+        iacs.rename(columns=col_dict, inplace=True)
 
     ## Check if column with field size in ha is already in file. if not create
     if ext in ['.gpkg', '.gdb', '.shp', '.geojson', '.geoparquet']:
 
         if remove_geometry_duplicates:
+            in_len = len(iacs)
             iacs = helper_functions.remove_geometry_duplicates(iacs)
+            run_metrics.add_counts(nrows_dup_geom=in_len - len(iacs))
+
+        if repair_geometries:
+            iacs["geometry"] = geometry_repair.repair_geometries(iacs["geometry"])
 
         ## in some cases (e.g. HR), there were some issues with the CRS. Setting it anew, helped to solve it.
         if pre_transformation_crs:
             iacs.crs = None
             iacs.set_crs(epsg=pre_transformation_crs, inplace=True)
 
-        if not "field_size" in iacs.columns:
-            ## Reproject only here, if the crs is geographic (if so, the area calculations will likely be wrong)
-            if not iacs.crs.is_projected:
-                iacs = iacs.to_crs(3857)
-            iacs["field_size"] = iacs.geometry.area / 10000
-        iacs["field_size"] = iacs["field_size"].astype(float)
+        with profiling.step("field_size"):
+            if not "field_size" in iacs.columns:
+                ## Reproject only here, if the crs is geographic (if so, the area calculations will likely be wrong)
+                if not iacs.crs.is_projected:
+                    iacs = iacs.to_crs(3857)
+                iacs["field_size"] = iacs.geometry.area / 10000
+            iacs["field_size"] = iacs["field_size"].astype(float)
 
         ## Check if field_id is in file. if not create
         if not "field_id" in iacs.columns:
@@ -204,91 +350,17 @@ def unify_column_names_in_vector_data(iacs_pth, file_encoding, col_translate_pth
             out_len = len(iacs)
             print(f"{in_len - out_len} entries with no geometries")
 
-    ## Merge on crop name if it is available in IACS data
-    ## Then it is also likely it is available in classification table but we check anyways
-    print("Classifying crops.")
-    if (("crop_name" in iacs.columns) & ("crop_name" in cl_df.columns)) and (classify_on in ["crop_name", "automatic"]):
-        print("Classifying (i.e. merging) on crop name.")
-
-        ## Retain the original crop codes (if they are present) to assign them later back (they will be replaced in the meantime)
-        crop_codes_bool = False
-        dict_field_id = "field_id"
-
-        if ("crop_code" in iacs.columns) & ("crop_code" in cl_df.columns):
-            crop_codes = dict(zip(iacs[dict_field_id], iacs["crop_code"]))
-            ## Drop crop_code because otherwise it will occur twice with appendix _x and _y
-            iacs.drop(columns="crop_code", inplace=True)
-            crop_codes_bool = True
-
-        ## As we are classifying on crop name, we drop duplicates in the classification table that might have arisen
-        ## because of different codes between years
-        cl_df.drop_duplicates(subset=["crop_name"], inplace=True)
-        if iacs["crop_name"].dtype != 'object':
-            iacs["crop_name"] = iacs["crop_name"].astype(str)
-
-        ## remove any line breaks that could not be captured in the crop classification tables
-        cl_df['crop_name'] = cl_df['crop_name'].str.replace('\n', '')
-        cl_df['crop_name'] = cl_df['crop_name'].str.replace('\r', '')
-
-        iacs['crop_name'] = iacs['crop_name'].str.replace('\n', '')
-        iacs['crop_name'] = iacs['crop_name'].str.replace('\r', '')
-        iacs = pd.merge(iacs, cl_df, how="left", on="crop_name")
-
-        ## As we are merging on crop names, it is possible that codes from other years are assigned to the
-        ## original crop code column (e.g. BRB 2005, crop nan -->710). To be correct, we assign the code back.
-        if crop_codes_bool:
-            iacs.drop(columns="crop_code", inplace=True)
-            iacs["crop_code"] = iacs[dict_field_id].map(crop_codes)
-
-    ## If not merged on crop name, merge on crop code if available
-    elif (("crop_code" in iacs.columns) & ("crop_code" in cl_df.columns)) and (classify_on in ["crop_code", "automatic"]):
-        print("Classifying (i.e. merging) on crop code")
-
-        if ("crop_name" in iacs.columns) & ("crop_name" in cl_df.columns):
-            iacs.drop(columns="crop_name", inplace=True)
-        if iacs["crop_code"].dtype != 'object':
-            iacs["crop_code"] = iacs["crop_code"].astype(int)
-
-        ## As we are classifying on crop codes, we drop duplicates that might have arisen, because of different names
-        cl_df.drop_duplicates(subset=["crop_code"], inplace=True)
-        cl_df.dropna(subset="crop_code", inplace=True)
-        iacs["crop_code"] = iacs["crop_code"].astype(cl_df["crop_code"].dtype)
-        iacs = pd.merge(iacs, cl_df, how="left", on="crop_code")
-    else:
-        warnings.warn("Could not classify the crop names or crop codes. Either one of them has to be in the IACS file and the classification table.")
+    iacs = classify_crops(iacs, cl_df, classify_on)
+    if iacs is None:
         return
 
-    # iacs["country_id"] = region_id.split("_")[0]
-    if organic_dict:
-        if "organic" in iacs.columns:
-            iacs["organic"] = iacs["organic"].map(organic_dict)
-            iacs.loc[iacs["organic"].isna(), "organic"] = 0
-
-    ### Get all column names that should appear in final file
-    cols = tr_df["column_name"].tolist() #[col_dict[k] for k in col_dict]
-    if ext in ['.gpkg', '.gdb', '.shp', '.geojson', '.geoparquet']:
-        cols.append("geometry")
-
-    ### Check if all columns are in the file
-    ## If not add the column and then subset file to the selected columns
-    for col in cols:
-        if col not in iacs.columns:
-            iacs[col] = ""
-    iacs = iacs[cols].copy()
-
-    ## Classify entries with no crop as unkown
-    check = iacs.loc[iacs["EC_hcat_n"].isna()].copy()
-    iacs.loc[iacs["crop_name"].isna(), "EC_hcat_n"] = "not_known_and_other"
-    iacs.loc[iacs["crop_name"].isna(), "EC_hcat_c"] = 3399000000
-    iacs.loc[iacs["EC_hcat_n"].isna(), "EC_hcat_n"] = "missing"
-    iacs.loc[iacs["EC_hcat_c"].isna(), "EC_hcat_c"] = 1000000000
-
-    iacs["EC_hcat_c"] = iacs["EC_hcat_c"].astype(np.int64)
+    iacs, check = finalize_harmonized_columns(iacs, tr_df, ext, organic_dict)
 
     ## Reproject
     if ext in ['.gpkg', '.gdb', '.shp', '.geojson', '.geoparquet']:
         print("Reprojecting.")
-        iacs = iacs.to_crs(3035)  # in meters
+        with profiling.step("to_crs"):
+            iacs = iacs.to_crs(3035)  # in meters
 
     ## Create output folder
     folder = os.path.dirname(iacs_new_pth)
@@ -306,14 +378,230 @@ def unify_column_names_in_vector_data(iacs_pth, file_encoding, col_translate_pth
         # if ext_new in ['.gpkg', '.gdb', '.shp', '.geojson']:
         #     check.to_file(os.path.splitext(iacs_new_pth)[0] + "_misses.gpkg", encoding=file_encoding)
 
+    run_metrics.add_counts(nrows_out=len(iacs), num_unclassified_crops=len(unique_crops))
+
     ## Write out
     print("Writing out.")
-    if ext_new in ['.gpkg', '.gdb', '.shp', '.geojson']:
-        iacs.to_file(iacs_new_pth, encoding=file_encoding)
-    if ext_new in ['.geoparquet']:
-        iacs.to_parquet(iacs_new_pth)
-    if ext_new in ['.csv']:
-        iacs.to_csv(iacs_new_pth, index=False)
+    with profiling.step("write"):
+        if ext_new in ['.gpkg', '.gdb', '.shp', '.geojson']:
+            iacs.to_file(iacs_new_pth, encoding=file_encoding)
+        if ext_new in ['.geoparquet']:
+            geoparquet_writer.write_geoparquet(iacs, iacs_new_pth, **GEOPARQUET_OPTIONS)
+        if ext_new in ['.csv']:
+            iacs.to_csv(iacs_new_pth, index=False)
+
+@run_metrics.track_run("c3_classify_crops_and_unify_column_names")
+def clean_check_and_harmonize_vector_data(iacs_pth, file_encoding, col_translate_pth, crop_class_pth, region_id, year,
+                                          iacs_new_pth, pre_transformation_crs=None, organic_dict=None,
+                                          classify_on="automatic", repair_geometries=True, cleaned_out_pth=None):
+    """
+    Runs the uniqueness check of b4, the cleaning of b5 and the harmonization of this script on an original GSA file
+    that is read only once. The counts are appended to the uniqueness report (see gsa_cleaning.UNIQUENESS_REPORT_PTH),
+    the non-geometries and duplicate geometries are dropped, the field IDs are made unique and the cleaned data are
+    harmonized and written to iacs_new_pth.
+
+    The translation table should name the original field ID column of the file (not "uni_id" of the b5 outputs). The
+    unique field IDs ("uni_id" or "EL_field_id") are renamed to "field_id" if they are created.
+
+    :param iacs_pth: Path to the original GSA file.
+    :param repair_geometries: If True, invalid geometries are repaired and all geometries are normalized like in b5.
+    :param cleaned_out_pth: Optional path to which the cleaned data are written with all original columns, like
+        the outputs of b5. If None, only the columns that are harmonized are read and nothing else is written.
+    See unify_column_names_in_vector_data for the other parameters.
+    """
+    valid_options = ["crop_code", "crop_name", "automatic"]
+    if classify_on not in valid_options:
+        raise ValueError(f"Invalid value for classify_on: '{classify_on}'. Must be one of {valid_options}.")
+
+    root, ext = os.path.splitext(iacs_pth)
+    if ext not in geodata_reader.OGR_EXTENSIONS + geodata_reader.PARQUET_EXTENSIONS:
+        print("No geodata provided.")
+        return
+    print("Checking field IDs, removing non-geometries and duplicate geometries, unifying column names, "
+          "classifying crops, reprojecting and saving as Geoparquet.")
+
+    ## The tables of the region are only read once per process (see region_tables.get_resolver)
+    resolver = region_tables.get_resolver(col_translate_pth, region_id, crop_class_pth)
+    cl_df = resolver.get_crop_classification()
+
+    field_id_col = {v: k for k, v in resolver.get_field_id_translation(year).items()}.get("field_id")
+    ## Field IDs that were created by b5 from the geometries are created again
+    if field_id_col == "EL_field_id":
+        field_id_col = None
+    if field_id_col == "uni_id":
+        raise ValueError(f"The translation table of {region_id} {year} refers to the field IDs of the b5 output "
+                         f"('uni_id'). Provide the original field ID column to run on {iacs_pth}.")
+
+    ## Read the input once. All columns are only needed if the cleaned data are written out.
+    if cleaned_out_pth:
+        columns = None
+    else:
+        columns = stage_columns.get_raw_stage_columns("c3_classify_crops_and_unify_column_names", iacs_pth, resolver,
+                                                      year, encoding=file_encoding)
+    iacs = geodata_reader.read_geodata(iacs_pth, columns=columns, encoding=file_encoding)
+
+    ## Remove duplicate geometries and non geometries and write the counts to the report
+    iacs, stats = gsa_cleaning.clean_gsa_data(iacs, field_id_col)
+    gsa_cleaning.write_uniqueness_report(stats, iacs_pth, region_id, field_id_col)
+
+    ## Create field IDs or make them unique
+    iacs, unique_id_col = gsa_cleaning.add_unique_field_ids(iacs, field_id_col)
+
+    if repair_geometries:
+        iacs["geometry"] = geometry_repair.repair_geometries(iacs["geometry"])
+
+    if cleaned_out_pth:
+        print(f"Writing cleaned data to {cleaned_out_pth}.")
+        helper_functions.create_folder(os.path.dirname(cleaned_out_pth))
+        with profiling.step("write_cleaned_data"):
+            iacs.to_parquet(cleaned_out_pth)
+
+    print("Unifying column names.")
+    tr_df, col_dict = resolver.get_column_translation(year)
+
+    ## The unique field IDs replace the original field IDs
+    col_dict = {k: v for k, v in col_dict.items() if v != "field_id"}
+    col_dict[unique_id_col] = "field_id"
+
+    ## The geometries were already cleaned above
+    harmonize_vector_data(iacs, ext, tr_df, col_dict, cl_df, iacs_new_pth, file_encoding=file_encoding,
+                          pre_transformation_crs=pre_transformation_crs, organic_dict=organic_dict,
+                          classify_on=classify_on, remove_geometry_duplicates=False, repair_geometries=False)
+
+@run_metrics.track_run("c3_classify_crops_and_unify_column_names")
+def unify_column_names_in_vector_data_chunked(iacs_pth, file_encoding, col_translate_pth, crop_class_pth, region_id,
+                                              year, iacs_new_pth, pre_transformation_crs=None, organic_dict=None,
+                                              classify_on="automatic", remove_geometry_duplicates=True,
+                                              repair_geometries=False, memory_budget_mb=4096, batch_size=None):
+    """
+       Streaming version of unify_column_names_in_vector_data for country-scale files that do not fit into memory.
+
+       The input is read in bounded row batches (Arrow record batches for geoparquet, OGR feature pages for all other
+       formats). Each batch is renamed, classified and reprojected and then appended to a single output geoparquet.
+       The removal of geometry duplicates and the creation of field IDs are carried over between batches, so that
+       the output is the same as with the in-memory version.
+
+       Parameters:
+       ----------
+       iacs_pth, file_encoding, col_translate_pth, crop_class_pth, region_id, year, iacs_new_pth,
+       pre_transformation_crs, organic_dict, classify_on, remove_geometry_duplicates, repair_geometries :
+           See unify_column_names_in_vector_data.
+       memory_budget_mb : int, optional
+           Peak memory in megabytes that a single batch is allowed to use. Used to derive the batch size
+           (default is 4096).
+       batch_size : int or None, optional
+           Number of rows per batch. Overwrites the estimate from memory_budget_mb (default is None).
+
+       Raises:
+       ------
+       ValueError:
+           If `classify_on` is not valid or if the input is not geodata or the output is not a geoparquet.
+
+       Returns:
+       -------
+       None
+       """
+
+    valid_options = ["crop_code", "crop_name", "automatic"]
+    if classify_on not in valid_options:
+        raise ValueError(f"Invalid value for classify_on: '{classify_on}'. Must be one of {valid_options}.")
+
+    root, ext = os.path.splitext(iacs_pth)
+    if ext not in ['.gpkg', '.gdb', '.shp', '.geojson', '.geoparquet']:
+        raise ValueError(f"Chunked processing is only possible for geodata. {iacs_pth}")
+    if os.path.splitext(iacs_new_pth)[1] != '.geoparquet':
+        raise ValueError(f"Chunked processing only writes geoparquets. {iacs_new_pth}")
+
+    print("Unifying column names, classifying crops, reprojecting and saving as Geoparquet in batches.")
+
+    resolver = region_tables.get_resolver(col_translate_pth, region_id, crop_class_pth)
+    cl_df = resolver.get_crop_classification()
+    tr_df, col_dict = resolver.get_column_translation(year)
+    columns = stage_columns.get_raw_stage_columns("c3_classify_crops_and_unify_column_names", iacs_pth, resolver, year,
+                                                  encoding=file_encoding)
+
+    if not batch_size:
+        batch_size = chunked_io.estimate_batch_size(iacs_pth, memory_budget_mb, encoding=file_encoding)
+    print(f"Reading input in batches of {batch_size} rows.")
+
+    ## Create output folder
+    folder = os.path.dirname(iacs_new_pth)
+    helper_functions.create_folder(folder)
+
+    dup_filter = chunked_io.GeometryDuplicateFilter()
+    fid_generator = chunked_io.FieldIdGenerator()
+    check_lst = []
+    num_non_geom = 0
+    nrows_in = 0
+
+    with chunked_io.GeoParquetBatchWriter(iacs_new_pth, **GEOPARQUET_OPTIONS) as writer:
+        for i, iacs in enumerate(chunked_io.iter_geodata_batches(iacs_pth, batch_size, encoding=file_encoding,
+                                                                        columns=columns)):
+            print(f"Processing batch {i + 1} with {len(iacs)} entries.")
+            nrows_in += len(iacs)
+
+            ## Rename columns
+            iacs.rename(columns=col_dict, inplace=True)
+
+            if remove_geometry_duplicates:
+                iacs = dup_filter.filter(iacs)
+
+            if repair_geometries:
+                iacs["geometry"] = geometry_repair.repair_geometries(iacs["geometry"])
+
+            ## in some cases (e.g. HR), there were some issues with the CRS. Setting it anew, helped to solve it.
+            if pre_transformation_crs:
+                iacs.crs = None
+                iacs.set_crs(epsg=pre_transformation_crs, inplace=True)
+
+            if not "field_size" in iacs.columns:
+                ## Reproject only here, if the crs is geographic (if so, the area calculations will likely be wrong)
+                if not iacs.crs.is_projected:
+                    iacs = iacs.to_crs(3857)
+                iacs["field_size"] = iacs.geometry.area / 10000
+            iacs["field_size"] = iacs["field_size"].astype(float)
+
+            ## Make sure that no non-geometries are in the file and create the field ID if it is not in the file
+            in_len = len(iacs)
+            if not "field_id" in iacs.columns:
+                iacs = iacs.loc[iacs["geometry"].notna()].copy()
+                iacs["field_id"] = fid_generator.assign(iacs.geometry)
+            else:
+                iacs = iacs.loc[~iacs["geometry"].is_empty & iacs["geometry"].notna()].copy()
+            num_non_geom += in_len - len(iacs)
+
+            iacs = classify_crops(iacs, cl_df, classify_on)
+            if iacs is None:
+                writer.abort()
+                break
+
+            iacs, check = finalize_harmonized_columns(iacs, tr_df, ext, organic_dict)
+            check_lst.append(check[["crop_code", "crop_name"]].drop_duplicates())
+
+            with profiling.step("to_crs"):
+                iacs = iacs.to_crs(3035)  # in meters
+            with profiling.step("write"):
+                writer.write(iacs)
+            del iacs
+
+    ## The crops could not be classified, so no output was written
+    if writer.aborted:
+        return
+
+    if remove_geometry_duplicates:
+        print(f"{dup_filter.num_removed} geometry duplicates were found.")
+    print(f"{num_non_geom} entries with no geometries")
+    print(f"{writer.num_rows} entries written to {iacs_new_pth}.")
+    run_metrics.add_counts(nrows_in=nrows_in, nrows_out=writer.num_rows, nrows_non_geom=num_non_geom,
+                           nrows_dup_geom=dup_filter.num_removed)
+
+    ## Check if all crops were classified
+    check = pd.concat(check_lst)
+    check.drop_duplicates(subset=["crop_code", "crop_name"], inplace=True)
+    unique_crops = check["crop_name"].unique()
+    if len(unique_crops) > 0:
+        print(f"{len(unique_crops)} crops were not classified into the EuroCrops classification.")
+        check.to_csv(os.path.splitext(iacs_new_pth)[0] + "_misses.csv", index=False)
 
 def unify_column_names_in_animal_data(iacs_animal_pth, col_translate_pth, region_id, year, iacs_animal_new_pth, csv_sep=",", farm_id_dtype="str"):
 
@@ -359,11 +647,233 @@ def unify_column_names_in_animal_data(iacs_animal_pth, col_translate_pth, region
     animal_df.to_csv(iacs_animal_new_pth, index=False)
 
 
+def get_job_fingerprints(kwargs):
+    """
+    Collects the fingerprints of all inputs that determine the output of a harmonization job: the raw GSA file (size
+    and modification time), the column of the translation table for the region and year, the crop classification
+    table, the organic dictionary, the crs override and the remaining settings.
+
+    :param kwargs: Keyword arguments of unify_column_names_in_vector_data(_chunked) or
+        clean_check_and_harmonize_vector_data.
+    :return: Dictionary with the fingerprints.
+    """
+    col_year = f"{kwargs['region_id']}_{kwargs['year']}"
+
+    return {
+        "version": fingerprints.FINGERPRINT_VERSION,
+        "gsa_file": fingerprints.get_file_fingerprint(kwargs["iacs_pth"]),
+        "column_translation": fingerprints.get_translation_column_hash(kwargs["col_translate_pth"], col_year),
+        "crop_classification": fingerprints.get_content_hash(kwargs["crop_class_pth"]),
+        "organic_dict": fingerprints.get_value_hash(kwargs["organic_dict"]),
+        "pre_transformation_crs": kwargs["pre_transformation_crs"],
+        ## The repair and the fused cleaning are only part of the settings if they are used, so that the outputs of
+        ## earlier runs stay up to date
+        "settings": fingerprints.get_value_hash([kwargs["file_encoding"], kwargs["classify_on"],
+                                                 kwargs.get("remove_geometry_duplicates", False)]
+                                                + (["repair_geometries"] if kwargs.get("repair_geometries") else [])
+                                                + (["clean_raw_input"] if "cleaned_out_pth" in kwargs else [])
+                                                + (["write_cleaned_data"] if kwargs.get("cleaned_out_pth") else []))
+    }
+
+
+def get_vector_harmonization_jobs(run_dict, manifest=None):
+    """
+    Creates one job per GSA file of all regions that are switched on in the run_dict. The settings of the run_dict
+    (skip_years, ignore_files_descr, per-year encodings, organic dictionaries and classify_on columns) are resolved here,
+    so that each job only needs its own keyword arguments.
+
+    :param run_dict: Dictionary with the settings per region (see top of this script).
+    :param manifest: fingerprints.RebuildManifest. If provided, files whose output is up to date are skipped.
+    :return: List of jobs. Each job is a dictionary with the keys "name", "func", "kwargs", "memory_mb" (estimated
+        peak memory in megabytes) and "fingerprints".
+    """
+    jobs = []
+
+    for country_code in run_dict:
+        switch = run_dict[country_code].get("switch", "off").lower()
+        if switch != "on":
+            continue
+
+        ## Derive input variables for function
+        region_id = run_dict[country_code]["region_id"] # country_code.replace(r"/", "_")
+        col_translate_pth = os.path.join("data", "tables", "column_name_translations",
+                                         f"{region_id}_column_name_translation.csv")
+        crop_class_pth = os.path.join(CROP_CLASSIFICATION_FOLDER,
+                                      f"{region_id}_crop_classification_final.csv")
+
+        ## If the file naming of the columns translation and the crop classificaiton table deviate, then correct them
+        if "col_translate_pth" in run_dict[country_code]:
+            col_translate_pth = run_dict[country_code]["col_translate_pth"]
+        if "crop_class_pth" in run_dict[country_code]:
+            crop_class_pth = run_dict[country_code]["crop_class_pth"]
+
+        ## Get years that should be skipped
+        if "skip_years" in run_dict[country_code]:
+            skip_years = run_dict[country_code]["skip_years"]
+        else:
+            skip_years = []
+
+        ## Get files that should be skipped
+        if "ignore_files_descr" in run_dict[country_code]:
+            ignore_files_descr = run_dict[country_code]["ignore_files_descr"]
+        else:
+            ignore_files_descr = None
+
+        if "file_year_encoding" in run_dict[country_code]:
+            file_year_encoding = run_dict[country_code]["file_year_encoding"]
+        else:
+            file_year_encoding = None
+
+        ## Get list of all available files
+        in_dir = os.path.join("data", "vector", "IACS", country_code)
+        iacs_files = helper_functions.list_geospatial_data_in_dir(in_dir)
+
+        ## Exclude files that should be skipped
+        if ignore_files_descr:
+            iacs_files = [file for file in iacs_files if ignore_files_descr not in file]
+
+        ## Check, clean and harmonize the original files in one read instead of running b4 and b5 first. The
+        ## geometries are then repaired by default, like in b5. The cleaned files of earlier runs are not original
+        ## files, so they are excluded.
+        clean_raw_input = run_dict[country_code].get("clean_raw_input", False)
+        write_cleaned_data = run_dict[country_code].get("write_cleaned_data", False)
+        if clean_raw_input:
+            iacs_files = [file for file in iacs_files
+                          if PRE_PROCESSED_FOLDER not in os.path.normpath(file).split(os.sep)]
+
+        ## Get epsg code for input files that are not correctly defined in the files, e.g. in Croatia
+        if "pre_transformation_crs" in run_dict[country_code]:
+            pre_transformation_crs = run_dict[country_code]["pre_transformation_crs"]
+        else:
+            pre_transformation_crs = None
+
+        ## Get organic dictionary if provided
+        if "organic_dict" in run_dict[country_code]:
+            organic_dict = run_dict[country_code]["organic_dict"]
+        else:
+            organic_dict = None
+
+        ## Get classify_on
+        if "classify_on" in run_dict[country_code]:
+            classify_on = run_dict[country_code]["classify_on"]
+        else:
+            classify_on = "automatic"
+
+        if "organic_dict_year" in run_dict[country_code]:
+            organic_dict_year = run_dict[country_code]["organic_dict_year"]
+        else:
+            organic_dict_year = None
+
+        if "classify_on_year_dict" in run_dict[country_code]:
+            classify_on_year_dict = run_dict[country_code]["classify_on_year_dict"]
+        else:
+            classify_on_year_dict = None
+
+        if "remove_geometry_duplicates" in run_dict[country_code]:
+            remove_geometry_duplicates = run_dict[country_code]["remove_geometry_duplicates"]
+        else:
+            remove_geometry_duplicates = False
+
+        repair_geometries = run_dict[country_code].get("repair_geometries", clean_raw_input)
+
+        ## Get the settings for the processing in batches
+        chunked = run_dict[country_code].get("chunked", False)
+        memory_budget_mb = run_dict[country_code].get("memory_budget_mb", 4096)
+
+        ## Temporary, if you want to subset the list.
+        # iacs_files = iacs_files[12:13]
+
+        ## Loop over files to create one job per file
+        for iacs_pth in iacs_files:
+            year = helper_functions.get_year_from_path(iacs_pth)
+            if int(year) in skip_years:
+                print(f"Skipping year {year} - {iacs_pth}")
+                continue
+
+            ## First create out path with original region ID
+            ## We have to fetch the region ID for safety reason again, as it might have been overwritten in
+            region_id = run_dict[country_code]["region_id"]
+            iacs_new_pth = os.path.join("data", "vector", "IACS_EU_Land", country_code,
+                                        f"GSA-{region_id}-{year}.geoparquet")
+
+            ## If an overwrite for the column translation is provided, it means that the columns in the
+            ## column name translation table do not use the original region ID but another one
+            if "col_transl_descr_overwrite" in run_dict[country_code]:
+                region_id = run_dict[country_code]["col_transl_descr_overwrite"]
+
+            ## If a file encoding dictionary for specific years is provided, fetch the current version here. With
+            ## "auto", the encoding is detected from the file (see my_utils/encoding_detection.py).
+            file_encoding = encoding_detection.get_file_encoding(
+                iacs_pth, run_dict[country_code]["file_encoding"], file_year_encoding, year=year)
+
+            ## If a organic dictionary for specific years is provided, fetch the current version here
+            if organic_dict_year:
+                if year in organic_dict_year:
+                    organic_dict = organic_dict_year[year]
+                else:
+                    organic_dict = None
+
+            ## If the users wants to force the column that should be used for the classificatin, fetch it here
+            if classify_on_year_dict:
+                if year in classify_on_year_dict:
+                    classify_on = classify_on_year_dict[year]
+                else:
+                    classify_on = "automatic"
+
+            kwargs = dict(
+                iacs_pth=iacs_pth,
+                file_encoding=file_encoding,
+                col_translate_pth=col_translate_pth,
+                crop_class_pth=crop_class_pth,
+                region_id=region_id,
+                year=year,
+                iacs_new_pth=iacs_new_pth,
+                pre_transformation_crs=pre_transformation_crs,
+                organic_dict=organic_dict,
+                classify_on=classify_on,
+                repair_geometries=repair_geometries
+            )
+
+            ## The fused cleaning reads the whole file, because the duplicate geometries are searched in all of it
+            if clean_raw_input:
+                cleaned_out_pth = None
+                if write_cleaned_data:
+                    cleaned_out_pth = os.path.join("data", "vector", "IACS", country_code, PRE_PROCESSED_FOLDER,
+                                                   f"GSA_{run_dict[country_code]['region_id']}_{year}.geoparquet")
+                kwargs["cleaned_out_pth"] = cleaned_out_pth
+                func = clean_check_and_harmonize_vector_data
+                memory_mb = job_scheduler.estimate_job_memory_mb(iacs_pth)
+            ## In chunked mode, the peak memory of a job is bounded by the batch memory budget
+            elif chunked:
+                kwargs["remove_geometry_duplicates"] = remove_geometry_duplicates
+                kwargs["memory_budget_mb"] = memory_budget_mb
+                func = unify_column_names_in_vector_data_chunked
+                memory_mb = memory_budget_mb
+            else:
+                kwargs["remove_geometry_duplicates"] = remove_geometry_duplicates
+                func = unify_column_names_in_vector_data
+                memory_mb = job_scheduler.estimate_job_memory_mb(iacs_pth)
+
+            ## Skip files that did not change since the last successful run
+            job_fingerprints = get_job_fingerprints(kwargs)
+            cleaned_out_missing = bool(kwargs.get("cleaned_out_pth")) and not os.path.exists(kwargs["cleaned_out_pth"])
+            if manifest and manifest.is_up_to_date(iacs_new_pth, job_fingerprints) and not cleaned_out_missing:
+                print(f"Skipping year {year} - {iacs_new_pth} is up to date")
+                continue
+
+            jobs.append({"name": f"{run_dict[country_code]['region_id']}_{year}", "func": func, "kwargs": kwargs,
+                         "memory_mb": memory_mb, "fingerprints": job_fingerprints})
+
+    return jobs
+
 def main():
     stime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
     os.chdir(WD)
 
+    ## Start the script with --profile (or set IACS_PROFILE=1) to print and save the time spent in each step
+    profiling.enable_from_args()
+
     ## Input for geodata harmonization (in some cases, e.g. France or Portugal, some csv file have also to
     ## be harmonized. See below)
 
@@ -512,141 +1022,23 @@ def main():
             "ignore_files_descr": "pre_processed_data"
             }
 
-    ## Loop over country codes in dict for processing
-    for country_code in run_dict:
-        switch = run_dict[country_code].get("switch", "off").lower()
-        if switch != "on":
-            continue
-
-        ## Derive input variables for function
-        region_id = run_dict[country_code]["region_id"] # country_code.replace(r"/", "_")
-        col_translate_pth = os.path.join("data", "tables", "column_name_translations",
-                                         f"{region_id}_column_name_translation.csv")
-        crop_class_pth = os.path.join(CROP_CLASSIFICATION_FOLDER,
-                                      f"{region_id}_crop_classification_final.csv")
-
-        ## If the file naming of the columns translation and the crop classificaiton table deviate, then correct them
-        if "col_translate_pth" in run_dict[country_code]:
-            col_translate_pth = run_dict[country_code]["col_translate_pth"]
-        if "crop_class_pth" in run_dict[country_code]:
-            crop_class_pth = run_dict[country_code]["crop_class_pth"]
-
-        ## Get years that should be skipped
-        if "skip_years" in run_dict[country_code]:
-            skip_years = run_dict[country_code]["skip_years"]
-        else:
-            skip_years = []
-
-        ## Get files that should be skipped
-        if "ignore_files_descr" in run_dict[country_code]:
-            ignore_files_descr = run_dict[country_code]["ignore_files_descr"]
-        else:
-            ignore_files_descr = None
-
-        if "file_year_encoding" in run_dict[country_code]:
-            file_year_encoding = run_dict[country_code]["file_year_encoding"]
-        else:
-            file_year_encoding = None
-
-        ## Get list of all available files
-        in_dir = os.path.join("data", "vector", "IACS", country_code)
-        iacs_files = helper_functions.list_geospatial_data_in_dir(in_dir)
-
-        ## Exclude files that should be skipped
-        if ignore_files_descr:
-            iacs_files = [file for file in iacs_files if ignore_files_descr not in file]
-
-        ## Get epsg code for input files that are not correctly defined in the files, e.g. in Croatia
-        if "pre_transformation_crs" in run_dict[country_code]:
-            pre_transformation_crs = run_dict[country_code]["pre_transformation_crs"]
-        else:
-            pre_transformation_crs = None
-
-        ## Get organic dictionary if provided
-        if "organic_dict" in run_dict[country_code]:
-            organic_dict = run_dict[country_code]["organic_dict"]
-        else:
-            organic_dict = None
-
-        ## Get classify_on
-        if "classify_on" in run_dict[country_code]:
-            classify_on = run_dict[country_code]["classify_on"]
-        else:
-            classify_on = "automatic"
-
-        if "organic_dict_year" in run_dict[country_code]:
-            organic_dict_year = run_dict[country_code]["organic_dict_year"]
-        else:
-            organic_dict_year = None
-
-        if "classify_on_year_dict" in run_dict[country_code]:
-            classify_on_year_dict = run_dict[country_code]["classify_on_year_dict"]
-        else:
-            classify_on_year_dict = None
-
-        if "remove_geometry_duplicates" in run_dict[country_code]:
-            remove_geometry_duplicates = run_dict[country_code]["remove_geometry_duplicates"]
-        else:
-            remove_geometry_duplicates = False
-
-        ## Temporary, if you want to subset the list.
-        # iacs_files = iacs_files[12:13]
-
-        ## Loop over files to unify columns and classify crops
-        for i, iacs_pth in enumerate(iacs_files):
-            print(f"{i + 1}/{len(iacs_files)} - Processing - {iacs_pth}")
-            year = helper_functions.get_year_from_path(iacs_pth)
-            if int(year) in skip_years:
-                print(f"Skipping year {year}")
-                continue
+    ## Create one job per region and year and run them either one after another or in parallel
+    ## Compile the translation and classification tables that changed, so that all jobs can read them from the store
+    lookup_store.compile_lookup_store()
 
-            ## First create out path with original region ID
-            ## We have to fetch the region ID for safety reason again, as it might have been overwritten in
-            region_id = run_dict[country_code]["region_id"]
-            iacs_new_pth = os.path.join("data", "vector", "IACS_EU_Land", country_code,
-                                        f"GSA-{region_id}-{year}.geoparquet")
+    ## Files whose inputs did not change since the last successful run are skipped
+    manifest = fingerprints.RebuildManifest(MANIFEST_PTH)
+    jobs = get_vector_harmonization_jobs(run_dict, manifest=None if FORCE_REBUILD else manifest)
 
-            ## If an overwrite for the column translation is provided, it means that the columns in the
-            ## column name translation table do not use the original region ID but another one
-            if "col_transl_descr_overwrite" in run_dict[country_code]:
-                region_id = run_dict[country_code]["col_transl_descr_overwrite"]
+    def update_manifest(job, result):
+        if result["status"] == "success":
+            manifest.update(job["kwargs"]["iacs_new_pth"], job["fingerprints"])
 
-            ## If a file encoding dictionary for specific years is provided, fetch the current version here
-            if file_year_encoding:
-                if year in file_year_encoding:
-                    file_encoding = file_year_encoding[year]
-                else:
-                    file_encoding = run_dict[country_code]["file_encoding"]
-            else:
-                file_encoding = run_dict[country_code]["file_encoding"]
-
-            ## If a organic dictionary for specific years is provided, fetch the current version here
-            if organic_dict_year:
-                if year in organic_dict_year:
-                    organic_dict = organic_dict_year[year]
-                else:
-                    organic_dict = None
-
-            ## If the users wants to force the column that should be used for the classificatin, fetch it here
-            if classify_on_year_dict:
-                if year in classify_on_year_dict:
-                    classify_on = classify_on_year_dict[year]
-                else:
-                    classify_on = "automatic"
-
-            unify_column_names_in_vector_data(
-                iacs_pth=iacs_pth,
-                file_encoding=file_encoding,
-                col_translate_pth=col_translate_pth,
-                crop_class_pth=crop_class_pth,
-                region_id=region_id,
-                year=year,
-                iacs_new_pth=iacs_new_pth,
-                pre_transformation_crs=pre_transformation_crs,
-                organic_dict=organic_dict,
-                classify_on=classify_on,
-                remove_geometry_duplicates=remove_geometry_duplicates
-            )
+    if N_WORKERS > 1:
+        job_scheduler.run_jobs_in_pool(jobs, max_workers=N_WORKERS, memory_budget_mb=MEMORY_BUDGET_MB,
+                                       log_dir=LOG_FOLDER, on_job_done=update_manifest)
+    else:
+        job_scheduler.run_jobs_sequentially(jobs, on_job_done=update_manifest)
 
     ####################################################################################################################
 
@@ -958,6 +1350,8 @@ def main():
                 iacs_animal_new_pth=csv_new_pth
             )
 
+    geodata_reader.print_read_timings()
+
     etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
     print("end: " + etime)
@@ -18,18 +18,83 @@ from os.path import dirname, abspath
 # os.environ['GDAL_DATA'] = os.path.join(f'{os.sep}'.join(sys.executable.split(os.sep)[:-1]), 'Library', 'share', 'gdal')
 import time
 import pandas as pd
-import geopandas as gpd
 import glob
 
 from my_utils import helper_functions
+from my_utils import job_scheduler
+from my_utils import validity_check
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(abspath(__file__)))
 os.chdir(WD)
 
+LOG_FOLDER = os.path.join("data", "vector", "IACS_EU_Land", "logs", "c4")
+
+## Number of parallel processes. Each region is checked in its own process. With 1, all regions are checked one after
+## another in this process. With more workers, each region writes its prints to a log file in LOG_FOLDER.
+N_WORKERS = 1
+
 # ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
 
+def check_region(country_code, skip_years=None):
+    """
+    Checks the harmonized files of a region for crops that were not classified and for crop codes that have more than
+    one crop name. Only the crop and HCAT columns are read (see my_utils/validity_check.py).
+
+    :param country_code: Country or country and subdivision abbreviation (e.g. "DK" or "DE/THU").
+    :param skip_years: List of years that should not be checked.
+    """
+    skip_years = skip_years or []
+
+    ## Derive input variables for processing
+    region_id = country_code.replace(r"/", "_")
+    in_dir = os.path.join("data", "vector", "IACS_EU_Land", country_code)
+    print(region_id)
+
+    file_list = glob.glob(os.path.join(in_dir, "*"))
+
+    df_lst = []
+
+    for file_pth in file_list:
+        year = helper_functions.get_year_from_path(file_pth)
+        print(year)
+        if int(year) in skip_years:
+            print(f"Skipping year {year}")
+            continue
+
+        if "animals" in file_pth:
+            continue
+
+        if "misses.csv" in file_pth:
+            continue
+
+        root, ext = os.path.splitext(file_pth)
+        if ext not in [".csv", ".geoparquet"]:
+            continue
+
+        num_na, df_na, duplicate_entries_df = validity_check.check_file(file_pth)
+
+        print(f"Number of rows with NA in EC_hcat_n: {num_na}")
+        if num_na > 0:
+            df_lst.append(df_na)
+        else:
+            print("No missed crops")
+
+        ## Check for duplicate crop code - crop name combinations in original data
+        ## we had a mistake in script c3 that caused that in some cases.
+        out_pth = os.path.join("data", "vector", "IACS_EU_Land", country_code,
+                               f"duplicate_code-name_combs_{region_id}_{year}.csv")
+        if not duplicate_entries_df.empty:
+            print("Duplicate original crops detected.")
+            duplicate_entries_df.to_csv(out_pth, index=False)
+
+    if len(df_lst) > 0:
+        df_out = pd.concat(df_lst)
+        df_out.drop_duplicates(subset=["crop_code", "crop_name"], inplace=True)
+        out_pth = os.path.join("data", "vector", "IACS_EU_Land", f"missed_crops_{region_id}.csv")
+        df_out[["crop_code",  "crop_name"]].to_csv(out_pth, index=False)
+
 def main():
     stime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
@@ -78,84 +143,29 @@ def main():
     ES_districts = pd.read_csv(os.path.join("data", "vector", "IACS", "ES", "region_code.txt"))
     ES_districts = list(ES_districts["code"])
     for district in ES_districts:
-        run_dict[f"ES/{district}"] = {"switch": "off"},
+        run_dict[f"ES/{district}"] = {"switch": "off"}
 
-    ## Loop over country codes in dict for processing
+    ## Derive the jobs of all regions that are switched on
+    jobs = []
     for country_code in run_dict:
         switch = run_dict[country_code].get("switch", "off").lower()
         if switch != "on":
             continue
 
-        ## Derive input variables for processing
-        region_id = country_code.replace(r"/", "_")
-        in_dir = os.path.join("data", "vector", "IACS_EU_Land", country_code)
-        print(region_id)
-
         ## Get years that should be skipped
         if "skip_years" in run_dict[country_code]:
             skip_years = run_dict[country_code]["skip_years"]
         else:
             skip_years = []
 
-        file_list = glob.glob(os.path.join(in_dir, "*"))
-
-        df_lst = []
-
-        for file_pth in file_list:
-            year = helper_functions.get_year_from_path(file_pth)
-            print(year)
-            if int(year) in skip_years:
-                print(f"Skipping year {year}")
-                continue
-
-            if "animals" in file_pth:
-                continue
-
-            if "misses.csv" in file_pth:
-                continue
-
-            root, ext = os.path.splitext(file_pth)
-
-            if ext == ".csv":
-                df = pd.read_csv(file_pth)
-            elif ext == ".geoparquet":
-                df = gpd.read_parquet(file_pth)
-
-            print(f"Columns in {file_pth}: {df.columns.tolist()}") ## ADDED
-
-            df_na = df.loc[df["EC_hcat_n"].isna()].copy()
-            print(f"Number of rows with NA in EC_hcat_n: {len(df_na)}")
-            if len(df_na) > 0:
-                cols = ["crop_code", "crop_name", "EC_trans_n", "EC_hcat_n", "EC_hcat_c"]
-                df_na.drop_duplicates(subset=cols, inplace=True)
-
-                df_lst.append(df_na)
-            else:
-                print("No missed crops")
-
-            ## Check for duplicate crop code - crop name combinations in original data
-            ## we had a mistake in script c3 that caused that in some cases.
-            df_dupl = df.drop_duplicates(subset=["crop_code", "crop_name"]).copy()
-
-            ## Group by crop_code and count unique crop_name entries
-            duplicates = df_dupl.groupby('crop_code')['crop_name'].nunique().reset_index()
-
-            ## Filter for crop_codes with more than one unique crop_name
-            duplicate_codes = duplicates[duplicates['crop_name'] > 1]['crop_code'].copy()
-
-            ## Filter original DataFrame to include only those duplicate crop_codes
-            duplicate_entries_df = df_dupl[df_dupl['crop_code'].isin(duplicate_codes)].copy()
-            duplicate_entries_df.sort_values(by="crop_code", inplace=True)
-            out_pth = fr"data\vector\IACS_EU_Land\{country_code}\duplicate_code-name_combs_{region_id}_{year}.csv"
-            if not duplicate_entries_df.empty:
-                print("Duplicate original crops detected.")
-                duplicate_entries_df.to_csv(out_pth, index=False)
+        jobs.append({"name": country_code.replace(r"/", "_"), "func": check_region,
+                     "kwargs": dict(country_code=country_code, skip_years=skip_years)})
 
-        if len(df_lst) > 0:
-            df_out = pd.concat(df_lst)
-            df_out.drop_duplicates(subset=["crop_code", "crop_name"], inplace=True)
-            out_pth = os.path.join("data", "vector", "IACS_EU_Land", f"missed_crops_{region_id}.csv")
-            df_out[["crop_code",  "crop_name"]].to_csv(out_pth, index=False)
+    if N_WORKERS > 1:
+        job_scheduler.run_jobs_in_pool(jobs, max_workers=N_WORKERS, log_dir=LOG_FOLDER)
+    else:
+        for job in jobs:
+            job["func"](**job["kwargs"])
 
     etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
     print("start: " + stime)
@@ -17,9 +17,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import glob
-import geopandas as gpd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
+from my_utils import stage_columns
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -135,7 +136,9 @@ def count_number_features_per_year(region_id, out_pth):
         root, ext = os.path.splitext(in_pth)
         csv_pth = root + ".csv"
 
-        gdf = gpd.read_parquet(in_pth)
+        ## Only the columns that are counted are read, the geometries are not needed
+        columns = stage_columns.get_stage_columns("d1_count_number_features_per_year", in_pth)
+        gdf = geodata_reader.read_geodata(in_pth, columns=columns, read_geometry=False)
 
         ## Count features and if companion csv file exists, also count these fields
         num_feat_csv = 0
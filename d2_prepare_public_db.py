@@ -9,7 +9,6 @@ import os
 from os.path import dirname, abspath
 # os.environ['GDAL_DATA'] = os.path.join(f'{os.sep}'.join(sys.executable.split(os.sep)[:-1]), 'Library', 'share', 'gdal')
 import time
-import geopandas as gpd
 import glob
 import shutil
 import pandas as pd
@@ -20,6 +19,7 @@ from collections import defaultdict
 from pathlib import Path
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -122,7 +122,7 @@ def main():
 
                 ## Open file and copy with relevant columns
                 in_pth = os.path.join("data", "vector", "IACS_EU_Land", country_code, f"GSA-{region_id}-{year}.geoparquet")
-                gdf = gpd.read_parquet(in_pth)
+                gdf = geodata_reader.read_geodata(in_pth, columns=cols)
                 gdf_out = gdf[cols].copy()
 
                 ## Copy to public database folder
@@ -0,0 +1,301 @@
+# Author: Clemens Jaenicke
+# github repository: https://github.com/clejae/europe_land_iacs_prep
+
+# This script is optional and exports all harmonized GSA files from data\vector\IACS_EU_Land\ into one partitioned
+# dataset (hive layout country=XX/region=XX_XXX/year=XXXX) in:
+# data\vector\IACS_EU_Land_partitioned\.
+# All partitions share one schema (see CANONICAL_TYPES), so that the dataset can be scanned as a whole with
+# pyarrow.dataset, e.g. to select all maize fields of 2021 without opening the files of all other years.
+
+# Additionally, a catalog (_catalog.csv in the dataset folder) is written with the number of rows, the bounding box,
+# a hash of the schema and the size in bytes of each partition, and the schema of all partitions together is written to
+# _common_metadata. Only partitions whose source file changed since the last export are written again.
+
+# ------------------------------------------ LOAD PACKAGES ---------------------------------------------------#
+import os
+from os.path import dirname, abspath
+import time
+import glob
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from my_utils import helper_functions
+from my_utils import fingerprints
+from my_utils import geoparquet_writer
+
+# ------------------------------------------ USER VARIABLES ------------------------------------------------#
+# Get parent directory of current directory where script is located
+WD = dirname(dirname(abspath(__file__)))
+os.chdir(WD)
+
+IN_FOLDER = os.path.join("data", "vector", "IACS_EU_Land")
+DATASET_FOLDER = os.path.join("data", "vector", "IACS_EU_Land_partitioned")
+CATALOG_NAME = "_catalog.csv"
+## Parquet file without rows that holds the unified schema of all partitions, so that reading the dataset does not need
+## to open the footers of all partitions
+SCHEMA_NAME = "_common_metadata"
+PART_NAME = "part-0.parquet"
+
+## Types of the harmonized columns in all partitions. Crop codes differ between countries (numbers, letters),
+## therefore they are stored as strings. Columns that are not listed here are stored as strings as well.
+CANONICAL_TYPES = {
+    "field_id": "str",
+    "farm_id": "str",
+    "crop_code": "str",
+    "crop_name": "str",
+    "EC_trans_n": "str",
+    "EC_hcat_n": "str",
+    "EC_hcat_c": "Int64",
+    "organic": "Int64",
+    "field_size": "float64"
+}
+
+# ------------------------------------------ DEFINE FUNCTIONS ------------------------------------------------#
+def list_harmonized_files(in_folder):
+    """
+    Lists all harmonized GSA files and derives the partition keys from the file names.
+
+    :param in_folder: Folder with the harmonized data (IACS_EU_Land).
+    :return: DataFrame with the columns source_pth, country, region and year.
+    """
+    pattern = re.compile(r"^GSA-(?P<region>.+)-(?P<year>\d{4})\.geoparquet$")
+    rows = []
+    for pth in sorted(glob.glob(os.path.join(in_folder, "**", "GSA-*.geoparquet"), recursive=True)):
+        match = pattern.match(os.path.basename(pth))
+        if not match:
+            print(f"Could not derive region and year from {pth}. Skipping.")
+            continue
+        region = match.group("region")
+        rows.append({"source_pth": pth, "country": region.split("_")[0], "region": region,
+                     "year": int(match.group("year"))})
+
+    return pd.DataFrame(rows, columns=["source_pth", "country", "region", "year"])
+
+
+def get_partition_folder(dataset_folder, country, region, year):
+    return os.path.join(dataset_folder, f"country={country}", f"region={region}", f"year={year}")
+
+
+def to_canonical_schema(gdf):
+    """
+    Casts the harmonized columns to the types in CANONICAL_TYPES. Other columns are cast to strings. Empty strings,
+    which c3 uses for columns that are not available in a region, become missing values. Float columns with only
+    whole numbers (e.g. integer crop codes with missing values) are written as integers, e.g. "115" instead of "115.0",
+    so that the same code is the same string in all partitions.
+    """
+    for col in gdf.columns:
+        if col == gdf.geometry.name:
+            continue
+        dtype = CANONICAL_TYPES.get(col, "str")
+        if dtype == "str":
+            values = gdf[col]
+            if pd.api.types.is_float_dtype(values):
+                numbers = values.dropna()
+                if np.isfinite(numbers).all() and (numbers == np.floor(numbers)).all():
+                    values = values.astype("Int64")
+            gdf[col] = values.astype("string")
+        else:
+            values = gdf[col].replace("", np.nan)
+            gdf[col] = pd.to_numeric(values, errors="coerce").astype(dtype)
+
+    return gdf
+
+
+def get_schema_hash(pth):
+    """Returns a short hash of the Arrow schema (column names and types) of a parquet file."""
+    schema = pq.read_schema(pth).remove_metadata()
+    schema_str = ";".join(f"{field.name}:{field.type}" for field in schema)
+
+    return hashlib.sha256(schema_str.encode("utf-8")).hexdigest()[:16]
+
+
+def export_partition(source_pth, partition_folder):
+    """
+    Writes one harmonized GSA file as partition. The partition keys are only stored in the folder names.
+
+    :return: Dictionary with the catalog information of the partition.
+    """
+    gdf = gpd.read_parquet(source_pth)
+    gdf = to_canonical_schema(gdf)
+
+    helper_functions.create_folder(partition_folder)
+    out_pth = os.path.join(partition_folder, PART_NAME)
+    geoparquet_writer.write_geoparquet(gdf, out_pth)
+
+    if len(gdf) > 0:
+        xmin, ymin, xmax, ymax = gdf.total_bounds
+    else:
+        xmin, ymin, xmax, ymax = [np.nan] * 4
+
+    return {"num_rows": len(gdf), "xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax,
+            "schema_hash": get_schema_hash(out_pth), "num_bytes": os.path.getsize(out_pth),
+            "crs": gdf.crs.to_string() if gdf.crs else None}
+
+
+def export_partitioned_dataset(in_folder, dataset_folder, force=False):
+    """
+    Exports all harmonized GSA files into a hive-partitioned dataset and writes the catalog. Partitions whose source
+    file did not change (size and modification time) since the last export are kept. Partitions whose source file was
+    deleted are removed.
+
+    :param in_folder: Folder with the harmonized data (IACS_EU_Land).
+    :param dataset_folder: Output folder of the partitioned dataset.
+    :param force: If True, all partitions are written again.
+    :return: Catalog as DataFrame.
+    """
+    files_df = list_harmonized_files(in_folder)
+    catalog_pth = os.path.join(dataset_folder, CATALOG_NAME)
+    if os.path.exists(catalog_pth) and not force:
+        old_catalog = pd.read_csv(catalog_pth).set_index("partition")
+    else:
+        old_catalog = pd.DataFrame()
+
+    ## Regions can appear in multiple folders (e.g. FR/FR and FR subregions). Only the first file is used.
+    duplicates = files_df.duplicated(subset=["region", "year"], keep="first")
+    for pth in files_df.loc[duplicates, "source_pth"]:
+        print(f"Partition of {pth} already exists. Skipping.")
+    files_df = files_df.loc[~duplicates]
+
+    rows = []
+    for i, row in enumerate(files_df.itertuples()):
+        partition_folder = get_partition_folder(dataset_folder, row.country, row.region, row.year)
+        partition = os.path.relpath(partition_folder, dataset_folder).replace(os.sep, "/")
+        source = fingerprints.get_file_fingerprint(row.source_pth)
+
+        if partition in old_catalog.index and os.path.exists(os.path.join(partition_folder, PART_NAME)):
+            old = old_catalog.loc[partition]
+            if old["source_size"] == source["size"] and old["source_mtime_ns"] == source["mtime_ns"]:
+                rows.append(old.to_dict() | {"partition": partition})
+                continue
+
+        print(f"{i + 1}/{len(files_df)} - Exporting {row.source_pth} to {partition}")
+        entry = export_partition(row.source_pth, partition_folder)
+        rows.append({"partition": partition, "country": row.country, "region": row.region, "year": row.year} |
+                    entry | {"source_pth": row.source_pth, "source_size": source["size"],
+                             "source_mtime_ns": source["mtime_ns"]})
+
+    catalog = pd.DataFrame(rows)
+
+    ## Remove partitions whose source file does not exist anymore
+    new_partitions = set(catalog["partition"]) if len(catalog) > 0 else set()
+    for partition in old_catalog.index:
+        if partition not in new_partitions:
+            part_pth = os.path.join(dataset_folder, partition, PART_NAME)
+            if os.path.exists(part_pth):
+                print(f"Removing partition {partition}, because its source file does not exist anymore.")
+                os.remove(part_pth)
+
+    helper_functions.create_folder(dataset_folder)
+    if len(catalog) > 0:
+        catalog = catalog[["partition", "country", "region", "year", "num_rows", "xmin", "ymin", "xmax", "ymax",
+                           "crs", "schema_hash", "num_bytes", "source_pth", "source_size", "source_mtime_ns"]]
+    catalog.to_csv(catalog_pth, index=False)
+    write_common_schema(catalog, dataset_folder)
+
+    print(f"{len(catalog)} partitions with {catalog['num_rows'].sum() if len(catalog) else 0} rows in the dataset.")
+    if len(catalog) > 0 and catalog["schema_hash"].nunique() > 1:
+        print(f"The partitions have {catalog['schema_hash'].nunique()} different schemas (e.g. because some regions "
+              f"have additional columns). Missing columns are read as missing values.")
+
+    return catalog
+
+
+def write_common_schema(catalog, dataset_folder):
+    """
+    Writes the unified schema of all partitions to SCHEMA_NAME in the dataset folder. Only one partition per schema
+    hash of the catalog is opened.
+    """
+    schema_pth = os.path.join(dataset_folder, SCHEMA_NAME)
+    if len(catalog) == 0:
+        if os.path.exists(schema_pth):
+            os.remove(schema_pth)
+        return
+
+    partitions = catalog.drop_duplicates(subset="schema_hash")["partition"]
+    schemas = [pq.read_schema(os.path.join(dataset_folder, partition, PART_NAME)).remove_metadata()
+               for partition in partitions]
+    pq.write_metadata(pa.unify_schemas(schemas), schema_pth)
+
+
+def read_partitioned_dataset(dataset_folder, filter_expression=None, columns=None, bbox=None):
+    """
+    Reads a subset of the partitioned dataset. Filters on the partition keys (country, region, year) only open the
+    files of the matching partitions. If a bounding box is provided, the catalog is used to skip all partitions
+    outside of the box and the bbox column is used to skip row groups within the partitions.
+
+    Example: all maize fields in 2021
+    read_partitioned_dataset(DATASET_FOLDER, (ds.field("year") == 2021) & (ds.field("EC_hcat_n") == "grain_maize_corn_popcorn"))
+
+    :param dataset_folder: Folder of the partitioned dataset.
+    :param filter_expression: pyarrow.dataset expression.
+    :param columns: List of columns that should be read. The geometry is always read.
+    :param bbox: Tuple (xmin, ymin, xmax, ymax) in the crs of the data.
+    :return: GeoDataFrame.
+    """
+    catalog = pd.read_csv(os.path.join(dataset_folder, CATALOG_NAME))
+    crs = catalog["crs"].dropna().iloc[0] if catalog["crs"].notna().any() else None
+    if bbox is not None:
+        xmin, ymin, xmax, ymax = bbox
+        catalog = catalog.loc[(catalog["xmax"] >= xmin) & (catalog["xmin"] <= xmax) &
+                              (catalog["ymax"] >= ymin) & (catalog["ymin"] <= ymax)]
+    files = [os.path.join(dataset_folder, partition, PART_NAME) for partition in catalog["partition"]]
+    if not files:
+        print("No partitions in the bounding box.")
+        return gpd.GeoDataFrame(geometry=gpd.GeoSeries([], crs=crs))
+
+    ## The schema of all partitions together. Columns that are missing in some partitions are read as missing values.
+    ## With this schema, the dataset does not open the files to find it out and only the files of the partitions that
+    ## match the filters on the partition keys are opened.
+    partition_schema = pa.schema([("country", pa.string()), ("region", pa.string()), ("year", pa.int32())])
+    schema_pth = os.path.join(dataset_folder, SCHEMA_NAME)
+    if os.path.exists(schema_pth):
+        file_schemas = [pq.read_schema(schema_pth)]
+    else:
+        print(f"{SCHEMA_NAME} not found. Reading the schemas of all partitions. Export the dataset again to create it.")
+        file_schemas = [pq.read_schema(f).remove_metadata() for f in files]
+    schema = pa.unify_schemas(file_schemas + [partition_schema])
+    dataset = ds.dataset(files, schema=schema, format="parquet",
+                         partitioning=ds.partitioning(partition_schema, flavor="hive"),
+                         partition_base_dir=dataset_folder)
+
+    if bbox is not None:
+        bbox_filter = ((ds.field("bbox", "xmax") >= xmin) & (ds.field("bbox", "xmin") <= xmax) &
+                       (ds.field("bbox", "ymax") >= ymin) & (ds.field("bbox", "ymin") <= ymax))
+        filter_expression = bbox_filter if filter_expression is None else filter_expression & bbox_filter
+
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + ["geometry"]))
+    table = dataset.to_table(filter=filter_expression, columns=columns)
+    if "bbox" in table.column_names:
+        table = table.drop_columns(["bbox"])
+
+    df = table.to_pandas()
+    geometry = gpd.GeoSeries.from_wkb(df.pop("geometry"), index=df.index)
+
+    return gpd.GeoDataFrame(df, geometry=geometry, crs=crs)
+
+
+def main():
+    stime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
+    print("start: " + stime)
+    os.chdir(WD)
+
+    export_partitioned_dataset(in_folder=IN_FOLDER, dataset_folder=DATASET_FOLDER)
+
+    ## Example query: all maize fields in 2021
+    # maize = read_partitioned_dataset(DATASET_FOLDER,
+    #                                  (ds.field("year") == 2021) & (ds.field("EC_hcat_n") == "grain_maize_corn_popcorn"))
+
+    etime = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
+    print("start: " + stime)
+    print("end: " + etime)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import os
+import json
+
+
+def write_atomic(out_pth, write_func):
+    """
+    Writes a file to a temporary path next to it and moves it to the final path afterwards, so that other processes
+    never see a partially written file. The temporary file is removed if the writing fails.
+
+    :param out_pth: Path of the file.
+    :param write_func: Function that writes the file to the path it gets as only argument.
+    """
+    folder = os.path.dirname(out_pth)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_pth = f"{out_pth}.{os.getpid()}.tmp"
+    try:
+        write_func(tmp_pth)
+    except BaseException:
+        if os.path.exists(tmp_pth):
+            os.remove(tmp_pth)
+        raise
+    os.replace(tmp_pth, out_pth)
+
+
+def save_json(obj, out_pth):
+    """Writes an object as json file (see write_atomic)."""
+    def write(tmp_pth):
+        with open(tmp_pth, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=1, sort_keys=True, ensure_ascii=False)
+
+    write_atomic(out_pth, write)
+
+
+def load_json(pth, default=None):
+    """
+    Reads a json file.
+
+    :param pth: Path of the file. None returns the default.
+    :param default: Returned if the file does not exist or cannot be parsed (e.g. if it was written by an older
+        version without write_atomic).
+    :return: Content of the file or the default.
+    """
+    if not pth or not os.path.exists(pth):
+        return default
+    try:
+        with open(pth, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return default
@@ -0,0 +1,452 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+from my_utils import geoparquet_writer
+from my_utils import geometry_dedup
+from my_utils import field_ids
+from my_utils import encoding_detection
+from my_utils import geodata_reader
+
+## Rough factor between the raw (Arrow) size of a batch and the peak memory that is needed while a batch runs
+## through rename, dedup, classification and reprojection (pandas copies, shapely objects, merge results).
+MEMORY_OVERHEAD_FACTOR = 8
+MIN_BATCH_ROWS = 1_000
+MAX_BATCH_ROWS = 2_000_000
+
+## Geometry type names as used in the geoparquet metadata, indexed by the shapely type id
+GEOMETRY_TYPE_NAMES = {0: "Point", 1: "LineString", 2: "LineString", 3: "Polygon", 4: "MultiPoint",
+                       5: "MultiLineString", 6: "MultiPolygon", 7: "GeometryCollection"}
+
+
+def estimate_batch_size(filepath, memory_budget_mb, encoding=None):
+    """
+    Estimates how many rows can be processed per batch so that the peak memory of a batch stays within the budget.
+
+    For (geo)parquet files the uncompressed size per row is taken from the file metadata. For OGR formats a small
+    probe page is read.
+
+    :param filepath: Path to the input geodata.
+    :param memory_budget_mb: Peak memory that a single batch is allowed to use in megabytes.
+    :param encoding: Encoding of the input file (only used for OGR formats).
+    :return: Number of rows per batch.
+    """
+    path = Path(filepath)
+
+    if path.suffix.lower() in ['.parquet', '.geoparquet']:
+        metadata = pq.ParquetFile(filepath).metadata
+        num_rows = max(metadata.num_rows, 1)
+        total_bytes = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+        bytes_per_row = total_bytes / num_rows
+    else:
+        from pyogrio.raw import open_arrow
+
+        layer = geodata_reader.get_first_layer(filepath)
+        arrow_encoding, _ = encoding_detection.get_arrow_encodings(filepath, encoding)
+        with open_arrow(filepath, layer=layer, encoding=arrow_encoding, batch_size=MIN_BATCH_ROWS,
+                        use_pyarrow=True) as (meta, reader):
+            probe = reader.read_next_batch()
+            bytes_per_row = probe.nbytes / max(probe.num_rows, 1)
+
+    budget_bytes = memory_budget_mb * 1024 * 1024
+    batch_rows = int(budget_bytes / (max(bytes_per_row, 1) * MEMORY_OVERHEAD_FACTOR))
+
+    return int(np.clip(batch_rows, MIN_BATCH_ROWS, MAX_BATCH_ROWS))
+
+
+def _wkb_batch_to_geodataframe(batch, geometry_col, crs):
+    """Turns an Arrow record batch with a WKB geometry column into a GeoDataFrame."""
+    geometry = shapely.from_wkb(batch.column(geometry_col).to_numpy(zero_copy_only=False))
+    attributes = batch.drop_columns([geometry_col]).to_pandas()
+    gdf = gpd.GeoDataFrame(attributes, geometry=gpd.GeoSeries(geometry, index=attributes.index), crs=crs)
+
+    return gdf
+
+
+def iter_geodata_batches(filepath, batch_size, encoding=None, columns=None):
+    """
+    Reads a geodata file in bounded row batches and yields them as GeoDataFrames.
+
+    Geoparquet files are read as Arrow record batches. All OGR formats (GPKG, SHP, GDB, GeoJSON) are read in feature
+    pages through the Arrow stream interface of pyogrio. Only the first layer is read.
+
+    :param filepath: Path to the input geodata.
+    :param batch_size: Maximum number of rows per batch.
+    :param encoding: Encoding of the input file (only used for OGR formats).
+    :param columns: List of attribute columns that should be read. None reads all columns.
+    :return: Generator of GeoDataFrames.
+    """
+    path = Path(filepath)
+
+    if path.suffix.lower() in ['.parquet', '.geoparquet']:
+        pf = pq.ParquetFile(filepath)
+        geo_meta = json.loads(pf.metadata.metadata[b"geo"])
+        geometry_col = geo_meta["primary_column"]
+        col_meta = geo_meta["columns"][geometry_col]
+        if col_meta.get("encoding", "WKB").upper() != "WKB":
+            raise ValueError(f"Only WKB encoded geoparquet files can be read in batches. {filepath}")
+        ## According to the geoparquet specification, a missing crs means OGC:CRS84
+        crs = col_meta.get("crs", "OGC:CRS84")
+
+        ## Covering columns (e.g. the bbox column of GeoParquet 1.1) are not part of the attributes
+        covering_cols = {path[0] for path in col_meta.get("covering", {}).get("bbox", {}).values()}
+        if columns is None:
+            columns = [name for name in pf.schema_arrow.names if name not in covering_cols]
+        else:
+            columns = [name for name in columns if name != geometry_col] + [geometry_col]
+
+        for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+            yield _wkb_batch_to_geodataframe(batch, geometry_col, crs)
+    else:
+        from pyogrio.raw import open_arrow
+
+        layer = geodata_reader.get_first_layer(filepath)
+        arrow_encoding, decode_encoding = encoding_detection.get_arrow_encodings(filepath, encoding)
+        with open_arrow(filepath, layer=layer, encoding=arrow_encoding, columns=columns, batch_size=batch_size,
+                        use_pyarrow=True) as (meta, reader):
+            geometry_col = meta["geometry_name"] or "wkb_geometry"
+            for batch in reader:
+                if batch.num_rows == 0:
+                    continue
+                batch = encoding_detection.decode_string_columns(batch, decode_encoding)
+                yield _wkb_batch_to_geodataframe(batch, geometry_col, meta["crs"])
+
+
+def iter_attribute_batches(filepath, columns, batch_size, encoding=None):
+    """
+    Reads only the given attribute columns of a geodata file (no geometries) in bounded row batches.
+
+    :param filepath: Path to the input geodata.
+    :param columns: List of column names.
+    :param batch_size: Maximum number of rows per batch.
+    :param encoding: Encoding of the input file (only used for OGR formats).
+    :return: Generator of Arrow record batches with the columns in the given order.
+    """
+    path = Path(filepath)
+
+    if path.suffix.lower() in ['.parquet', '.geoparquet']:
+        pf = pq.ParquetFile(filepath)
+        for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch
+    else:
+        from pyogrio.raw import open_arrow
+
+        layer = geodata_reader.get_first_layer(filepath)
+        arrow_encoding, decode_encoding = encoding_detection.get_arrow_encodings(filepath, encoding)
+        with open_arrow(filepath, layer=layer, encoding=arrow_encoding, columns=columns, read_geometry=False,
+                        batch_size=batch_size, use_pyarrow=True) as (meta, reader):
+            for batch in reader:
+                if batch.num_rows == 0:
+                    continue
+                yield encoding_detection.decode_string_columns(batch.select(columns), decode_encoding)
+
+
+class GeometryDuplicateFilter:
+    """
+    Removes geometry duplicates across batches. The first occurrence of a geometry (in reading order) is kept, which
+    is the same result as helper_functions.remove_geometry_duplicates on the complete file.
+
+    Duplicates within a batch are found exactly with geometry_dedup.get_geometry_ids. For the geometries of earlier
+    batches only their 128-bit keys are kept in memory (16 bytes per row).
+    """
+
+    def __init__(self):
+        self.seen_hi = np.empty(0, dtype=np.uint64)
+        self.seen_lo = np.empty(0, dtype=np.uint64)
+        self.num_removed = 0
+
+    def _is_seen(self, keys):
+        hi, lo = keys[:, 0], keys[:, 1]
+        seen = np.zeros(len(keys), dtype=bool)
+        if len(self.seen_hi) == 0:
+            return seen
+        start = np.searchsorted(self.seen_hi, hi, side="left")
+        end = np.searchsorted(self.seen_hi, hi, side="right")
+        single = end - start == 1
+        seen[single] = self.seen_lo[start[single]] == lo[single]
+        ## Several earlier keys with the same first half. This is very rare, so they are compared one by one.
+        for i in np.flatnonzero(end - start > 1):
+            seen[i] = (self.seen_lo[start[i]:end[i]] == lo[i]).any()
+        return seen
+
+    def filter(self, gdf):
+        ids, keys = geometry_dedup.get_geometry_ids(gdf.geometry, return_keys=True)
+
+        ## Duplicates within the batch
+        keep = ~geometry_dedup.get_duplicate_mask(ids)
+
+        ## Duplicates of geometries from earlier batches
+        keep &= ~self._is_seen(keys)
+
+        new_keys = keys[keep]
+        seen_hi = np.concatenate([self.seen_hi, new_keys[:, 0]])
+        seen_lo = np.concatenate([self.seen_lo, new_keys[:, 1]])
+        order = np.argsort(seen_hi, kind="stable")
+        self.seen_hi = seen_hi[order]
+        self.seen_lo = seen_lo[order]
+
+        self.num_removed += int((~keep).sum())
+
+        return gdf.loc[keep].copy()
+
+
+class FieldIdGenerator:
+    """
+    Creates unique field IDs across batches. The IDs are identical to helper_functions.create_unique_field_ids applied
+    to the complete file, because the occurrence counter of each coordinate pair is carried over between batches.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def assign(self, geometry):
+        xs, ys = field_ids.get_representative_coordinates(geometry)
+
+        ## Pack both coordinates into one integer key
+        keys = (xs << 32) | (ys & 0xFFFFFFFF)
+
+        ## Occurrences of the coordinates in previous batches
+        prev_counts = np.zeros(len(keys), dtype=np.int64)
+        if len(self.keys) > 0:
+            pos = np.searchsorted(self.keys, keys)
+            pos[pos == len(self.keys)] = 0
+            found = self.keys[pos] == keys
+            prev_counts[found] = self.counts[pos[found]]
+
+        counts = field_ids.get_occurrence_counts(xs, ys) + prev_counts
+
+        ## Update the counter with the highest count per key
+        batch_max = pd.Series(counts).groupby(keys).max()
+        all_counts = pd.concat([pd.Series(self.counts, index=self.keys), batch_max])
+        all_counts = all_counts.groupby(level=0).max()
+        self.keys = all_counts.index.to_numpy(dtype=np.int64)
+        self.counts = all_counts.to_numpy(dtype=np.int64)
+
+        return field_ids.render_field_ids(xs, ys, counts, index=geometry.index)
+
+
+class GeoParquetBatchWriter:
+    """
+    Appends GeoDataFrames batch by batch to a single geoparquet file. The geoparquet metadata (crs, geometry types,
+    bbox) are collected over all batches and written when the writer is closed.
+
+    The schema of the file is defined by the first batch. Later batches are cast to that schema. Columns that have no
+    type in the first batch (only missing values) are written as strings.
+
+    Compression, row groups, dictionary encoding and the bbox covering column are the same as in
+    geoparquet_writer.write_geoparquet. With a spatial sort, the rows are sorted over the whole file, not only within
+    each batch: each batch is sorted and written as a temporary run file next to the output (sort keys over the fixed
+    extent of geoparquet_writer.get_sort_extent, so that they can be compared between batches) and the runs are merged
+    into the output when the writer is closed. The merge holds about one batch in memory.
+
+    The file is written to a temporary path and only moved to out_pth when the writer is closed successfully. If the
+    with block raises an exception (or abort is called), no output is written.
+    """
+    ## Column with the sort key in the run files
+    SORT_KEY = "__sort_key"
+
+    def __init__(self, out_pth, compression=geoparquet_writer.COMPRESSION,
+                 compression_level=geoparquet_writer.COMPRESSION_LEVEL, row_group_size=geoparquet_writer.ROW_GROUP_SIZE,
+                 dictionary_columns=geoparquet_writer.DICTIONARY_COLUMNS, spatial_sort=geoparquet_writer.SPATIAL_SORT,
+                 write_bbox=True):
+        self.out_pth = out_pth
+        self.tmp_pth = f"{out_pth}.tmp"
+        self.aborted = False
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_size = row_group_size
+        self.dictionary_columns = dictionary_columns
+        self.spatial_sort = spatial_sort
+        self.write_bbox = write_bbox
+        self.writer = None
+        self.schema = None
+        self.crs = None
+        self.geometry_types = set()
+        self.bounds = None
+        self.num_rows = 0
+        self.run_folder = f"{out_pth}.runs"
+        self.run_pths = []
+        self.max_batch_rows = 0
+        self.sort_extent = geoparquet_writer.get_sort_extent() if spatial_sort else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def _to_arrow(self, gdf):
+        geometry_col = gdf.geometry.name
+        arrays = []
+        names = []
+        for col in gdf.columns:
+            if col == geometry_col:
+                arrays.append(pa.array(shapely.to_wkb(gdf[col].values), type=pa.binary()))
+            else:
+                arrays.append(pa.array(gdf[col], from_pandas=True))
+            names.append(col)
+
+        if self.write_bbox:
+            arrays.append(geoparquet_writer.get_bbox_array(gdf.geometry.values))
+            names.append("bbox")
+
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def _open_writer(self):
+        options = geoparquet_writer.get_parquet_options(self.schema.names, compression=self.compression,
+                                                        compression_level=self.compression_level,
+                                                        dictionary_columns=self.dictionary_columns)
+        self.writer = pq.ParquetWriter(self.tmp_pth, self.schema, **options)
+
+    def write(self, gdf):
+        if len(gdf) == 0:
+            return
+
+        keys = None
+        if self.spatial_sort:
+            keys = geoparquet_writer.get_spatial_sort_key(gdf.geometry, method=self.spatial_sort,
+                                                          total_bounds=self.sort_extent)
+            order = np.argsort(keys, kind="stable")
+            gdf = gdf.iloc[order].reset_index(drop=True)
+            keys = keys[order]
+        table = self._to_arrow(gdf)
+
+        if self.schema is None:
+            fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+            self.schema = pa.schema(fields)
+            self.crs = gdf.crs
+        table = table.select(self.schema.names).cast(self.schema)
+
+        if keys is None:
+            if self.writer is None:
+                self._open_writer()
+            self.writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            ## Sorted run that is merged into the output when the writer is closed
+            if not self.run_pths:
+                self._remove_runs()
+                os.makedirs(self.run_folder)
+            run_pth = os.path.join(self.run_folder, f"run-{len(self.run_pths)}.parquet")
+            table = table.append_column(self.SORT_KEY, pa.array(keys, type=pa.int64()))
+            pq.write_table(table, run_pth, compression="lz4")
+            self.run_pths.append(run_pth)
+            self.max_batch_rows = max(self.max_batch_rows, len(table))
+
+        ## Collect information for the geo metadata
+        geometry = gdf.geometry.values
+        type_ids = np.unique(shapely.get_type_id(geometry[~shapely.is_missing(geometry)]))
+        self.geometry_types.update(GEOMETRY_TYPE_NAMES[i] for i in type_ids if i >= 0)
+        bounds = shapely.total_bounds(geometry)
+        if not np.isnan(bounds).any():
+            if self.bounds is None:
+                self.bounds = bounds
+            else:
+                self.bounds = np.array([min(self.bounds[0], bounds[0]), min(self.bounds[1], bounds[1]),
+                                        max(self.bounds[2], bounds[2]), max(self.bounds[3], bounds[3])])
+        self.num_rows += len(gdf)
+
+    def _iter_merged_runs(self):
+        """
+        Merges the sorted run files into tables that are sorted by the sort key. From each run, only a slice of
+        about max_batch_rows / number of runs rows is held in memory. In each step, all rows up to the smallest last
+        key of the slices of the unfinished runs are emitted, because no later row of any run can have a smaller key.
+        """
+        slice_rows = max(MIN_BATCH_ROWS, self.max_batch_rows // len(self.run_pths))
+        iterators = [pq.ParquetFile(pth).iter_batches(batch_size=slice_rows) for pth in self.run_pths]
+        buffers = [None] * len(iterators)
+        finished = [False] * len(iterators)
+
+        while True:
+            for i, iterator in enumerate(iterators):
+                while not finished[i] and (buffers[i] is None or buffers[i].num_rows == 0):
+                    batch = next(iterator, None)
+                    if batch is None:
+                        finished[i] = True
+                    else:
+                        buffers[i] = pa.Table.from_batches([batch])
+
+            active = [i for i in range(len(buffers)) if buffers[i] is not None and buffers[i].num_rows > 0]
+            if not active:
+                return
+            last_keys = [buffers[i].column(self.SORT_KEY)[-1].as_py() for i in active if not finished[i]]
+            cutoff = min(last_keys) if last_keys else None
+
+            parts = []
+            for i in active:
+                if cutoff is None:
+                    num = buffers[i].num_rows
+                else:
+                    num = int(np.searchsorted(buffers[i].column(self.SORT_KEY).to_numpy(), cutoff, side="right"))
+                parts.append(buffers[i].slice(0, num))
+                buffers[i] = buffers[i].slice(num)
+
+            merged = pa.concat_tables(parts)
+            order = np.argsort(merged.column(self.SORT_KEY).to_numpy(), kind="stable")
+            yield merged.take(order).drop_columns([self.SORT_KEY])
+
+    def _merge_runs(self):
+        """Writes the merged runs to the output in row groups of row_group_size rows."""
+        self._open_writer()
+        pending = []
+        num_pending = 0
+        for table in self._iter_merged_runs():
+            pending.append(table)
+            num_pending += table.num_rows
+            if num_pending >= self.row_group_size:
+                table = pa.concat_tables(pending)
+                num_full = (num_pending // self.row_group_size) * self.row_group_size
+                self.writer.write_table(table.slice(0, num_full), row_group_size=self.row_group_size)
+                pending = [table.slice(num_full)]
+                num_pending -= num_full
+        if num_pending > 0:
+            self.writer.write_table(pa.concat_tables(pending), row_group_size=self.row_group_size)
+        self._remove_runs()
+
+    def _remove_runs(self):
+        if os.path.isdir(self.run_folder):
+            shutil.rmtree(self.run_folder)
+        self.run_pths = []
+
+    def abort(self):
+        """Stops writing and removes the temporary files, so that no (incomplete) output is written."""
+        self.aborted = True
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if os.path.exists(self.tmp_pth):
+            os.remove(self.tmp_pth)
+        self._remove_runs()
+
+    def close(self):
+        if self.aborted:
+            return
+        if self.run_pths:
+            self._merge_runs()
+        if self.writer is None:
+            return
+
+        col_meta = {"encoding": "WKB", "geometry_types": sorted(self.geometry_types)}
+        if self.crs is not None:
+            col_meta["crs"] = self.crs.to_json_dict()
+        if self.bounds is not None:
+            col_meta["bbox"] = [float(b) for b in self.bounds]
+        if self.write_bbox:
+            col_meta["covering"] = {"bbox": {k: ["bbox", k] for k in ["xmin", "ymin", "xmax", "ymax"]}}
+        geo_meta = {"version": "1.1.0" if self.write_bbox else "1.0.0", "primary_column": "geometry",
+                    "columns": {"geometry": col_meta}}
+
+        self.writer.add_key_value_metadata({"geo": json.dumps(geo_meta)})
+        self.writer.close()
+        self.writer = None
+        os.replace(self.tmp_pth, self.out_pth)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+def remove_line_breaks(values):
+    """
+    Removes line breaks that could not be captured in the crop classification tables.
+
+    :param values: Array or Series of crop names.
+    :return: Series with the cleaned crop names. Values that are not strings become NaN (same as Series.str.replace).
+    """
+    values = pd.Series(values)
+
+    return values.str.replace('\n', '').str.replace('\r', '')
+
+
+def merge_on_unique_values(df, cl_df, on, clean_func=None):
+    """
+    Joins the columns of the classification table to a (Geo)DataFrame. The result is the same as
+    pd.merge(df, cl_df, how="left", on=on), but the key column is only compared for its unique values. The columns of
+    the classification table are then broadcasted to all rows with a single take, so that neither the geometries nor
+    the other columns of df run through a merge.
+
+    Like pd.merge, missing keys (NaN) match missing keys of the classification table, columns that occur in both
+    tables get the suffixes "_x" and "_y" and the result gets a new RangeIndex.
+
+    :param df: (Geo)DataFrame with the key column.
+    :param cl_df: Classification table. If the keys of the table are not unique, pd.merge is used instead.
+    :param on: Name of the key column.
+    :param clean_func: Optional function that cleans the key values (e.g. remove_line_breaks). It is only applied to
+        the unique values of df and the changed values are written back to the key column.
+    :return: (Geo)DataFrame with the columns of df and the columns of the classification table.
+    """
+    ## Encode the keys, so that every unique value is only processed once. Missing values get their own code.
+    codes, uniques = pd.factorize(df[on], use_na_sentinel=False)
+
+    cleaned = None
+    if clean_func is not None:
+        cleaned = pd.Series(clean_func(uniques)).array
+        unchanged = ((np.asarray(cleaned, dtype=object) == np.asarray(uniques, dtype=object))
+                     | (pd.isna(cleaned) & pd.isna(uniques)))
+        if unchanged.all():
+            cleaned = None
+        else:
+            uniques = cleaned
+            changed_rows = ~unchanged.take(codes)
+
+    cl_keys = pd.Index(cl_df[on])
+    if not cl_keys.is_unique:
+        if cleaned is not None:
+            df = df.copy()
+            df[on] = df[on].where(~changed_rows, pd.Series(cleaned.take(codes), index=df.index))
+        return pd.merge(df, cl_df, how="left", on=on)
+
+    ## Position in the classification table of every unique value and then of every row (-1 if not classified)
+    unique_pos = cl_keys.get_indexer(uniques)
+    row_pos = unique_pos.take(codes)
+
+    result = df.reset_index(drop=True)
+    if cleaned is not None:
+        result[on] = result[on].where(~changed_rows, pd.Series(cleaned.take(codes), index=result.index))
+
+    new_cols = [col for col in cl_df.columns if col != on]
+    overlap = [col for col in new_cols if col in result.columns]
+    if overlap:
+        result = result.rename(columns={col: f"{col}_x" for col in overlap})
+
+    has_missing = bool((row_pos == -1).any())
+    for col in new_cols:
+        out_col = f"{col}_y" if col in overlap else col
+        values = pd.api.extensions.take(cl_df[col].array, row_pos, allow_fill=has_missing)
+        result[out_col] = pd.Series(values, index=result.index)
+
+    return result
@@ -0,0 +1,168 @@
+import os
+import glob
+import time
+import pandas as pd
+
+from my_utils import atomic_files
+from my_utils import fingerprints
+from my_utils import fuzzy_matcher
+
+## The compiled corpus lives next to the crop classifications. All paths are relative to the working directory of the
+## scripts.
+CROP_CLASSIFICATION_FOLDER = os.path.join("data", "tables", "crop_classifications")
+CORPUS_FOLDER = os.path.join("data", "tables", "compiled_crop_corpus")
+INDEX_NAME = "index.json"
+
+## Columns of the corpus. The crop names in all languages and the EuroCrops classification.
+CORPUS_COLUMNS = ["crop_code", "crop_name", "crop_name_de", "crop_name_en", "EC_trans_n", "EC_hcat_n", "EC_hcat_c"]
+NAME_COLUMNS = ["crop_name", "crop_name_de", "crop_name_en"]
+## Classifications that are not used as matching candidates (EL has too many unuseful names in it)
+EXCLUDE_DESCR = ["EL_crop"]
+
+
+def _source_key(source_pth):
+    return os.path.normpath(source_pth).replace(os.sep, "/")
+
+
+def _load_index(corpus_folder):
+    ## If the index cannot be read, the corpus will be recompiled
+    return atomic_files.load_json(os.path.join(corpus_folder, INDEX_NAME), {"sources": {}, "matchers": {}})
+
+
+def _save_index(index, corpus_folder):
+    atomic_files.save_json(index, os.path.join(corpus_folder, INDEX_NAME))
+
+
+def _write_pickle(obj, out_pth):
+    atomic_files.write_atomic(out_pth, lambda tmp_pth: pd.to_pickle(obj, tmp_pth))
+
+
+def _compile_part(source_pth, corpus_folder):
+    """
+    Reads one crop classification and stores the corpus columns as pickle, so that the types of the values (e.g. crop
+    codes that are numbers in some rows and strings in others) are kept exactly as pd.read_excel returns them.
+
+    :return: Index entry of the classification.
+    """
+    df = pd.read_excel(source_pth)
+    missing = [col for col in CORPUS_COLUMNS if col not in df.columns]
+    if missing:
+        raise KeyError(f"{source_pth} misses the columns {missing}.")
+
+    name = os.path.basename(source_pth).replace(".", "_") + ".pkl"
+    _write_pickle(df[CORPUS_COLUMNS], os.path.join(corpus_folder, name))
+
+    stat = fingerprints.get_file_fingerprint(source_pth)
+
+    return {"size": stat["size"], "mtime_ns": stat["mtime_ns"], "part": name, "num_rows": len(df)}
+
+
+def compile_crop_corpus(crop_class_folder=CROP_CLASSIFICATION_FOLDER, corpus_folder=CORPUS_FOLDER):
+    """
+    Compiles all crop classifications (*.xlsx) into the corpus of matching candidates. Only classifications that
+    changed since the last compilation (size or modification time) are read again. Parts of deleted classifications
+    are removed.
+
+    :param crop_class_folder: Folder with the crop classifications.
+    :param corpus_folder: Output folder of the compiled corpus.
+    :return: Index of the corpus as dictionary.
+    """
+    os.makedirs(corpus_folder, exist_ok=True)
+    stime = time.time()
+    index = _load_index(corpus_folder)
+    sources = {}
+    num_compiled = 0
+
+    for source_pth in sorted(glob.glob(os.path.join(crop_class_folder, "*.xlsx"))):
+        if any(descr in os.path.basename(source_pth) for descr in EXCLUDE_DESCR):
+            continue
+        ## Lock files of open workbooks
+        if os.path.basename(source_pth).startswith("~$"):
+            continue
+        key = _source_key(source_pth)
+        entry = index["sources"].get(key)
+        stat = fingerprints.get_file_fingerprint(source_pth)
+        if (entry is None or [entry.get("size"), entry.get("mtime_ns")] != [stat["size"], stat["mtime_ns"]]
+                or not os.path.exists(os.path.join(corpus_folder, entry["part"]))):
+            entry = _compile_part(source_pth, corpus_folder)
+            num_compiled += 1
+        sources[key] = entry
+
+    ## Remove parts whose source was deleted
+    for key, entry in index["sources"].items():
+        part_pth = os.path.join(corpus_folder, entry["part"])
+        if key not in sources and os.path.exists(part_pth):
+            os.remove(part_pth)
+
+    index["sources"] = sources
+    _save_index(index, corpus_folder)
+    print(f"Crop corpus: {num_compiled} of {len(sources)} classifications compiled in {time.time() - stime:.1f}s.")
+
+    return index
+
+
+def _get_signature(index):
+    return fingerprints.get_value_hash({key: [entry["size"], entry["mtime_ns"]]
+                                        for key, entry in index["sources"].items()})
+
+
+def get_crop_corpus(crop_class_folder=CROP_CLASSIFICATION_FOLDER, corpus_folder=CORPUS_FOLDER):
+    """
+    Returns all crop classifications concatenated to one table with the columns CORPUS_COLUMNS and the column source
+    (path of the classification). The corpus is compiled first if any classification changed.
+
+    :return: pandas.DataFrame.
+    """
+    index = compile_crop_corpus(crop_class_folder, corpus_folder)
+    parts = []
+    for key, entry in index["sources"].items():
+        df = pd.read_pickle(os.path.join(corpus_folder, entry["part"]))
+        df["source"] = key
+        parts.append(df)
+    if not parts:
+        return pd.DataFrame(columns=CORPUS_COLUMNS + ["source"])
+
+    return pd.concat(parts, ignore_index=True)
+
+
+def get_name_candidates(corpus, name_col):
+    """
+    Prepares the matching candidates of one name column: rows without a name are dropped, duplicates are removed and
+    the names are lower case, because the case might affect the Jaro-Winkler metric.
+
+    :param corpus: Output of get_crop_corpus.
+    :param name_col: One of NAME_COLUMNS.
+    :return: pandas.DataFrame with the columns CORPUS_COLUMNS.
+    """
+    df_class = corpus[CORPUS_COLUMNS]
+    df_class = df_class.loc[df_class[name_col].notna()].copy()
+    df_class.drop_duplicates(inplace=True)
+    df_class[name_col] = df_class[name_col].str.lower()
+
+    return df_class
+
+
+def get_matcher(name_col, crop_class_folder=CROP_CLASSIFICATION_FOLDER, corpus_folder=CORPUS_FOLDER):
+    """
+    Returns the candidates of a name column (see get_name_candidates) and their trigram matcher (see
+    fuzzy_matcher.TrigramMatcher). The matcher is stored in the corpus folder and only built again if a
+    classification changed.
+
+    :return: Tuple of the candidates (pandas.DataFrame) and the matcher.
+    """
+    corpus = get_crop_corpus(crop_class_folder, corpus_folder)
+    df_class = get_name_candidates(corpus, name_col)
+
+    index = _load_index(corpus_folder)
+    signature = _get_signature(index)
+    entry = index["matchers"].get(name_col)
+    matcher_pth = os.path.join(corpus_folder, f"matcher_{name_col}.pkl")
+    if entry is not None and entry["signature"] == signature and os.path.exists(matcher_pth):
+        return df_class, pd.read_pickle(matcher_pth)
+
+    matcher = fuzzy_matcher.TrigramMatcher(df_class[name_col].tolist())
+    _write_pickle(matcher, matcher_pth)
+    index["matchers"][name_col] = {"signature": signature, "num_names": len(matcher.names)}
+    _save_index(index, corpus_folder)
+
+    return df_class, matcher
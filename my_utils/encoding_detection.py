@@ -0,0 +1,309 @@
+import os
+import re
+import codecs
+import struct
+import unicodedata
+import pyarrow as pa
+
+from my_utils import atomic_files
+from my_utils import fingerprints
+from my_utils import helper_functions
+
+## Verdicts of earlier detections, keyed by the file path. A verdict is reused as long as the fingerprint of the file
+## did not change.
+CACHE_PTH = os.path.join("data", "tables", "encoding_cache.json")
+## Encodings that are tested, in the order of preference if they decode the samples equally well
+CANDIDATE_ENCODINGS = ["utf-8", "windows-1252", "ISO-8859-1", "windows-1250", "ISO-8859-2", "windows-1251",
+                       "windows-1253", "windows-1257"]
+## Number of records whose strings are sampled
+SAMPLE_ROWS = 5_000
+## Increase this number if the scoring changes, so that all files are detected again
+DETECTION_VERSION = 1
+## If True, files with a configured file_encoding are detected as well and a warning is printed if the detection is
+## sure that the configured encoding is wrong. Off by default, as sampling every input file of a run is slow.
+WARN_ENCODING_MISMATCH = False
+
+## Non-ascii letters (lower case) of the languages that are usually written in an encoding
+_WESTERN = "àáâãäåæçèéêëìíîïñòóôõöøùúûüýÿßœ"
+_CENTRAL = "áäčďéěíĺľňóôöŕřšťúůüýžąćęłńśźżőűăâîşţ"
+EXPECTED_LETTERS = {
+    "windows-1252": _WESTERN,
+    "ISO-8859-1": _WESTERN,
+    "windows-1250": _CENTRAL,
+    "ISO-8859-2": _CENTRAL,
+    "windows-1251": "абвгдежзийклмнопрстуфхцчшщъыьэюяёђѓєѕіїјљњћќўџґ",
+    "windows-1253": "αβγδεζηθικλμνξοπρστυφχψωάέήίόύώϊϋς",
+    "windows-1257": "āčēģīķļņšūžąęėįųõäöüåæøéóśźż"
+}
+
+## Code pages of .cpg files that are only given as number or with a prefix
+CPG_ALIASES = {"utf8": "utf-8", "65001": "utf-8", "88591": "ISO-8859-1", "1252": "windows-1252",
+               "1250": "windows-1250", "1251": "windows-1251", "1253": "windows-1253", "1257": "windows-1257"}
+
+
+def normalize_encoding(encoding):
+    """Returns the name of an encoding as in CANDIDATE_ENCODINGS (e.g. "cp1252" -> "windows-1252"), or None."""
+    if not encoding:
+        return None
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    for candidate in CANDIDATE_ENCODINGS:
+        if codecs.lookup(candidate).name == name:
+            return candidate
+    return encoding
+
+
+def read_cpg(path):
+    """Returns the encoding of the .cpg file of a shapefile, or None if there is no (known) .cpg file."""
+    cpg_pth = os.path.splitext(path)[0] + ".cpg"
+    if not os.path.exists(cpg_pth):
+        return None
+    with open(cpg_pth, "r", encoding="ascii", errors="ignore") as f:
+        value = f.read().strip()
+    key = re.sub(r"^(ansi|cp|iso)", "", value.lower().replace("-", "").replace(" ", ""))
+
+    return normalize_encoding(CPG_ALIASES.get(key, value))
+
+
+def _sample_dbf(path, max_rows):
+    """Returns the raw bytes of the non-ascii values of the character fields of the .dbf file of a shapefile."""
+    dbf_pth = os.path.splitext(path)[0] + ".dbf"
+    if not os.path.exists(dbf_pth):
+        return []
+    with open(dbf_pth, "rb") as f:
+        header = f.read(32)
+        num_records, header_len, record_len = struct.unpack("<IHH", header[4:12])
+        fields = []
+        offset = 1  ## deletion flag
+        while f.tell() < header_len - 1:
+            descriptor = f.read(32)
+            if not descriptor or descriptor[0] == 0x0D:
+                break
+            length = descriptor[16]
+            if descriptor[11:12] == b"C":
+                ## Character fields can be longer than 255 bytes, then the decimal count holds the high byte
+                length += descriptor[17] << 8
+                fields.append((offset, length))
+            offset += length
+        f.seek(header_len)
+        data = f.read(record_len * min(num_records, max_rows))
+
+    samples = []
+    for start in range(0, len(data) - record_len + 1, record_len):
+        record = data[start:start + record_len]
+        for field_offset, length in fields:
+            value = record[field_offset:field_offset + length].strip(b" \x00")
+            if value and not value.isascii():
+                samples.append(value)
+
+    return samples
+
+
+def _sample_ogr(path, max_rows):
+    """Returns the raw bytes of the non-ascii string values of the first records of an OGR data source."""
+    import pyogrio
+    from pyogrio.raw import open_arrow
+
+    layer = pyogrio.list_layers(path)[0][0]
+    samples = []
+    with open_arrow(path, layer=layer, read_geometry=False, batch_size=max_rows, use_pyarrow=True) as (meta, reader):
+        for batch in reader:
+            for column in batch.columns:
+                if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+                    values = column.cast(pa.binary()).to_pylist()
+                    samples += [value for value in values if value and not value.isascii()]
+            break
+
+    return samples
+
+
+def _get_script(char):
+    try:
+        return unicodedata.name(char).split()[0]
+    except ValueError:
+        return None
+
+
+def score_encoding(samples, encoding):
+    """
+    Scores how plausible the texts are that an encoding produces from the samples. Letters of the languages that use
+    the encoding (EXPECTED_LETTERS) count positively. Other letters, symbols and control characters count negatively,
+    as well as words that mix scripts (e.g. Latin and Cyrillic), words with an upper case letter after a lower case
+    letter and words that consist only of accented Latin letters (typical for Cyrillic or Greek text decoded as
+    Latin-1).
+
+    :return: Score as float, or None if the encoding cannot decode all samples.
+    """
+    expected = EXPECTED_LETTERS.get(normalize_encoding(encoding))
+    score = 0.0
+    for raw in samples:
+        try:
+            text = raw.decode(encoding)
+        except UnicodeDecodeError:
+            return None
+        for char in text:
+            if char.isascii():
+                continue
+            category = unicodedata.category(char)
+            if category.startswith("L"):
+                if expected is None:
+                    score += 0.5
+                else:
+                    score += 1 if char.lower() in expected else -1
+            elif category in ["Cc", "Cf", "Co", "Cn"]:
+                score -= 5
+            else:
+                score -= 1
+        for word in re.findall(r"[^\W\d_]{3,}", text):
+            scripts = {_get_script(char) for char in word}
+            if len(scripts) > 1:
+                score -= 3
+            elif scripts == {"LATIN"} and not any(char.isascii() for char in word):
+                score -= 2
+            if any(a.islower() and b.isupper() for a, b in zip(word, word[1:])):
+                score -= 3
+
+    return score
+
+
+def _detect(path, candidates):
+    ext = os.path.splitext(path)[1].lower()
+    ## (Geo)Parquet strings are always UTF-8
+    if ext in [".parquet", ".geoparquet"]:
+        return {"encoding": "utf-8", "source": "format", "scores": {}}
+
+    if ext == ".shp":
+        cpg_encoding = read_cpg(path)
+        samples = _sample_dbf(path, SAMPLE_ROWS)
+    else:
+        cpg_encoding = None
+        samples = _sample_ogr(path, SAMPLE_ROWS)
+
+    if not samples:
+        ## Only ascii text, every encoding gives the same result
+        return {"encoding": cpg_encoding or "utf-8", "source": "cpg" if cpg_encoding else "ascii", "scores": {}}
+
+    scores = {encoding: score_encoding(samples, encoding) for encoding in candidates}
+    valid = [encoding for encoding in candidates if scores[encoding] is not None]
+    ## Valid UTF-8 with non-ascii characters is almost never a coincidence
+    if "utf-8" in valid:
+        best = "utf-8"
+    else:
+        best = max(valid, key=lambda encoding: scores[encoding]) if valid else None
+
+    return {"encoding": best or cpg_encoding, "source": "sample", "scores": scores, "cpg": cpg_encoding,
+            "samples": [sample.decode(best, errors="replace") for sample in samples[:3]] if best else []}
+
+
+def detect_encoding(path, candidates=None, cache_pth=CACHE_PTH):
+    """
+    Detects the encoding of the string attributes of a geodata file. Shapefiles are sampled directly from the raw
+    bytes of the .dbf file, other OGR formats from the raw bytes of the first records. All candidate encodings are
+    scored (see score_encoding). The verdict is cached per file fingerprint.
+
+    :param path: Path to the geodata file.
+    :param candidates: List of encodings. Defaults to CANDIDATE_ENCODINGS.
+    :param cache_pth: Path of the json cache. None disables the cache.
+    :return: Dictionary with the keys encoding (the best encoding), source ("format", "cpg", "ascii" or "sample") and
+        scores (encoding -> score, None if the encoding cannot decode the samples).
+    """
+    candidates = candidates or CANDIDATE_ENCODINGS
+    fingerprint = fingerprints.get_file_fingerprint(path)
+    key = {"version": DETECTION_VERSION, "size": fingerprint["size"], "mtime_ns": fingerprint["mtime_ns"],
+           "candidates": list(candidates)}
+    cache_key = os.path.normpath(path).replace(os.sep, "/")
+
+    cache = atomic_files.load_json(cache_pth, {})
+    entry = cache.get(cache_key)
+    if entry is not None and entry["key"] == key:
+        return entry["verdict"]
+
+    verdict = _detect(path, candidates)
+    if cache_pth:
+        ## Read the cache again, as other processes might have added files in the meantime
+        cache = atomic_files.load_json(cache_pth, {})
+        cache[cache_key] = {"key": key, "verdict": verdict}
+        atomic_files.save_json(cache, cache_pth)
+
+    return verdict
+
+
+def get_file_encoding(path, file_encoding=None, file_year_encoding=None, year=None):
+    """
+    Returns the encoding that should be used to read a file, following the file_encoding/file_year_encoding settings
+    of the run_dicts:
+
+    - An encoding for the year of the file in file_year_encoding is always used.
+    - file_encoding "auto" uses the detected encoding (see detect_encoding).
+    - Otherwise file_encoding is used. If WARN_ENCODING_MISMATCH is set and the detection is sure that it decodes the
+      file differently (and worse), a warning is printed.
+    - None means that the reader should use its default.
+
+    :param path: Path to the geodata file.
+    :param file_encoding: Encoding of the run_dict, "auto" or None.
+    :param file_year_encoding: Optional dictionary year -> encoding.
+    :param year: Year of the file. If not provided, it is derived from the path.
+    :return: Encoding or None.
+    """
+    if file_year_encoding:
+        if year is None:
+            year = helper_functions.get_year_from_path(path)
+        if year in file_year_encoding:
+            return file_year_encoding[year]
+
+    if file_encoding is None:
+        return None
+
+    if str(file_encoding).lower() == "auto":
+        verdict = detect_encoding(path)
+        print(f"Detected encoding of {path}: {verdict['encoding']} ({verdict['source']})")
+        return verdict["encoding"]
+
+    if not WARN_ENCODING_MISMATCH:
+        return file_encoding
+
+    ## The detection is only used for a warning, so a file that cannot be sampled is read with the configured encoding
+    try:
+        verdict = detect_encoding(path)
+    except Exception as e:
+        print(f"Could not detect the encoding of {path}: {e}")
+        return file_encoding
+    configured = normalize_encoding(file_encoding)
+    scores = verdict["scores"]
+    if verdict["source"] == "sample" and configured in scores and verdict["encoding"] != configured:
+        if scores[configured] is None or scores[configured] < scores[verdict["encoding"]]:
+            print(f"Warning: {path} seems to be encoded in {verdict['encoding']}, not in {file_encoding}. "
+                  f"Set file_encoding to 'auto' or to the detected encoding if the text looks wrong.")
+
+    return file_encoding
+
+
+def get_arrow_encodings(path, encoding):
+    """
+    pyogrio can only apply non-UTF-8 encodings to shapefiles when reading Arrow batches. For all other formats, the
+    batches are read without encoding and their strings are decoded afterwards (see decode_string_columns), which
+    gives the same result as reading with the encoding.
+
+    :return: Tuple of the encoding for open_arrow and the encoding for decode_string_columns (or None).
+    """
+    if not encoding or os.path.splitext(path)[1].lower() == ".shp" or normalize_encoding(encoding) == "utf-8":
+        return encoding, None
+
+    return None, encoding
+
+
+def decode_string_columns(batch, encoding):
+    """Decodes the raw bytes of all string columns of an Arrow record batch or table with the given encoding."""
+    if encoding is None:
+        return batch
+    arrays = []
+    for column in batch.columns:
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            values = column.cast(pa.binary()).to_pylist()
+            column = pa.array([None if value is None else value.decode(encoding) for value in values],
+                              type=column.type)
+        arrays.append(column)
+
+    return type(batch).from_arrays(arrays, schema=batch.schema)
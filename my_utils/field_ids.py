@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+## Number of threads and geometries per chunk for the reprojection and the representative points. Shapely and pyproj
+## release the GIL, so the chunks are processed in parallel.
+N_THREADS = os.cpu_count() or 1
+CHUNK_SIZE = 100_000
+ID_CRS = 3035
+
+## Bits of the packed integer IDs: x and y (meters in EPSG:3035) and the occurrence counter
+COORD_BITS = 24
+COUNT_BITS = 15
+
+
+def _get_representative_xy(geometry):
+    points = geometry.to_crs(ID_CRS).representative_point()
+    return points.x.to_numpy(), points.y.to_numpy()
+
+
+def get_representative_coordinates(geometry, n_threads=N_THREADS, chunk_size=CHUNK_SIZE):
+    """
+    Returns the coordinates of the representative points of the geometries in EPSG:3035, truncated to full meters
+    (the same as helper_functions.truncate_coord). Large inputs are processed in chunks in parallel threads. Missing
+    and empty geometries raise a ValueError.
+
+    :param geometry: GeoSeries with a crs.
+    :param n_threads: Number of threads.
+    :param chunk_size: Number of geometries per chunk.
+    :return: Tuple of two numpy int64 arrays (x, y).
+    """
+    if n_threads > 1 and len(geometry) > chunk_size:
+        chunks = [geometry.iloc[i:i + chunk_size] for i in range(0, len(geometry), chunk_size)]
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            results = list(executor.map(_get_representative_xy, chunks))
+        x = np.concatenate([r[0] for r in results])
+        y = np.concatenate([r[1] for r in results])
+    else:
+        x, y = _get_representative_xy(geometry)
+
+    if not (np.isfinite(x).all() and np.isfinite(y).all()):
+        raise ValueError("Field IDs cannot be created for missing or empty geometries.")
+
+    return np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+
+
+def get_occurrence_counts(xs, ys):
+    """
+    Counts how often each coordinate pair occurred up to and including each row (1, 2, 3, ...), the same as
+    groupby(...).cumcount() + 1, but with a stable sort of integer keys instead of a groupby on strings.
+
+    :return: numpy int64 array.
+    """
+    n = len(xs)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    int32 = np.iinfo(np.int32)
+    if xs.min() >= int32.min and xs.max() <= int32.max and ys.min() >= int32.min and ys.max() <= int32.max:
+        keys = (xs << 32) | (ys & 0xFFFFFFFF)
+    else:
+        keys = pd.MultiIndex.from_arrays([xs, ys]).factorize()[0]
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_start = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+    counts = np.empty(n, dtype=np.int64)
+    counts[order] = np.arange(n) - group_start + 1
+
+    return counts
+
+
+def pack_field_ids(xs, ys, counts):
+    """
+    Packs the coordinates and the occurrence counter into one int64 per field. x and y must be in
+    [0, 2 ** COORD_BITS) (all of Europe in EPSG:3035) and the counter in [1, 2 ** COUNT_BITS).
+
+    :return: numpy int64 array.
+    """
+    xs, ys, counts = np.asarray(xs), np.asarray(ys), np.asarray(counts)
+    if len(xs) > 0:
+        if xs.min() < 0 or ys.min() < 0 or max(xs.max(), ys.max()) >= 2 ** COORD_BITS:
+            raise ValueError(f"Coordinates are outside of [0, {2 ** COORD_BITS}) and cannot be packed.")
+        if counts.min() < 1 or counts.max() >= 2 ** COUNT_BITS:
+            raise ValueError(f"Occurrence counts are outside of [1, {2 ** COUNT_BITS}) and cannot be packed.")
+
+    return (xs << (COORD_BITS + COUNT_BITS)) | (ys << COUNT_BITS) | counts
+
+
+def unpack_field_ids(packed):
+    """Returns the coordinates and the occurrence counter (xs, ys, counts) of packed field IDs."""
+    packed = np.asarray(packed, dtype=np.int64)
+    xs = packed >> (COORD_BITS + COUNT_BITS)
+    ys = (packed >> COUNT_BITS) & (2 ** COORD_BITS - 1)
+    counts = packed & (2 ** COUNT_BITS - 1)
+
+    return xs, ys, counts
+
+
+def _format_padded(values, width):
+    """Formats integers like f"{value:0{width}d}" with Arrow string kernels."""
+    strings = pc.cast(pa.array(values), pa.string())
+    negative = pa.array(values < 0)
+    ## The minus sign is put in front of the zeros, e.g. -12 -> "-000012"
+    digits = pc.utf8_lpad(pc.utf8_slice_codeunits(strings, start=1), width=width - 1, padding="0")
+    padded_negative = pc.binary_join_element_wise("-", digits, "")
+
+    return pc.if_else(negative, padded_negative, pc.utf8_lpad(strings, width=width, padding="0"))
+
+
+def render_field_ids(xs, ys, counts, index=None):
+    """
+    Renders the field IDs as strings in the format "{x:07d}_{y:07d}_{count}".
+
+    :param index: Index of the returned Series.
+    :return: pandas Series of strings.
+    """
+    xs, ys, counts = np.asarray(xs), np.asarray(ys), np.asarray(counts)
+    ids = pc.binary_join_element_wise(_format_padded(xs, 7), _format_padded(ys, 7),
+                                      pc.cast(pa.array(counts), pa.string()), "_")
+
+    return pd.Series(ids, index=index, dtype=str)
+
+
+def create_field_ids(geometry, packed=False, n_threads=N_THREADS, chunk_size=CHUNK_SIZE):
+    """
+    Generates unique field IDs from the representative points of the geometries in EPSG:3035 and the number of
+    previous occurrences of the same point. The strings are identical to the IDs of earlier versions
+    ("{x:07d}_{y:07d}_{count}").
+
+    :param geometry: GeoSeries with a crs.
+    :param packed: If True, the IDs are returned as int64 (see pack_field_ids) and no strings are created.
+    :param n_threads: Number of threads for the representative points.
+    :param chunk_size: Number of geometries per chunk.
+    :return: pandas Series with the index of geometry.
+    """
+    xs, ys = get_representative_coordinates(geometry, n_threads=n_threads, chunk_size=chunk_size)
+    counts = get_occurrence_counts(xs, ys)
+    if packed:
+        return pd.Series(pack_field_ids(xs, ys, counts), index=geometry.index)
+
+    return render_field_ids(xs, ys, counts, index=geometry.index)
@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import pandas as pd
+
+from my_utils import atomic_files
+from my_utils import lookup_store
+
+## Increase this number if the processing itself changes in a way that all outputs have to be rebuilt
+FINGERPRINT_VERSION = 1
+
+
+def get_file_fingerprint(pth):
+    """
+    Returns a cheap fingerprint of a (potentially very large) file based on its size and modification time. For folders
+    (e.g. File Geodatabases) and shapefiles all files that belong to the dataset are included.
+
+    :param pth: Path to a file or folder.
+    :return: Dictionary with the size in bytes and the latest modification time in nanoseconds.
+    """
+    if os.path.isdir(pth):
+        files = [os.path.join(root, f) for root, dirs, fs in os.walk(pth) for f in fs]
+    else:
+        root, ext = os.path.splitext(pth)
+        if ext.lower() == ".shp":
+            files = [root + side for side in [".shp", ".dbf", ".shx", ".prj", ".cpg"] if os.path.exists(root + side)]
+        else:
+            files = [pth]
+
+    stats = [os.stat(f) for f in files]
+
+    return {"size": sum(s.st_size for s in stats), "mtime_ns": max((s.st_mtime_ns for s in stats), default=0)}
+
+
+def get_content_hash(pth, block_size=1024 * 1024):
+    """
+    Returns the sha256 hash of the content of a file. Should be used for small files, e.g. tables. If the file does
+    not exist, "missing" is returned.
+    """
+    if not os.path.exists(pth):
+        return "missing"
+
+    sha = hashlib.sha256()
+    with open(pth, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def get_value_hash(value):
+    """
+    Returns the sha256 hash of a python value, e.g. an organic dictionary. Dictionaries are sorted by their keys first,
+    so that the hash does not depend on the order of the entries. Types are kept, i.e. {1: 0} and {"1": 0} differ.
+    """
+    def _normalize(v):
+        if isinstance(v, dict):
+            return sorted(((repr(k), _normalize(i)) for k, i in v.items()))
+        if isinstance(v, (list, tuple, range)):
+            return [_normalize(i) for i in v]
+        return repr(v)
+
+    return hashlib.sha256(json.dumps(_normalize(value)).encode("utf-8")).hexdigest()
+
+
+def get_translation_column_hash(col_translate_pth, col_year):
+    """
+    Returns a hash of the part of a column name translation table that is used for one year, i.e. the unified column
+    names and the original column names of the column "{region_id}_{year}" for all rows with prelim == 1. Changes in
+    the columns of other years do not change the hash.
+
+    :param col_translate_pth: Path to the column name translation table (csv).
+    :param col_year: Column of the translation table, e.g. "DK_2020".
+    :return: sha256 hash as string. If the table or the column does not exist, "missing" is returned.
+    """
+    if not os.path.exists(col_translate_pth):
+        return "missing"
+    tr_df = lookup_store.read_table(col_translate_pth)
+    if col_year not in tr_df.columns:
+        return "missing"
+
+    tr_df = tr_df.loc[tr_df["prelim"] == 1, ["column_name", col_year]].astype(str)
+    row_hashes = pd.util.hash_pandas_object(tr_df, index=False).to_numpy()
+
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+class RebuildManifest:
+    """
+    Keeps track of the fingerprints of all inputs that were used to create an output file. An output is up to date if
+    it exists and the fingerprints of its inputs are the same as in the last successful run.
+
+    The manifest is stored as a json file and written after every update, so that the progress is not lost if a run
+    is interrupted.
+    """
+
+    def __init__(self, manifest_pth):
+        self.manifest_pth = manifest_pth
+        self.entries = atomic_files.load_json(manifest_pth, {})
+
+    @staticmethod
+    def _key(output_pth):
+        return os.path.normpath(output_pth).replace(os.sep, "/")
+
+    def is_up_to_date(self, output_pth, fingerprints):
+        if not os.path.exists(output_pth):
+            return False
+        return self.entries.get(self._key(output_pth)) == fingerprints
+
+    def update(self, output_pth, fingerprints):
+        self.entries[self._key(output_pth)] = fingerprints
+        self.save()
+
+    def save(self):
+        atomic_files.save_json(self.entries, self.manifest_pth)
@@ -0,0 +1,191 @@
+import heapq
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import jaro
+
+## Number of returned candidates per name
+TOP_K = 3
+## Number of candidates with the most common trigrams that are scored first. Their scores are the threshold that all
+## other names have to reach.
+NUM_SEED_CANDIDATES = 20
+## Maximum number of scored names per query. None scores all names that can still reach the best scores, so the
+## result is exact. A number makes the matching faster, but the best match is no longer guaranteed.
+MAX_SCORED_NAMES = None
+## Number of processes. With 1, all names are matched in the current process.
+N_WORKERS = 1
+## Jaro-Winkler parameters that are used for the upper bound of the score (prefix scale and maximum prefix length)
+PREFIX_SCALE = 0.1
+MAX_PREFIX = 4
+## Tolerance for the comparison of the upper bound with the scores
+BOUND_TOLERANCE = 1e-9
+
+
+def get_trigrams(text):
+    """Returns the set of trigrams of a text. The text is padded, so that also the start, end and short texts have
+    trigrams."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramMatcher:
+    """
+    Finds the names of a corpus with the highest Jaro-Winkler similarity to a query name.
+
+    Scoring every corpus name for every query is slow for large corpora. Instead, the names that share the most
+    trigrams with the query (inverted index) are scored first. All other names are only scored if an upper bound of
+    their score, derived from their length and the characters they have in common with the query, can still reach the
+    scores found so far. The result is therefore the same as scoring all names, as long as the scorer is the standard
+    Jaro-Winkler similarity (prefix scale 0.1, at most 4 prefix characters).
+
+    Ties are resolved by the position in the corpus, like max() over a list: the first name wins.
+    """
+
+    def __init__(self, names, scorer=jaro.jaro_winkler_metric, max_scored=MAX_SCORED_NAMES):
+        ## Unique names in the order of their first occurrence
+        self.names = list(dict.fromkeys(str(name) for name in names if pd.notna(name)))
+        self.scorer = scorer
+        self.max_scored = max_scored
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+
+        ## Inverted index trigram -> ids of the names that contain it
+        index = {}
+        for i, name in enumerate(self.names):
+            for trigram in get_trigrams(name):
+                index.setdefault(trigram, []).append(i)
+        self.index = {trigram: np.array(ids, dtype=np.int64) for trigram, ids in index.items()}
+
+        ## Character counts of all names (lower case, to be independent of the case handling of the scorer)
+        self.alphabet = {char: i for i, char in enumerate(sorted({c for name in self.names for c in name.lower()}))}
+        self.char_counts = np.zeros((len(self.names), max(len(self.alphabet), 1)), dtype=np.int32)
+        for i, name in enumerate(self.names):
+            for char, count in Counter(name.lower()).items():
+                self.char_counts[i, self.alphabet[char]] = count
+
+        ## Code points of the first characters of all names (lower case) for the common prefix (-1 after the end)
+        self.prefixes = np.full((len(self.names), MAX_PREFIX), -1, dtype=np.int64)
+        for i, name in enumerate(self.names):
+            self.prefixes[i, :min(len(name), MAX_PREFIX)] = [ord(c) for c in name.lower()[:MAX_PREFIX]]
+
+    def _get_upper_bounds(self, query, ids):
+        """
+        Upper bound of the Jaro-Winkler similarity of the query and the names with the given ids. The number of
+        matching characters is at most the number of common characters (lower case), the transpositions are at best 0
+        and the prefix bonus is computed from the common prefix (up to MAX_PREFIX characters).
+        """
+        query_counts = np.zeros(self.char_counts.shape[1], dtype=np.int32)
+        for char, count in Counter(query.lower()).items():
+            if char in self.alphabet:
+                query_counts[self.alphabet[char]] = count
+        common = np.minimum(self.char_counts[ids], query_counts).sum(axis=1)
+        common = np.minimum(common, np.minimum(self.lengths[ids], len(query)))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jaro_bound = (common / len(query) + common / self.lengths[ids] + 1) / 3
+        jaro_bound = np.where(common > 0, jaro_bound, 0)
+
+        query_prefix = np.full(MAX_PREFIX, -2, dtype=np.int64)
+        query_prefix[:min(len(query), MAX_PREFIX)] = [ord(c) for c in query.lower()[:MAX_PREFIX]]
+        prefix_len = np.cumprod(self.prefixes[ids] == query_prefix, axis=1).sum(axis=1)
+
+        return jaro_bound + PREFIX_SCALE * prefix_len * (1 - jaro_bound) + BOUND_TOLERANCE
+
+    def match(self, query, k=TOP_K):
+        """
+        Returns the k names with the highest score for one query.
+
+        :return: List of tuples (name, score), sorted by descending score.
+        """
+        if pd.isna(query) or len(self.names) == 0:
+            return []
+        query = str(query)
+        k = min(k, len(self.names))
+        scores = {}
+        ## The k best scores so far (min-heap), the smallest of them is the threshold for all other names
+        best_scores = []
+
+        def add_score(i):
+            score = self.scorer(query, self.names[i])
+            scores[i] = score
+            if len(best_scores) < k:
+                heapq.heappush(best_scores, score)
+            elif score > best_scores[0]:
+                heapq.heapreplace(best_scores, score)
+
+        def get_threshold():
+            return best_scores[0] if len(best_scores) == k else -np.inf
+
+        ## 1. Names that share the most trigrams with the query
+        hits = [self.index[trigram] for trigram in get_trigrams(query) if trigram in self.index]
+        if hits:
+            shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+            num_seeds = min(max(NUM_SEED_CANDIDATES, k), len(self.names))
+            seeds = np.argpartition(-shared, num_seeds - 1)[:num_seeds]
+            for i in seeds[shared[seeds] > 0]:
+                add_score(int(i))
+
+        ## 2. All other names whose score can still reach the threshold. The length bound is checked first, because
+        ## it does not need the character counts.
+        threshold = get_threshold()
+        is_rest = np.ones(len(self.names), dtype=bool)
+        is_rest[list(scores)] = False
+        rest = np.flatnonzero(is_rest)
+        lengths = self.lengths[rest]
+        length_bound = (np.minimum(lengths, len(query)) / np.maximum(np.maximum(lengths, len(query)), 1) + 2) / 3
+        rest = rest[length_bound + PREFIX_SCALE * MAX_PREFIX * (1 - length_bound) + BOUND_TOLERANCE >= threshold]
+
+        bounds = self._get_upper_bounds(query, rest)
+        keep = bounds >= threshold
+        rest, bounds = rest[keep], bounds[keep]
+        order = np.lexsort((rest, -bounds))
+        for i, bound in zip(rest[order].tolist(), bounds[order].tolist()):
+            if bound < threshold or (self.max_scored is not None and len(scores) >= self.max_scored):
+                break
+            add_score(i)
+            threshold = get_threshold()
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+        return [(self.names[i], score) for i, score in best]
+
+
+def _match_chunk(matcher, queries, k):
+    return [matcher.match(query, k=k) for query in queries]
+
+
+def match_names(queries, candidates, k=TOP_K, n_workers=N_WORKERS, scorer=jaro.jaro_winkler_metric,
+                max_scored=MAX_SCORED_NAMES):
+    """
+    Finds the k candidates with the highest Jaro-Winkler similarity for every query (see TrigramMatcher). The result
+    of rank 1 is the same as the candidate with the highest score of all candidates.
+
+    :param queries: List or Series of names that should be matched.
+    :param candidates: List or Series of names that are matched against, or a TrigramMatcher that was already built
+        for them (then scorer and max_scored are ignored).
+    :param k: Number of candidates per query.
+    :param n_workers: Number of processes. The queries are split into one chunk per process.
+    :param scorer: Similarity function of two strings.
+    :param max_scored: Maximum number of scored names per query (see MAX_SCORED_NAMES).
+    :return: DataFrame with the columns query, rank, match and score (k rows per unique query).
+    """
+    if isinstance(candidates, TrigramMatcher):
+        matcher = candidates
+    else:
+        matcher = TrigramMatcher(candidates, scorer=scorer, max_scored=max_scored)
+    unique_queries = list(dict.fromkeys(q for q in queries if pd.notna(q)))
+
+    if n_workers > 1 and len(unique_queries) > n_workers:
+        chunks = [unique_queries[i::n_workers] for i in range(n_workers)]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            chunk_results = list(executor.map(_match_chunk, [matcher] * n_workers, chunks, [k] * n_workers))
+        results = {}
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            results.update(zip(chunk, chunk_result))
+    else:
+        results = dict(zip(unique_queries, _match_chunk(matcher, unique_queries, k)))
+
+    rows = [(query, rank + 1, name, score) for query in unique_queries
+            for rank, (name, score) in enumerate(results[query])]
+
+    return pd.DataFrame(rows, columns=["query", "rank", "match", "score"])
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import warnings
+from pathlib import Path
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import pyogrio
+
+from my_utils import encoding_detection
+from my_utils import profiling
+
+## File formats and how they are read: parquet natively with pyarrow, all OGR formats with pyogrio through its Arrow
+## interface and csv tables with pandas
+PARQUET_EXTENSIONS = [".parquet", ".geoparquet"]
+OGR_EXTENSIONS = [".gpkg", ".gdb", ".shp", ".geojson"]
+CSV_EXTENSIONS = [".csv"]
+
+## Timings of all reads in this process (see print_read_timings)
+READ_TIMINGS = []
+
+
+def get_first_layer(filepath):
+    """
+    Returns the name of the first layer of an OGR data source and warns if there are more layers. Returns None if the
+    layers cannot be listed (the driver then opens its default layer).
+    """
+    try:
+        layers = pyogrio.list_layers(filepath)
+    except Exception:
+        return None
+
+    if len(layers) > 1:
+        layer_names = [str(name) for name in layers[:, 0]]
+        warnings.warn(
+            f"File '{Path(filepath).name}' contains {len(layers)} layers: {layer_names}. "
+            f"Only the first layer ('{layer_names[0]}') will be loaded.",
+            UserWarning
+        )
+    return layers[0][0]
+
+
+def _get_geo_metadata(filepath):
+    """
+    Returns the geo metadata of a (geo)parquet file ({} for plain parquet files). The metadata are read from the
+    key-value metadata of the file, because chunked_io.GeoParquetBatchWriter only adds them there when it is closed.
+    """
+    metadata = pq.ParquetFile(filepath).metadata.metadata or {}
+
+    return json.loads(metadata.get(b"geo", b"{}"))
+
+
+def _get_bbox_filter(filepath, bbox):
+    """
+    Row filter on the bbox covering column of a geoparquet file (GeoParquet 1.1, see geoparquet_writer). Rows are kept
+    if their bounding box intersects the given bbox.
+    """
+    geo_meta = _get_geo_metadata(filepath)
+    col_meta = geo_meta.get("columns", {}).get(geo_meta.get("primary_column"), {})
+    covering = col_meta.get("covering", {}).get("bbox")
+    if not covering:
+        raise ValueError(f"{filepath} has no bbox covering column. Read it without bbox or rewrite it with "
+                         f"geoparquet_writer.write_geoparquet.")
+    xmin, ymin, xmax, ymax = bbox
+
+    return ((pc.field(*covering["xmin"]) <= xmax) & (pc.field(*covering["xmax"]) >= xmin) &
+            (pc.field(*covering["ymin"]) <= ymax) & (pc.field(*covering["ymax"]) >= ymin))
+
+
+def _read_parquet(filepath, columns, filters, bbox, read_geometry, as_arrow):
+    geometry_columns = list(_get_geo_metadata(filepath).get("columns", {}))
+    if columns is not None and read_geometry:
+        columns = list(columns) + [col for col in geometry_columns if col not in columns]
+    elif not read_geometry:
+        if columns is None:
+            columns = [name for name in pq.read_schema(filepath).names if name not in geometry_columns]
+        columns = [col for col in columns if col not in geometry_columns]
+
+    if not as_arrow and read_geometry and geometry_columns:
+        return gpd.read_parquet(filepath, columns=columns, filters=filters, bbox=bbox), "pyarrow"
+
+    if bbox is not None:
+        bbox_filter = _get_bbox_filter(filepath, bbox)
+        if filters is None:
+            filters = bbox_filter
+        else:
+            filters = pq.filters_to_expression(filters) & bbox_filter
+    table = pq.read_table(filepath, columns=columns, filters=filters)
+    if as_arrow:
+        return table, "pyarrow"
+
+    return table.to_pandas(), "pyarrow"
+
+
+def _read_ogr(filepath, columns, where, bbox, encoding, layer, read_geometry, as_arrow):
+    if layer is None:
+        layer = get_first_layer(filepath)
+    arrow_encoding, decode_encoding = encoding_detection.get_arrow_encodings(filepath, encoding)
+
+    if as_arrow:
+        meta, table = pyogrio.read_arrow(filepath, layer=layer, columns=columns, where=where, bbox=bbox,
+                                         encoding=arrow_encoding, read_geometry=read_geometry)
+        return encoding_detection.decode_string_columns(table, decode_encoding), "pyogrio-arrow"
+
+    ## pyogrio can only apply non-UTF-8 encodings to shapefiles when reading through Arrow. Other formats with such
+    ## encodings are read feature by feature.
+    use_arrow = decode_encoding is None
+    gdf = pyogrio.read_dataframe(filepath, layer=layer, columns=columns, where=where, bbox=bbox, encoding=encoding,
+                                 read_geometry=read_geometry, use_arrow=use_arrow)
+
+    return gdf, "pyogrio-arrow" if use_arrow else "pyogrio"
+
+
+def _read_csv(filepath, columns, csv_sep, encoding, as_arrow):
+    df = pd.read_csv(filepath, sep=csv_sep, usecols=columns, encoding=encoding)
+    if as_arrow:
+        return pa.Table.from_pandas(df, preserve_index=False), "pandas"
+
+    return df, "pandas"
+
+
+@profiling.step("read")
+def read_geodata(filepath, columns=None, where=None, filters=None, bbox=None, encoding=None, layer=None,
+                 read_geometry=True, csv_sep=",", as_arrow=False):
+    """
+    Reads a geodata file or csv table with the fastest engine of its format and records the timing of the read.
+    (Geo)parquet files are read with pyarrow, all OGR formats (GPKG, GDB, SHP, GeoJSON) with pyogrio and Arrow, csv
+    tables with pandas. Of OGR data sources with several layers, only the first layer is read (with a warning), as in
+    helper_functions.load_geodata_safe.
+
+    :param filepath: Path to the input.
+    :param columns: List of columns that should be read. None reads all columns. The geometry is always read for
+        geodata (unless read_geometry is False).
+    :param where: SQL WHERE clause that filters the rows of OGR formats, e.g. "crop_code = '115'".
+    :param filters: Row filters of (geo)parquet files in the format of pyarrow.parquet.read_table, e.g.
+        [("crop_code", "=", "115")].
+    :param bbox: Tuple (xmin, ymin, xmax, ymax) in the crs of the file. Only rows that intersect the bbox are read.
+        Geoparquet files need a bbox covering column.
+    :param encoding: Encoding of the attributes of OGR formats and csv tables.
+    :param layer: Layer of an OGR data source. None reads the first layer.
+    :param read_geometry: If False, only the attributes are read and a DataFrame is returned.
+    :param csv_sep: Separator of csv tables.
+    :param as_arrow: If True, a pyarrow.Table is returned (geometries as WKB) instead of a (Geo)DataFrame.
+    :return: GeoDataFrame, DataFrame (csv or no geometry) or pyarrow.Table.
+    """
+    ext = Path(filepath).suffix.lower()
+    stime = time.time()
+
+    if ext in PARQUET_EXTENSIONS:
+        if where is not None:
+            raise ValueError(f"where can only be used for OGR formats. Use filters for {filepath}.")
+        result, engine = _read_parquet(filepath, columns, filters, bbox, read_geometry, as_arrow)
+    elif ext in CSV_EXTENSIONS:
+        if where is not None or filters is not None or bbox is not None:
+            raise ValueError(f"csv tables cannot be filtered while reading: {filepath}.")
+        result, engine = _read_csv(filepath, columns, csv_sep, encoding, as_arrow)
+    else:
+        if filters is not None:
+            raise ValueError(f"filters can only be used for (geo)parquet files. Use where for {filepath}.")
+        result, engine = _read_ogr(filepath, columns, where, bbox, encoding, layer, read_geometry, as_arrow)
+
+    timing = {"path": str(filepath), "engine": engine, "rows": result.num_rows if as_arrow else len(result),
+              "columns": result.num_columns if as_arrow else len(result.columns),
+              "file_mb": get_file_size(filepath) / 1024 ** 2, "seconds": time.time() - stime}
+    READ_TIMINGS.append(timing)
+    print(f"Read {timing['rows']} rows of {Path(filepath).name} with {engine} in {timing['seconds']:.1f}s.")
+
+    return result
+
+
+def get_file_size(filepath):
+    """Size of a file in bytes. Directory based formats (e.g. file geodatabases) are summed up."""
+    if os.path.isdir(filepath):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, dirs, files in os.walk(filepath)
+                   for name in files)
+    return os.path.getsize(filepath)
+
+
+def print_read_timings():
+    """Prints the number of reads, rows and the throughput per engine of all reads in this process."""
+    if not READ_TIMINGS:
+        return
+    df = pd.DataFrame(READ_TIMINGS)
+    for engine, group in df.groupby("engine"):
+        seconds = group["seconds"].sum()
+        print(f"Reader {engine}: {len(group)} files, {group['rows'].sum()} rows, {group['file_mb'].sum():.1f} MB in "
+              f"{seconds:.1f}s ({group['file_mb'].sum() / seconds if seconds > 0 else 0:.1f} MB/s).")
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+## Seeds of the two independent 64-bit hashes that form the 128-bit key of a geometry
+_SEEDS = (np.uint64(0x243F6A8885A308D3), np.uint64(0x13198A2E03707344))
+
+
+def _mix(x):
+    """splitmix64 finalizer, applied element-wise to an uint64 array."""
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _segment_sum(values, bounds):
+    """Sums (with uint64 overflow) the values between consecutive bounds. Works for empty segments."""
+    with np.errstate(over="ignore"):
+        cs = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(values, dtype=np.uint64)])
+        return cs[bounds[1:]] - cs[bounds[:-1]]
+
+
+def _get_coordinate_info(values):
+    """Returns the coordinate bits and the structure of the geometries that are needed for the keys and the checks."""
+    has_z = shapely.has_z(values)
+    coords = shapely.get_coordinates(values, include_z=bool(has_z.any()))
+    num_coords = shapely.get_num_coordinates(values).astype(np.int64)
+    bounds = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(num_coords)])
+
+    return {
+        "coord_bits": np.ascontiguousarray(coords, dtype=np.float64).view(np.uint64),
+        "num_coords": num_coords,
+        "bounds": bounds,
+        "has_z": has_z,
+        ## Missing geometries have the type id -1
+        "type_ids": shapely.get_type_id(values).astype(np.int64),
+        "num_parts": shapely.get_num_geometries(values).astype(np.int64),
+        "num_holes": shapely.get_num_interior_rings(values).astype(np.int64)
+    }
+
+
+def _compute_keys(info):
+    n = len(info["num_coords"])
+    coord_bits = info["coord_bits"]
+    bounds = info["bounds"]
+    num_coords = info["num_coords"]
+
+    ## Position of each coordinate within its geometry, so that the order of the coordinates changes the key
+    pos_in_geom = (np.arange(len(coord_bits)) - np.repeat(bounds[:-1], num_coords)).astype(np.uint64)
+
+    structure = ((info["type_ids"] + 1).astype(np.uint64) | (num_coords.astype(np.uint64) << np.uint64(8))
+                 | (info["has_z"].astype(np.uint64) << np.uint64(7)))
+    structure = _mix(structure) ^ _mix(info["num_parts"].astype(np.uint64)
+                                       ^ (info["num_holes"].astype(np.uint64) << np.uint64(32)))
+
+    ## One hash per coordinate from its bits and its position. The two halves of the key are sums of two different
+    ## functions of this hash, so that the coordinates only have to be mixed once.
+    with np.errstate(over="ignore"):
+        h = pos_in_geom * np.uint64(0x165667B19E3779F9) + coord_bits[:, 0] * np.uint64(0xC2B2AE3D27D4EB4F)
+        for d in range(1, coord_bits.shape[1]):
+            bits = coord_bits[:, d]
+            h += ((bits << np.uint64(7 * d)) | (bits >> np.uint64(64 - 7 * d))) * np.uint64(0xC2B2AE3D27D4EB4F + 2 * d)
+        h = _mix(h)
+        keys = np.empty((n, 2), dtype=np.uint64)
+        keys[:, 0] = _mix(_segment_sum(h, bounds) ^ structure ^ _SEEDS[0])
+        keys[:, 1] = _mix(_segment_sum(h * (h | np.uint64(1)), bounds) ^ structure ^ _SEEDS[1])
+
+    return keys
+
+
+def get_geometry_keys(geometry):
+    """
+    Computes a 128-bit key (two uint64 values) for every geometry directly from the coordinate buffer of shapely,
+    without creating a WKB bytes object per geometry. Geometries with the same WKB always get the same key.
+    Different geometries get the same key only in case of a hash collision, which get_geometry_ids resolves exactly.
+
+    :param geometry: GeoSeries or array of shapely geometries.
+    :return: numpy array of shape (n, 2) with dtype uint64.
+    """
+    values = np.asarray(getattr(geometry, "values", geometry), dtype=object)
+    if len(values) == 0:
+        return np.empty((0, 2), dtype=np.uint64)
+
+    return _compute_keys(_get_coordinate_info(values))
+
+
+def _confirm_simple_duplicates(info, rows, first_rows):
+    """
+    Checks exactly whether the geometries of rows are equal to the geometries of first_rows by comparing the
+    structure and the coordinate bits. This is only decisive for missing geometries, points, linestrings, linear rings and polygons
+    without holes, whose WKB is fully defined by the type, the dimension and the coordinates.
+
+    :return: Boolean array, True if the geometries of a row and its first row are certainly identical.
+    """
+    type_ids = info["type_ids"]
+    num_coords = info["num_coords"]
+    confirmed = ((type_ids[rows] == type_ids[first_rows]) & (type_ids[rows] <= 3) & (info["num_holes"][rows] <= 0)
+                 & (num_coords[rows] == num_coords[first_rows]) & (info["has_z"][rows] == info["has_z"][first_rows]))
+
+    check = np.flatnonzero(confirmed)
+    counts = num_coords[rows[check]]
+    if counts.sum() > 0:
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        coord_idx = np.repeat(info["bounds"][rows[check]], counts) + offsets
+        first_idx = np.repeat(info["bounds"][first_rows[check]], counts) + offsets
+        coord_bits = info["coord_bits"]
+        mismatch = (coord_bits[coord_idx] != coord_bits[first_idx]).any(axis=1)
+        num_mismatches = np.bincount(np.repeat(np.arange(len(check)), counts), weights=mismatch, minlength=len(check))
+        confirmed[check[num_mismatches > 0]] = False
+
+    return confirmed
+
+
+def get_geometry_ids(geometry, return_keys=False):
+    """
+    Assigns the same integer ID to all geometries with identical WKB (the same as comparing gdf.geometry.to_wkb()).
+    IDs are numbered in the order of the first occurrence, like enumerating the unique WKBs. Missing geometries get
+    one common ID.
+
+    Geometries are first grouped by their 128-bit key. Rows that share a key with an earlier row are then compared
+    exactly with this row: simple geometries by their coordinates, all other geometries by their WKB, which is only
+    created for these rows. Hash collisions can therefore never merge different geometries.
+
+    :param geometry: GeoSeries or array of shapely geometries.
+    :param return_keys: If True, the keys of get_geometry_keys are returned as well.
+    :return: numpy array with dtype int64 (and the keys if return_keys is True).
+    """
+    values = np.asarray(getattr(geometry, "values", geometry), dtype=object)
+    n = len(values)
+    if n == 0:
+        ids, keys = np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.uint64)
+        return (ids, keys) if return_keys else ids
+
+    info = _get_coordinate_info(values)
+    keys = _compute_keys(info)
+    ids = pd.DataFrame(keys).groupby([0, 1], sort=False).ngroup().to_numpy().astype(np.int64)
+
+    ## Exact check of all rows that share a key with an earlier row. The IDs are numbered in the order of their first
+    ## occurrence, so the first row of each ID is where the running maximum increases.
+    is_first = np.ones(n, dtype=bool)
+    is_first[1:] = ids[1:] > np.maximum.accumulate(ids)[:-1]
+    first_rows = np.flatnonzero(is_first)[ids]
+    rows = np.flatnonzero(first_rows != np.arange(n))
+    confirmed = _confirm_simple_duplicates(info, rows, first_rows[rows])
+    if confirmed.all():
+        return (ids, keys) if return_keys else ids
+
+    ## All rows of the keys that could not be confirmed are compared by their WKB
+    unconfirmed_ids = np.unique(ids[rows[~confirmed]])
+    candidates = np.isin(ids, unconfirmed_ids)
+    wkb = shapely.to_wkb(values[candidates])
+    refined = pd.DataFrame({"id": ids[candidates], "wkb": wkb}).groupby(
+        ["id", "wkb"], sort=False, dropna=False).ngroup().to_numpy()
+    ids = ids.copy()
+    ids[candidates] = n + refined
+    ids = pd.factorize(ids)[0].astype(np.int64)
+
+    return (ids, keys) if return_keys else ids
+
+
+def get_duplicate_mask(ids, has_info=None):
+    """
+    Marks the rows that should be removed, so that one row per geometry ID remains.
+
+    :param ids: Geometry IDs (see get_geometry_ids).
+    :param has_info: Optional boolean array. If provided, the first row with has_info == True of each geometry is
+        kept. If no row of a geometry has info, the first row is kept.
+    :return: Boolean numpy array, True for the rows that are duplicates.
+    """
+    ids = np.asarray(ids)
+    n = len(ids)
+    if has_info is None:
+        _, keep_idx = np.unique(ids, return_index=True)
+    else:
+        ## Within each geometry, rows with info come first and then the rows in their original order
+        order = np.lexsort((np.arange(n), ~np.asarray(has_info, dtype=bool), ids))
+        first = np.ones(n, dtype=bool)
+        first[1:] = ids[order][1:] != ids[order][:-1]
+        keep_idx = order[first]
+
+    duplicates = np.ones(n, dtype=bool)
+    duplicates[keep_idx] = False
+
+    return duplicates
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import geopandas as gpd
+import shapely
+
+from my_utils import profiling
+
+## Number of geometries that are checked, repaired or normalized at once
+CHUNK_SIZE = 100_000
+## Number of processes for the repair of invalid geometries. With 1, they are repaired in the current process.
+N_WORKERS = 1
+## Minimum number of invalid geometries per process. Fewer invalid geometries are not worth starting the processes.
+MIN_GEOMETRIES_PER_WORKER = 1_000
+## "buffer" repairs with buffer(0), like the scripts did for all geometries before. "make_valid" keeps all parts of
+## the geometries (e.g. both halves of a bow-tie polygon), but can return lines or points for collapsed parts.
+REPAIR_METHOD = "buffer"
+
+
+def _repair(geometries, method):
+    if method == "buffer":
+        return shapely.buffer(geometries, 0)
+    if method == "make_valid":
+        return shapely.make_valid(geometries, method="structure", keep_collapsed=False)
+    raise ValueError(f"Invalid repair method: '{method}'. Must be 'buffer' or 'make_valid'.")
+
+
+def _apply_in_chunks(func, geometries, chunk_size):
+    out = np.empty(len(geometries), dtype=object)
+    for start in range(0, len(geometries), chunk_size):
+        out[start:start + chunk_size] = func(geometries[start:start + chunk_size])
+    return out
+
+
+@profiling.step("repair_geometries")
+def repair_geometries(geometry, method=REPAIR_METHOD, normalize=True, n_workers=N_WORKERS, chunk_size=CHUNK_SIZE):
+    """
+    Repairs the invalid geometries of a GeoSeries and normalizes all geometries. Validity is checked in vectorized
+    chunks and only invalid geometries are repaired, because repairing (buffer(0)) is expensive and most geometries
+    are already valid. The invalid geometries are split between n_workers processes if there are enough of them.
+
+    Valid geometries are not passed through buffer(0) anymore. They are topologically the same as before, but
+    e.g. repeated vertices are kept.
+
+    :param geometry: GeoSeries.
+    :param method: "buffer" or "make_valid" (see REPAIR_METHOD).
+    :param normalize: If True, all geometries are normalized (same as GeoSeries.normalize()).
+    :param n_workers: Number of processes for the repair.
+    :param chunk_size: Number of geometries per chunk.
+    :return: Repaired GeoSeries with the index and crs of the input.
+    """
+    stime = time.time()
+    geometries = np.asarray(geometry.values, dtype=object)
+
+    ## Missing geometries are not valid, but there is nothing to repair
+    is_valid = _apply_in_chunks(shapely.is_valid, geometries, chunk_size).astype(bool)
+    invalid = np.flatnonzero(~is_valid & ~shapely.is_missing(geometries))
+    check_time = time.time() - stime
+
+    geometries = geometries.copy()
+    if len(invalid) > 0:
+        to_repair = geometries[invalid]
+        n_workers = max(1, min(n_workers, len(invalid) // MIN_GEOMETRIES_PER_WORKER))
+        if n_workers > 1:
+            chunks = np.array_split(to_repair, n_workers)
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                repaired = np.concatenate(list(executor.map(_repair, chunks, [method] * n_workers)))
+        else:
+            repaired = _apply_in_chunks(lambda chunk: _repair(chunk, method), to_repair, chunk_size)
+        geometries[invalid] = repaired
+    repair_time = time.time() - stime - check_time
+
+    if normalize:
+        geometries = _apply_in_chunks(shapely.normalize, geometries, chunk_size)
+    normalize_time = time.time() - stime - check_time - repair_time
+
+    print(f"Geometry repair: {len(invalid)} of {len(geometries)} geometries were invalid and repaired with {method} "
+          f"(check {check_time:.1f}s, repair {repair_time:.1f}s with {n_workers if len(invalid) else 0} processes, "
+          f"normalize {normalize_time:.1f}s).")
+
+    return gpd.GeoSeries(geometries, index=geometry.index, crs=geometry.crs, name=geometry.name)
@@ -0,0 +1,137 @@
+import numpy as np
+import geopandas as gpd
+import shapely
+import pyarrow as pa
+from pyproj import CRS, Transformer
+
+from my_utils import profiling
+
+## Default settings for the harmonized IACS_EU_Land outputs
+COMPRESSION = "zstd"
+COMPRESSION_LEVEL = 6
+ROW_GROUP_SIZE = 100_000
+## Columns with few unique values that are stored with dictionary encoding. All other columns are stored plain.
+DICTIONARY_COLUMNS = ["crop_name", "crop_code", "EC_trans_n", "EC_hcat_n", "EC_hcat_c", "organic"]
+SPATIAL_SORT = "hilbert"
+## Cell size in meters for the grid sort
+GRID_SIZE = 10_000
+SORT_CRS = 3035
+
+
+def get_sort_extent():
+    """
+    Returns the extent (xmin, ymin, xmax, ymax) of the area of use of SORT_CRS in SORT_CRS. Sort keys that are derived
+    with this extent can be compared between different parts of the data (see chunked_io.GeoParquetBatchWriter).
+    """
+    area = CRS.from_epsg(SORT_CRS).area_of_use
+
+    return Transformer.from_crs(4326, SORT_CRS, always_xy=True).transform_bounds(*area.bounds)
+
+
+def get_spatial_sort_key(geometry, method="hilbert", grid_size=GRID_SIZE, total_bounds=None):
+    """
+    Derives a key from the centroids of the geometries in EPSG:3035 that places geometries that are close to each
+    other next to each other, when the data are sorted by the key.
+
+    :param geometry: GeoSeries.
+    :param method: "hilbert" (position along a Hilbert curve over the extent of the data) or "grid" (row by row
+        through a grid with the cell size grid_size).
+    :param grid_size: Cell size of the grid in meters. Only used if method is "grid".
+    :param total_bounds: Fixed extent (xmin, ymin, xmax, ymax) in EPSG:3035 instead of the extent of the data, e.g.
+        get_sort_extent(), so that the keys of different parts of the data can be compared. Centroids outside of it
+        get the key of the nearest position at its border.
+    :return: numpy array with one key per geometry.
+    """
+    if geometry.crs is not None and not geometry.crs.equals(SORT_CRS):
+        geometry = geometry.to_crs(SORT_CRS)
+    centroids = gpd.GeoSeries(shapely.centroid(geometry.values), index=geometry.index, crs=geometry.crs)
+    if total_bounds is not None:
+        xmin, ymin, xmax, ymax = total_bounds
+        centroids = centroids.copy()
+        inside = ~(shapely.is_missing(centroids.values) | shapely.is_empty(centroids.values))
+        centroids[inside] = shapely.points(np.clip(centroids[inside].x, xmin, xmax),
+                                           np.clip(centroids[inside].y, ymin, ymax))
+
+    if method == "hilbert":
+        valid = ~centroids.is_empty & centroids.notna()
+        keys = np.zeros(len(centroids), dtype=np.int64)
+        if valid.any():
+            keys[valid.to_numpy()] = centroids[valid].hilbert_distance(total_bounds=total_bounds).to_numpy()
+        return keys
+    elif method == "grid":
+        if len(centroids) == 0:
+            return np.empty(0, dtype=np.int64)
+        x = np.floor(centroids.x.fillna(0).to_numpy() / grid_size).astype(np.int64)
+        y = np.floor(centroids.y.fillna(0).to_numpy() / grid_size).astype(np.int64)
+        if total_bounds is not None:
+            x = x - int(np.floor(total_bounds[0] / grid_size))
+            y = y - int(np.floor(total_bounds[1] / grid_size))
+            num_columns = int(np.floor(total_bounds[2] / grid_size)) - int(np.floor(total_bounds[0] / grid_size)) + 1
+            return y * num_columns + x
+        x = x - x.min()
+        y = y - y.min()
+        return y * (x.max() + 1) + x
+    else:
+        raise ValueError(f"Invalid value for the spatial sort: '{method}'. Must be one of ['hilbert', 'grid'].")
+
+
+def sort_spatially(gdf, method="hilbert", grid_size=GRID_SIZE):
+    """
+    Sorts a GeoDataFrame by the spatial key of get_spatial_sort_key. The sort is stable and the index is reset.
+    """
+    keys = get_spatial_sort_key(gdf.geometry, method=method, grid_size=grid_size)
+    order = np.argsort(keys, kind="stable")
+
+    return gdf.iloc[order].reset_index(drop=True)
+
+
+def get_bbox_array(geometry):
+    """
+    Returns the bounding boxes of the geometries as Arrow struct array with the fields xmin, ymin, xmax and ymax, as
+    defined for the bbox covering column in GeoParquet 1.1.
+    """
+    bounds = shapely.bounds(geometry)
+    arrays = [pa.array(bounds[:, i], type=pa.float64()) for i in range(4)]
+
+    return pa.StructArray.from_arrays(arrays, names=["xmin", "ymin", "xmax", "ymax"])
+
+
+def get_parquet_options(columns, compression=COMPRESSION, compression_level=COMPRESSION_LEVEL,
+                        dictionary_columns=DICTIONARY_COLUMNS):
+    """
+    Returns the options for pyarrow.parquet for the harmonized outputs. Dictionary encoding is only used for the
+    dictionary_columns that are in the data.
+    """
+    options = {"compression": compression, "use_dictionary": [col for col in dictionary_columns if col in columns]}
+    if compression_level is not None and compression not in [None, "snappy", "none"]:
+        options["compression_level"] = compression_level
+
+    return options
+
+
+@profiling.step("write_geoparquet")
+def write_geoparquet(gdf, out_pth, compression=COMPRESSION, compression_level=COMPRESSION_LEVEL,
+                     row_group_size=ROW_GROUP_SIZE, dictionary_columns=DICTIONARY_COLUMNS, spatial_sort=SPATIAL_SORT,
+                     write_bbox=True):
+    """
+    Writes a GeoDataFrame as geoparquet, so that readers can skip row groups that are outside of their region. The
+    rows are sorted spatially, the file is written in row groups of row_group_size rows and a bbox covering column
+    (GeoParquet 1.1) is added, whose statistics per row group can be used for spatial filters, e.g.
+    gpd.read_parquet(pth, bbox=(xmin, ymin, xmax, ymax)).
+
+    :param gdf: GeoDataFrame.
+    :param out_pth: Output path.
+    :param compression: "zstd", "snappy", "gzip" or None.
+    :param compression_level: Compression level (not used for snappy).
+    :param row_group_size: Number of rows per row group.
+    :param dictionary_columns: Columns that are stored with dictionary encoding.
+    :param spatial_sort: "hilbert", "grid" or None (keeps the order of the rows).
+    :param write_bbox: If True, the bbox covering column is written.
+    :return:
+    """
+    if spatial_sort and len(gdf) > 0:
+        gdf = sort_spatially(gdf, method=spatial_sort)
+
+    options = get_parquet_options(gdf.columns, compression=compression, compression_level=compression_level,
+                                  dictionary_columns=dictionary_columns)
+    gdf.to_parquet(out_pth, row_group_size=row_group_size, write_covering_bbox=write_bbox, **options)
@@ -0,0 +1,90 @@
+import os
+import time
+
+from my_utils import helper_functions
+from my_utils import run_metrics
+
+## Text file to which the uniqueness report of each GSA file is appended (see write_uniqueness_report)
+UNIQUENESS_REPORT_PTH = os.path.join("data", "vector", "IACS", "countries_with_non-unique_field_ids.txt")
+
+
+def clean_gsa_data(iacs, field_id_col=None):
+    """
+    Drops the non-geometries and the duplicate geometries of GSA data and counts the features and unique field IDs
+    before and after each step.
+
+    :param iacs: GeoDataFrame.
+    :param field_id_col: Column with the field IDs. None if the file has no field IDs.
+    :return: Tuple of the cleaned GeoDataFrame and a dictionary with the counts for write_uniqueness_report.
+    """
+    stats = {"nrows_in": len(iacs)}
+    if field_id_col:
+        stats["unique_fids_in"] = len(iacs[field_id_col].unique())
+
+    iacs = helper_functions.drop_non_geometries(iacs)
+    stats["nrows_non_geom_clean"] = len(iacs)
+    iacs = helper_functions.remove_geometry_duplicates(iacs)
+    stats["nrows_dup_geom_clean"] = len(iacs)
+
+    if field_id_col:
+        stats["unique_fids_clean"] = len(iacs[field_id_col].unique())
+    run_metrics.add_counts(**stats)
+
+    return iacs, stats
+
+
+def write_uniqueness_report(stats, iacs_pth, region_id, field_id_col=None, out_txt_pth=UNIQUENESS_REPORT_PTH):
+    """
+    Appends the counts of clean_gsa_data for one GSA file to the uniqueness report.
+
+    :param stats: Dictionary returned by clean_gsa_data.
+    :param iacs_pth: Path to the original GSA file.
+    :param region_id: Region ID that is written as header of the entry.
+    :param field_id_col: Original name of the field ID column. None if the file has no field IDs.
+    :param out_txt_pth: Path to the report.
+    """
+    ## Get modification date of input data
+    mod_date = os.path.getmtime(iacs_pth)
+    pretty_date = time.strftime("%d %b %Y %H:%M:%S", time.localtime(mod_date))
+
+    if not field_id_col:
+        print("No 'field_id' provided.")
+        txt = (f"{region_id}\n{pretty_date} - {iacs_pth}\n\t"
+               f"No field ID in original file.\n\t"
+               f"Number of input features: {stats['nrows_in']}\n\t"
+               f"Number of features after dropping non-geometries: {stats['nrows_non_geom_clean']}\n\t"
+               f"Number of features after dropping duplicate geometries: {stats['nrows_dup_geom_clean']}\n\t")
+    else:
+        txt = (f"{region_id}\n{pretty_date} - {iacs_pth}\n\t"
+               f"Number of input features: {stats['nrows_in']}\n\t"
+               f"Number of input unique IDs: {stats['unique_fids_in']}\n\t"
+               f"Number of features after dropping non-geometries: {stats['nrows_non_geom_clean']}\n\t"
+               f"Number of features after dropping duplicate geometries: {stats['nrows_dup_geom_clean']}\n\t"
+               f"Number of unique IDs after cleaning: {stats['unique_fids_clean']}\n\t"
+               f"Field ID column: {field_id_col}\n\n")
+
+    with open(out_txt_pth, "a") as file:
+        file.write(txt)
+
+
+def add_unique_field_ids(iacs, field_id_col=None):
+    """
+    Makes sure that every feature of cleaned GSA data has a unique field ID. If there are no field IDs, they are
+    created from the geometries ("EL_field_id"). If the field IDs are not unique, a counter is added to them
+    ("uni_id"). Otherwise, the field IDs are kept.
+
+    :param iacs: GeoDataFrame without non-geometries and duplicate geometries (see clean_gsa_data).
+    :param field_id_col: Column with the field IDs. None if the file has no field IDs.
+    :return: Tuple of the GeoDataFrame and the name of the column with the unique field IDs.
+    """
+    if not field_id_col:
+        unique_id_col = "EL_field_id"
+        iacs[unique_id_col] = helper_functions.create_unique_field_ids(iacs.geometry)
+    elif len(iacs) != len(iacs[field_id_col].unique()):
+        unique_id_col = "uni_id"
+        iacs[unique_id_col] = helper_functions.make_id_unique_by_adding_cumcount(iacs[field_id_col])
+    else:
+        unique_id_col = field_id_col
+    print(f"Final number of features: {len(iacs)}, and unique IDs: {len(iacs[unique_id_col].unique())}")
+
+    return iacs, unique_id_col
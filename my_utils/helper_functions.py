@@ -4,8 +4,10 @@ import os
 import geopandas as gpd
 import pandas as pd
 import numpy as np
-import warnings
-from pathlib import Path
+
+from my_utils import geometry_dedup
+from my_utils import field_ids
+from my_utils import profiling
 
 def list_geospatial_data_in_dir(dir):
 
@@ -74,6 +76,7 @@ def truncate_coord(value):
     v = np.floor(value).astype(np.int64)
     return v
 
+@profiling.step("create_unique_field_ids")
 def create_unique_field_ids(geometry: gpd.GeoSeries, precision: int = 7) -> pd.Series:
     """
     Generates unique IDs based on geometry centroids.
@@ -86,30 +89,9 @@ def create_unique_field_ids(geometry: gpd.GeoSeries, precision: int = 7) -> pd.S
     Returns:
         pd.Series: A series of unique string IDs.
     """
-    # 1. Calculate Centroids (Vectorized)
-    # Warning: Ensure data is in a projected CRS (meters) or consistent CRS for meaningful IDs
-    geometry = geometry.to_crs(3035)
-    centroids = geometry.representative_point()
-
-    # 2. Extract X and Y coordinates
-    # We round to ensure floating point stability before string conversion
-    xs = truncate_coord(centroids.x)
-    ys = truncate_coord(centroids.y)
-
-    # 3. Create Base ID string (Vectorized string formatting)
-    # This matches your f-string format: "12.1234567_50.1234567"
-    # formatting floats via map/apply is often necessary for strict decimal control
-    base_ids = (
-            xs.map(lambda x: f"{x:07d}_") +
-            ys.map(lambda y: f"{y:07d}")
-    )
-
-    # 4. Handle Duplicates (Vectorized)
-    # groupby().cumcount() creates the 1, 2, 3 sequence for identical coordinates
-    counts = base_ids.groupby(base_ids).cumcount() + 1
-
-    # 5. Construct Final ID
-    unique_ids = base_ids + "_" + counts.astype(str)
+    # Representative points in EPSG:3035 (computed in parallel chunks), occurrence counter on integer keys and
+    # rendering of the strings with Arrow. See field_ids.create_field_ids.
+    unique_ids = field_ids.create_field_ids(geometry)
 
     return unique_ids
 
@@ -124,6 +106,7 @@ def drop_non_geometries_and_add_unique_fid(iacs):
 
     return iacs
 
+@profiling.step("drop_non_geometries")
 def drop_non_geometries(iacs):
     print("Drop non-geometries")
     in_len = len(iacs)
@@ -137,26 +120,25 @@ def drop_non_geometries(iacs):
 def extract_geometry_duplicates(in_pth, out_pth):
 
     gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    geom_ids = geometry_dedup.get_geometry_ids(gdf.geometry)
 
-    dups = gdf[gdf.duplicated("geom_id", "first")].copy()
+    dups = geometry_dedup.get_duplicate_mask(geom_ids)
 
-    print(f"{len(dups)} geometry duplicates were found for {in_pth}.")
+    print(f"{dups.sum()} geometry duplicates were found for {in_pth}.")
 
-    dups_out = gdf.loc[gdf["geom_id"].isin(list(dups["geom_id"].unique()))].copy()
-    dups_out.drop(columns="geom_id", inplace=True)
+    dups_out = gdf.loc[np.isin(geom_ids, np.unique(geom_ids[dups]))].copy()
     dups_out.to_file(out_pth)
 
 
+@profiling.step("remove_geometry_duplicates")
 def remove_geometry_duplicates(gdf):
 
     in_len = len(gdf)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    geom_ids = geometry_dedup.get_geometry_ids(gdf.geometry)
 
-    gdf.drop_duplicates(subset="geom_id", inplace=True)
+    gdf = gdf.loc[~geometry_dedup.get_duplicate_mask(geom_ids)].copy()
     out_len = len(gdf)
     print(f"{in_len-out_len} geometry duplicates were found.")
-    gdf.drop(columns="geom_id", inplace=True)
     return gdf
 
 def remove_geometry_duplicates_prefer_non_empty_crops(
@@ -184,12 +166,12 @@ def remove_geometry_duplicates_prefer_non_empty_crops(
     -------
     GeoDataFrame
     """
-    gdf = gdf.copy()
     in_len = len(gdf)
     print(f"Number of entries: {in_len}")
 
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    geom_ids = geometry_dedup.get_geometry_ids(gdf.geometry)
 
+    has_info = None
     if crop_col and prefer_nonempty_crop:
         # Build a "has info" flag for crop_col
         s = gdf[crop_col]
@@ -197,19 +179,11 @@ def remove_geometry_duplicates_prefer_non_empty_crops(
         has_info = s.notna()
         if empty_strings_are_empty and pd.api.types.is_string_dtype(s):
             has_info = has_info & s.astype(str).str.strip().ne("")
+        has_info = has_info.to_numpy()
 
-        # Sort so "has info" comes first within each geom_id.
-        # drop_duplicates keeps the first occurrence.
-        gdf["_has_crop_info"] = has_info
-        gdf = gdf.sort_values(["geom_id", "_has_crop_info"], ascending=[True, False])
-
-        gdf = gdf.drop_duplicates(subset="geom_id", keep="first")
-
-        gdf = gdf.drop(columns=["_has_crop_info"])
-    else:
-        gdf = gdf.drop_duplicates(subset="geom_id", keep="first")
-
-    gdf = gdf.drop(columns="geom_id")
+    # Keeps the first row with info per geometry (or the first row, if no row has info).
+    # The rows keep their original order.
+    gdf = gdf.loc[~geometry_dedup.get_duplicate_mask(geom_ids, has_info)].copy()
 
     out_len = len(gdf)
     print(f"{in_len-out_len} Duplicates removed. Remaining entries: {out_len}")
@@ -246,39 +220,8 @@ def load_geodata_safe(filepath, encoding=None):
     Safely loads a geodata file.
     - For multi-layer formats (GPKG, KML): Warns if >1 layer and loads the first.
     - For single-layer formats (Parquet, Shapefile, GeoJSON): Loads directly.
+    The file is read with geodata_reader.read_geodata (pyogrio with Arrow, parquet with pyarrow).
     """
-    path = Path(filepath)
-
-    # 1. Handle Parquet/GeoParquet explicitly
-    # These formats do not support layers, so list_layers() would fail.
-    if path.suffix.lower() in ['.parquet', '.geoparquet']:
-        return gpd.read_parquet(filepath)
-
-    # 2. Try to list layers for other formats (GPKG, KML, GDB, etc.)
-    try:
-        layers_df = gpd.list_layers(filepath)
-
-        # Check for multiple layers
-        if len(layers_df) > 1:
-            layer_names = layers_df['name'].tolist()
-            warnings.warn(
-                f"File '{path.name}' contains {len(layers_df)} layers: {layer_names}. "
-                f"Only the first layer ('{layer_names[0]}') will be loaded.",
-                UserWarning
-            )
-
-        # Load the specific first layer by name
-        first_layer_name = layers_df.iloc[0]['name']
-        if encoding:
-            return gpd.read_file(filepath, layer=first_layer_name, encoding=encoding)
-        else:
-            return gpd.read_file(filepath, layer=first_layer_name)
-
-    except Exception:
-        # 3. Fallback: If list_layers fails (e.g. Shapefiles sometimes),
-        # just try to load it directly.
-        if encoding:
-            return gpd.read_file(filepath, encoding=encoding)
-        else:
-            return gpd.read_file(filepath)
+    from my_utils import geodata_reader
 
+    return geodata_reader.read_geodata(filepath, encoding=encoding)
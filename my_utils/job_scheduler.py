@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import traceback
+import contextlib
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from my_utils import helper_functions
+
+## Factors between the size of a file on disk and the memory that is needed to process it completely in memory.
+## Compressed formats expand more than uncompressed ones. The values are rough estimates from our full EU runs.
+MEMORY_FACTORS = {
+    ".geoparquet": 12,
+    ".parquet": 12,
+    ".gpkg": 4,
+    ".shp": 5,
+    ".gdb": 6,
+    ".geojson": 2,
+    ".csv": 4
+}
+DEFAULT_MEMORY_FACTOR = 6
+
+
+def get_path_size(pth):
+    """
+    Returns the size of a file in bytes. For folders (e.g. File Geodatabases) the sizes of all files in the folder are
+    summed up. For shapefiles, the sidecar files (.dbf, .shx, ...) are included.
+    """
+    if os.path.isdir(pth):
+        return sum(os.path.getsize(os.path.join(root, f)) for root, dirs, files in os.walk(pth) for f in files)
+
+    root, ext = os.path.splitext(pth)
+    if ext.lower() == ".shp":
+        return sum(os.path.getsize(root + side) for side in [".shp", ".dbf", ".shx", ".prj", ".cpg"]
+                   if os.path.exists(root + side))
+
+    return os.path.getsize(pth)
+
+
+def estimate_job_memory_mb(input_pth):
+    """
+    Estimates the peak memory in megabytes that is needed to process an input file completely in memory.
+    """
+    ext = os.path.splitext(input_pth)[1].lower()
+    factor = MEMORY_FACTORS.get(ext, DEFAULT_MEMORY_FACTOR)
+
+    return get_path_size(input_pth) * factor / (1024 * 1024)
+
+
+def run_job(func, kwargs, log_pth=None):
+    """
+    Runs a single job. If a log path is provided, everything that the job prints (including warnings and tracebacks)
+    is written to that log file instead of the console.
+
+    :param func: Function that should be run.
+    :param kwargs: Keyword arguments of the function.
+    :param log_pth: Path to a log file.
+    :return: Dictionary with the status ("success" or "failed"), the duration in seconds and the error message.
+    """
+    stime = time.time()
+    result = {"status": "success", "error": ""}
+
+    if log_pth:
+        helper_functions.create_folder(os.path.dirname(log_pth))
+        log_file = open(log_pth, "w", encoding="utf-8")
+        redirect = contextlib.ExitStack()
+        redirect.enter_context(contextlib.redirect_stdout(log_file))
+        redirect.enter_context(contextlib.redirect_stderr(log_file))
+    else:
+        log_file = None
+        redirect = contextlib.nullcontext()
+
+    with redirect:
+        try:
+            func(**kwargs)
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+
+    if log_file:
+        log_file.close()
+
+    result["duration"] = time.time() - stime
+
+    return result
+
+
+def get_log_pth(log_dir, job):
+    """Returns the path of the log file of a job in log_dir or None if no log_dir is provided."""
+    if not log_dir:
+        return None
+
+    return os.path.join(log_dir, job["name"].replace("/", "_").replace(" ", "_") + ".log")
+
+
+def run_jobs_sequentially(jobs, log_dir=None, on_job_done=None):
+    """
+    Runs jobs one after another in this process. Like in run_jobs_in_pool, a failing job does not stop the other jobs
+    and a summary of all jobs is printed at the end.
+
+    :param jobs: List of dictionaries with the keys "name", "func" and "kwargs".
+    :param log_dir: Folder for the per-job log files. If None, the jobs print to the console.
+    :param on_job_done: Optional function that is called with the job and its result as soon as a job is finished.
+    :return: List of dictionaries with the name, status, duration, error and log path of each job.
+    """
+    results = []
+    for i, job in enumerate(jobs):
+        print(f"{i + 1}/{len(jobs)} - Processing - {job['name']}")
+        log_pth = get_log_pth(log_dir, job)
+        result = run_job(job["func"], job["kwargs"], log_pth)
+        result["name"] = job["name"]
+        result["log"] = log_pth
+        results.append(result)
+        print(f"Finished {job['name']} - {result['status']}")
+        if on_job_done:
+            on_job_done(job, result)
+
+    print_job_summary(results)
+
+    return results
+
+
+def run_jobs_in_pool(jobs, max_workers, memory_budget_mb=None, log_dir=None, on_job_done=None):
+    """
+    Runs jobs in a process pool. A job is only started if the sum of the estimated memory of all running jobs plus
+    the estimated memory of the new job stays within the memory budget. If a single job exceeds the budget, it is
+    started as soon as no other job is running, so that it runs alone.
+
+    :param jobs: List of dictionaries with the keys "name", "func", "kwargs" and "memory_mb". "func" has to be a
+        function that can be pickled, i.e. defined at module level.
+    :param max_workers: Maximum number of parallel processes.
+    :param memory_budget_mb: Memory that all running jobs may use together in megabytes. If None, only max_workers
+        limits the number of parallel jobs.
+    :param log_dir: Folder for the per-job log files. If None, the jobs print to the console.
+    :param on_job_done: Optional function that is called in the main process with the job and its result as soon as
+        a job is finished, e.g. to record successful outputs.
+    :return: List of dictionaries with the name, status, duration, error and log path of each job.
+    """
+    print(f"Running {len(jobs)} jobs with {max_workers} workers.")
+
+    pending = list(jobs)
+    running = {}
+    results = []
+    used_memory_mb = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+
+            ## Start as many jobs as the number of workers and the memory budget allow
+            i = 0
+            while i < len(pending) and len(running) < max_workers:
+                job = pending[i]
+                memory_mb = job.get("memory_mb", 0)
+                fits = memory_budget_mb is None or used_memory_mb + memory_mb <= memory_budget_mb
+                if fits or not running:
+                    pending.pop(i)
+                    log_pth = get_log_pth(log_dir, job)
+                    future = executor.submit(run_job, job["func"], job["kwargs"], log_pth)
+                    running[future] = (job, log_pth)
+                    used_memory_mb += memory_mb
+                    print(f"Started {job['name']} (estimated memory: {memory_mb:.0f} MB)")
+                else:
+                    i += 1
+
+            ## Wait until at least one job is done
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                job, log_pth = running.pop(future)
+                used_memory_mb -= job.get("memory_mb", 0)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    ## e.g. if the worker process was killed because it ran out of memory
+                    result = {"status": "failed", "error": f"{type(e).__name__}: {e}", "duration": float("nan")}
+                result["name"] = job["name"]
+                result["log"] = log_pth
+                results.append(result)
+                print(f"Finished {job['name']} - {result['status']}")
+                if on_job_done:
+                    on_job_done(job, result)
+
+    print_job_summary(results)
+
+    return results
+
+
+def print_job_summary(results):
+    """
+    Prints a table with the status and the duration of all jobs and the number of successful and failed jobs.
+    """
+    if not results:
+        print("No jobs were run.")
+        return
+
+    df = pd.DataFrame(results)
+    df["duration [min]"] = (df["duration"] / 60).round(1)
+    df = df[["name", "status", "duration [min]", "error", "log"]].sort_values(by=["status", "name"])
+
+    print("\nSummary of all jobs:")
+    with pd.option_context("display.max_rows", None, "display.max_colwidth", 80, "display.width", 200):
+        print(df.to_string(index=False))
+    num_failed = int((df["status"] == "failed").sum())
+    print(f"{len(df) - num_failed} jobs succeeded, {num_failed} jobs failed.")
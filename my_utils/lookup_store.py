@@ -0,0 +1,155 @@
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+
+from my_utils import atomic_files
+
+## The compiled store lives next to the source tables. All paths are relative to the working directory of the scripts.
+STORE_FOLDER = os.path.join("data", "tables", "compiled_lookup_store")
+SOURCE_FOLDERS = [os.path.join("data", "tables", "column_name_translations"),
+                  os.path.join("data", "tables", "crop_classifications")]
+INDEX_NAME = "index.json"
+
+## Tables that were already opened in this process, keyed by the source path and its size and modification time
+_LOADED = {}
+
+
+def _source_key(source_pth):
+    return os.path.normpath(source_pth).replace(os.sep, "/")
+
+
+def _source_stat(source_pth):
+    stat = os.stat(source_pth)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_index(store_folder):
+    ## If the index cannot be read, the tables will be recompiled
+    return atomic_files.load_json(os.path.join(store_folder, INDEX_NAME), {})
+
+
+def _save_index(index, store_folder):
+    atomic_files.save_json(index, os.path.join(store_folder, INDEX_NAME))
+
+
+def _compile_table(source_pth, store_folder):
+    """
+    Reads a csv table exactly like the scripts do (pd.read_csv with default settings) and writes it as uncompressed
+    Arrow IPC file, which is much faster to load than parsing the csv again. Tables that do not survive the round trip without any change (e.g.
+    columns with mixed types) are not compiled and will be read from the csv.
+
+    :return: Index entry of the table.
+    """
+    entry = _source_stat(source_pth)
+    entry["compiled"] = None
+
+    df = pd.read_csv(source_pth)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return entry
+    roundtrip = table.to_pandas()
+    if not (roundtrip.dtypes.equals(df.dtypes) and roundtrip.equals(df)):
+        return entry
+
+    name = _source_key(source_pth).replace("/", "__").replace(".", "_") + ".arrow"
+
+    def write(tmp_pth):
+        with pa.OSFile(tmp_pth, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    atomic_files.write_atomic(os.path.join(store_folder, name), write)
+    entry["compiled"] = name
+
+    return entry
+
+
+def compile_lookup_store(source_folders=None, store_folder=STORE_FOLDER):
+    """
+    Compiles all column name translation tables and crop classification tables (csv) into a store of Arrow IPC files.
+    Only tables whose csv changed since the last compilation (size or modification time) are compiled again.
+    Compiled tables of deleted csv files are removed from the store.
+
+    :param source_folders: Folders with the csv tables. Defaults to SOURCE_FOLDERS.
+    :param store_folder: Output folder of the store.
+    :return: Index of the store as dictionary (source path -> entry).
+    """
+    if source_folders is None:
+        source_folders = SOURCE_FOLDERS
+    os.makedirs(store_folder, exist_ok=True)
+
+    stime = time.time()
+    index = _load_index(store_folder)
+    new_index = {}
+    num_compiled = 0
+
+    for folder in source_folders:
+        if not os.path.isdir(folder):
+            continue
+        for file in sorted(os.listdir(folder)):
+            if not file.endswith(".csv"):
+                continue
+            source_pth = os.path.join(folder, file)
+            key = _source_key(source_pth)
+            entry = index.get(key)
+            if entry is None or {k: entry.get(k) for k in ["size", "mtime_ns"]} != _source_stat(source_pth):
+                entry = _compile_table(source_pth, store_folder)
+                num_compiled += 1
+            new_index[key] = entry
+
+    ## Remove tables whose source was deleted
+    for key, entry in index.items():
+        if key not in new_index and entry.get("compiled"):
+            compiled_pth = os.path.join(store_folder, entry["compiled"])
+            if os.path.exists(compiled_pth):
+                os.remove(compiled_pth)
+
+    _save_index(new_index, store_folder)
+    print(f"Lookup store: {num_compiled} of {len(new_index)} tables compiled in {time.time() - stime:.1f}s.")
+
+    return new_index
+
+
+def read_table(source_pth, store_folder=STORE_FOLDER):
+    """
+    Returns a column name translation table or a crop classification table. The result is the same as
+    pd.read_csv(source_pth), but the table is loaded from its compiled Arrow file if it is up to date. If the csv
+    changed since the last compilation, the table is compiled again. Tables are only loaded once per process (each
+    worker process of c3 loads its own copy).
+
+    A copy is returned, so that the caller can change the table without changing it for other callers.
+
+    :param source_pth: Path to the csv table.
+    :param store_folder: Folder of the compiled store.
+    :return: pandas.DataFrame.
+    """
+    if not source_pth.endswith(".csv"):
+        return pd.read_csv(source_pth)
+
+    stat = _source_stat(source_pth)
+    cache_key = (_source_key(source_pth), stat["size"], stat["mtime_ns"])
+    if cache_key in _LOADED:
+        return _LOADED[cache_key].copy()
+
+    index = _load_index(store_folder)
+    entry = index.get(_source_key(source_pth))
+    if entry is None or {k: entry.get(k) for k in ["size", "mtime_ns"]} != stat:
+        os.makedirs(store_folder, exist_ok=True)
+        entry = _compile_table(source_pth, store_folder)
+        index = _load_index(store_folder)
+        index[_source_key(source_pth)] = entry
+        _save_index(index, store_folder)
+
+    compiled_pth = os.path.join(store_folder, entry["compiled"]) if entry["compiled"] else None
+    if compiled_pth and os.path.exists(compiled_pth):
+        with pa.memory_map(compiled_pth, "r") as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas()
+    else:
+        df = pd.read_csv(source_pth)
+
+    _LOADED[cache_key] = df
+
+    return df.copy()
+
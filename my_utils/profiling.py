@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+import atexit
+import argparse
+import contextlib
+import tracemalloc
+import pandas as pd
+
+## Profiling is switched on with the environment variable IACS_PROFILE ("1", or "memory" to also trace the Python
+## allocations with tracemalloc, which is much slower) or with the flags --profile / --profile-memory of the scripts
+## (see enable_from_args). If it is off, the steps cost nearly nothing.
+ENV_VAR = "IACS_PROFILE"
+ENABLED = os.environ.get(ENV_VAR, "0").lower() not in ["", "0", "false", "off"]
+TRACE_MEMORY = os.environ.get(ENV_VAR, "").lower() == "memory"
+
+## Folder for the folded stacks of each run (one line per step: "run;step;sub-step <self time in microseconds>"),
+## which can be opened with flamegraph.pl or speedscope
+PROFILE_FOLDER = os.path.join("data", "vector", "IACS_EU_Land", "logs", "profiles")
+
+## Stack of the open steps and the timings of the current run: {(run, step, ...): {"calls", "seconds", ...}}
+_STACK = []
+_TIMINGS = {}
+
+
+def enable(trace_memory=False):
+    """
+    Switches on the profiling for this process and for the processes that it starts (e.g. the job pool of c3).
+    """
+    global ENABLED, TRACE_MEMORY
+    ENABLED = True
+    TRACE_MEMORY = trace_memory
+    os.environ[ENV_VAR] = "memory" if trace_memory else "1"
+
+
+def enable_from_args(argv=None):
+    """Switches on the profiling if a script was started with --profile or --profile-memory."""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--profile-memory" in argv:
+        enable(trace_memory=True)
+    elif "--profile" in argv:
+        enable()
+
+
+def get_rss_mb():
+    """Returns the current memory (resident set size) of this process in megabytes or None if it is unknown."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class step(contextlib.ContextDecorator):
+    """
+    Times a step of the processing as context manager or decorator and records the change of the memory (RSS) and,
+    with TRACE_MEMORY, the peak of the Python allocations during the step. Steps can be nested. The timings are
+    collected per run (see run) and written out as folded stacks.
+
+    Example:
+        with profiling.step("to_crs"):
+            iacs = iacs.to_crs(3035)
+
+        @profiling.step("classify_crops")
+        def classify_crops(...):
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if not ENABLED:
+            return self
+        if not _STACK:
+            _STACK.append({"path": (_get_default_run_name(),), "start": time.perf_counter(), "children": 0.0,
+                           "rss": get_rss_mb(), "peak": 0.0, "implicit": True})
+        if TRACE_MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _STACK[-1]["peak"] = max(_STACK[-1]["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        _STACK.append({"path": _STACK[-1]["path"] + (self.name,), "start": time.perf_counter(), "children": 0.0,
+                       "rss": get_rss_mb(), "peak": 0.0})
+        return self
+
+    def __exit__(self, *exc):
+        if not ENABLED or not _STACK or _STACK[-1]["path"][-1] != self.name:
+            return False
+        _close_frame()
+        return False
+
+
+def _get_default_run_name():
+    return os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+
+
+def _close_frame():
+    frame = _STACK.pop()
+    seconds = time.perf_counter() - frame["start"]
+    rss = get_rss_mb()
+    peak = frame["peak"]
+    if TRACE_MEMORY and tracemalloc.is_tracing():
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+
+    timing = _TIMINGS.setdefault(frame["path"], {"calls": 0, "seconds": 0.0, "self_seconds": 0.0,
+                                                 "rss_delta_mb": 0.0, "traced_peak_mb": 0.0})
+    timing["calls"] += 1
+    timing["seconds"] += seconds
+    timing["self_seconds"] += seconds - frame["children"]
+    if rss is not None and frame["rss"] is not None:
+        timing["rss_delta_mb"] += rss - frame["rss"]
+    timing["traced_peak_mb"] = max(timing["traced_peak_mb"], peak / 1024 ** 2)
+
+    if _STACK:
+        _STACK[-1]["children"] += seconds
+        _STACK[-1]["peak"] = max(_STACK[-1]["peak"], peak)
+
+
+@contextlib.contextmanager
+def run(name):
+    """
+    Collects the steps of one run (e.g. one region and year of a stage), prints the breakdown and writes the folded
+    stacks to PROFILE_FOLDER when the run is finished (a later run with the same name replaces them). Runs cannot be
+    nested; a run inside a run is a step.
+
+    :param name: Name of the run, e.g. "c3_XX_2021".
+    """
+    if not ENABLED:
+        yield
+        return
+    if _STACK and not _STACK[0].get("implicit"):
+        with step(name):
+            yield
+        return
+
+    outer_stack = list(_STACK)
+    outer_timings = dict(_TIMINGS)
+    _STACK.clear()
+    _TIMINGS.clear()
+    _STACK.append({"path": (name,), "start": time.perf_counter(), "children": 0.0, "rss": get_rss_mb(), "peak": 0.0})
+    try:
+        yield
+    finally:
+        ## Close steps that were left open by an exception
+        while _STACK:
+            _close_frame()
+        export_run(name)
+        _STACK[:] = outer_stack
+        _TIMINGS.clear()
+        _TIMINGS.update(outer_timings)
+
+
+def get_breakdown():
+    """Returns the timings of the current run as a DataFrame with one row per step."""
+    df = pd.DataFrame([{"step": ";".join(path), **timing} for path, timing in _TIMINGS.items()])
+    if df.empty:
+        return df
+    total = max(timing["seconds"] for path, timing in _TIMINGS.items() if len(path) == 1)
+    df["share"] = (df["self_seconds"] / total * 100 if total > 0 else 0.0)
+
+    return df.sort_values("step")
+
+
+def export_run(name, folder=None):
+    """Prints the breakdown of the current run and writes its folded stacks to <folder>/<name>.folded."""
+    df = get_breakdown()
+    if df.empty:
+        return
+    folder = folder or PROFILE_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    out_pth = os.path.join(folder, f"{name.replace('/', '_')}.folded")
+    with open(out_pth, "w", encoding="utf-8") as file:
+        for row in df.itertuples():
+            file.write(f"{row.step} {int(round(row.self_seconds * 1e6))}\n")
+
+    print(f"\nProfile of {name} (written to {out_pth}):")
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.max_colwidth", 80):
+        print(df.round(3).to_string(index=False))
+
+
+def _export_implicit_run():
+    """Exports the steps that were not part of a run (e.g. of the pre_processing scripts) when the process ends."""
+    if ENABLED and _STACK and _STACK[0].get("implicit"):
+        name = _STACK[0]["path"][0]
+        while _STACK:
+            _close_frame()
+        export_run(name)
+
+
+atexit.register(_export_implicit_run)
+
+
+def read_folded(folder=None):
+    """Reads all folded stacks of a folder into a DataFrame with the run, the step and its self time in seconds."""
+    folder = folder or PROFILE_FOLDER
+    rows = []
+    for file_name in sorted(os.listdir(folder)):
+        if not file_name.endswith(".folded"):
+            continue
+        with open(os.path.join(folder, file_name), encoding="utf-8") as file:
+            for line in file:
+                path, micro_seconds = line.rstrip("\n").rsplit(" ", 1)
+                frames = path.split(";")
+                rows.append({"run": frames[0], "step": frames[1] if len(frames) > 1 else "(self)",
+                             "seconds": int(micro_seconds) / 1e6})
+
+    return pd.DataFrame(rows, columns=["run", "step", "seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares where the profiled runs spend their time.")
+    ## The scripts run in the parent directory of the repository, so the default folder is resolved from there
+    default_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                  PROFILE_FOLDER)
+    parser.add_argument("folder", nargs="?", default=default_folder, help="Folder with the .folded files.")
+    parser.add_argument("--share", action="store_true", help="Show the share of each step in percent.")
+    args = parser.parse_args()
+
+    df = read_folded(args.folder)
+    if df.empty:
+        print("No profiles found.")
+        return
+
+    ## Time per run and top-level step (including the time of the sub-steps)
+    table = df.pivot_table(index="run", columns="step", values="seconds", aggfunc="sum", fill_value=0)
+    if args.share:
+        table = table.div(table.sum(axis=1), axis=0) * 100
+    table["total"] = df.groupby("run")["seconds"].sum() if not args.share else 100.0
+
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 250):
+        print(table.sort_values("total", ascending=False).round(1).to_string())
+
+
+if __name__ == '__main__':
+    main()
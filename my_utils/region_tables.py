@@ -0,0 +1,125 @@
+import os
+import re
+
+from my_utils import lookup_store
+
+## Resolvers that were already built in this process, keyed by the table paths, the region ID and the size and
+## modification time of the tables
+_RESOLVERS = {}
+
+
+def get_column_translation(tr_df, region_id, year):
+    """
+    Derives the dictionary that translates the original column names of a specific year to the unified column names.
+
+    :param tr_df: Column name translation table.
+    :param region_id: Region ID used in the column names of the translation table.
+    :param year: Year of the data.
+    :return: Tuple of the translation table subset to the rows with prelim == 1 and the translation dictionary.
+    """
+    ## Optional: Subset the columns that should be in the final file
+    tr_df = tr_df.loc[tr_df["prelim"] == 1].copy()
+
+    ## Create a dictionary that translates old column names to unified column names
+    col_year = f"{region_id}_{year}"
+    col_dict = dict(zip(tr_df.loc[tr_df[col_year].notna(), col_year], tr_df.loc[tr_df[col_year].notna(), "column_name"]))
+
+    ## In some cases, multiple columns are provided (e.g. for crops in field blocks), therefore the dictionary has to
+    ## be corrected.
+    keys = list(col_dict.keys())
+    keys_dict = {i: i.split('|')[0] for i in keys}
+    col_dict = {keys_dict[key]: col_dict[key] for key in keys_dict}
+
+    return tr_df, col_dict
+
+
+class RegionTableResolver:
+    """
+    Holds the column name translation table and the crop classification table of one region and the translations of
+    all years of the region. The tables are read once and the translations of all years are derived once, so that
+    the setup for each file of the region is only a dictionary lookup.
+
+    The resolver is read-only. The tables and dictionaries it returns are copies.
+    """
+
+    def __init__(self, col_translate_pth, region_id, crop_class_pth=None):
+        self.col_translate_pth = col_translate_pth
+        self.region_id = region_id
+        self.crop_class_pth = crop_class_pth
+
+        tr_df = lookup_store.read_table(col_translate_pth)
+        self.tr_df = tr_df.loc[tr_df["prelim"] == 1].copy()
+        self.cl_df = lookup_store.read_table(crop_class_pth) if crop_class_pth else None
+
+        ## Translations of all years of the region in the table
+        pattern = re.compile(rf"^{re.escape(str(region_id))}_(.+)$")
+        self.years = {}
+        for col in self.tr_df.columns:
+            match = pattern.match(str(col))
+            if not match:
+                continue
+            values = self.tr_df.loc[self.tr_df[col].notna(), [col, "column_name"]]
+            original_dict = dict(zip(values[col], values["column_name"]))
+            self.years[match.group(1)] = {
+                "col_dict": {key.split('|')[0]: value for key, value in original_dict.items()},
+                "original_col_dict": original_dict
+            }
+
+    def _get_year(self, year):
+        year = str(year)
+        if year not in self.years:
+            raise KeyError(f"{self.region_id}_{year} is not a column of {self.col_translate_pth}.")
+        return self.years[year]
+
+    def get_column_translation(self, year):
+        """
+        Same as get_column_translation(read_table(col_translate_pth), region_id, year).
+
+        :return: Tuple of the translation table subset to the rows with prelim == 1 and the translation dictionary.
+        """
+        return self.tr_df.copy(), dict(self._get_year(year)["col_dict"])
+
+    def get_field_id_translation(self, year):
+        """Returns the dictionary that renames the original field ID column of a year to "field_id" (or {})."""
+        return {k: v for k, v in self._get_year(year)["original_col_dict"].items() if v == "field_id"}
+
+    def get_input_columns(self, year, unified_columns=None):
+        """
+        Returns the original columns of a year that are renamed to the given unified columns (all unified columns if
+        None). Original columns that already have the unified name are included, because they are kept as well.
+        """
+        col_dict = self._get_year(year)["col_dict"]
+        if unified_columns is None:
+            unified_columns = self.get_harmonized_columns()
+        columns = [key for key, value in col_dict.items() if value in unified_columns]
+
+        return columns + [col for col in unified_columns if col not in columns]
+
+    def get_harmonized_columns(self):
+        """Returns all column names that should appear in the harmonized files."""
+        return self.tr_df["column_name"].tolist()
+
+    def get_crop_classification(self):
+        """Returns a copy of the crop classification table."""
+        if self.cl_df is None:
+            raise ValueError(f"No crop classification table was provided for {self.region_id}.")
+        return self.cl_df.copy()
+
+
+def get_resolver(col_translate_pth, region_id, crop_class_pth=None):
+    """
+    Returns the RegionTableResolver of a region. Resolvers are built once per process and built again only if one of
+    the tables changed (size or modification time). Worker processes therefore build the resolver of a region once for
+    all of its files.
+    """
+    stats = []
+    for pth in [col_translate_pth, crop_class_pth]:
+        if pth:
+            stat = os.stat(pth)
+            stats.append((stat.st_size, stat.st_mtime_ns))
+    key = (col_translate_pth, str(region_id), crop_class_pth, tuple(stats))
+
+    if key not in _RESOLVERS:
+        _RESOLVERS[key] = RegionTableResolver(col_translate_pth, region_id, crop_class_pth)
+
+    return _RESOLVERS[key]
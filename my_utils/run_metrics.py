@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import functools
+import pandas as pd
+
+from my_utils import profiling
+
+## JSON lines file to which one record per (stage, region, year) run is appended. Several processes can append to it
+## at the same time, because each record is written while the file is locked.
+METRICS_PTH = os.path.join("data", "vector", "IACS_EU_Land", "logs", "run_metrics.jsonl")
+
+## Parameters of the tracked functions that hold the input and output paths
+INPUT_PARAMETERS = ["iacs_pth"]
+OUTPUT_PARAMETERS = ["iacs_new_pth", "out_pth", "cleaned_out_pth"]
+
+## Counts of the run that is tracked in this process (see add_counts)
+_CURRENT_COUNTS = None
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def _reset_peak_rss():
+    """Resets the peak memory of this process on Linux, so that the peak of each run is measured on its own."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def _get_peak_rss_mb():
+    """
+    Returns the peak memory (resident set size) of this process in megabytes. On Linux, it is the peak since the last
+    _reset_peak_rss, on other systems the peak since the start of the process. None if it cannot be measured.
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    ## ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def _get_size(pth):
+    from my_utils import job_scheduler
+
+    if pth and os.path.exists(pth):
+        return job_scheduler.get_path_size(pth)
+    return 0
+
+
+def add_counts(**counts):
+    """
+    Adds counts (e.g. nrows_in=5000) to the record of the run that is currently tracked in this process. Does nothing
+    if no run is tracked, so that the functions can also be used on their own.
+    """
+    if _CURRENT_COUNTS is not None:
+        _CURRENT_COUNTS.update({key: int(value) for key, value in counts.items()})
+
+
+def record_metrics(record, metrics_pth=None):
+    """
+    Appends a record as one JSON line to the metrics file. The file is locked while writing, so that records of
+    parallel processes do not interleave.
+
+    :param record: Dictionary that can be serialized to JSON.
+    :param metrics_pth: Path to the metrics file. None uses METRICS_PTH.
+    """
+    metrics_pth = metrics_pth or METRICS_PTH
+    folder = os.path.dirname(metrics_pth)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    line = json.dumps(record, default=str) + "\n"
+    with open(metrics_pth, "a", encoding="utf-8") as file:
+        _lock(file)
+        try:
+            file.seek(0, os.SEEK_END)
+            file.write(line)
+            file.flush()
+        finally:
+            _unlock(file)
+
+
+def track_run(stage):
+    """
+    Decorator that records the metrics of each call of a processing function: stage, region ID, year, input and output
+    paths, status, wall time, peak memory, bytes read (size of the input) and bytes written (size of the outputs) and
+    all counts that are added with add_counts during the call. The region ID, year and paths are taken from the
+    arguments of the function (see INPUT_PARAMETERS and OUTPUT_PARAMETERS).
+
+    :param stage: Name of the stage, e.g. "c3_classify_crops_and_unify_column_names".
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            global _CURRENT_COUNTS
+
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            arguments = arguments.arguments
+            input_pth = next((arguments[p] for p in INPUT_PARAMETERS if arguments.get(p)), None)
+            output_pths = [arguments[p] for p in OUTPUT_PARAMETERS if arguments.get(p)]
+
+            record = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()), "stage": stage,
+                      "region_id": arguments.get("region_id"), "year": arguments.get("year"), "input": input_pth,
+                      "outputs": output_pths, "status": "success", "error": ""}
+
+            outer_counts = _CURRENT_COUNTS
+            _CURRENT_COUNTS = {}
+            _reset_peak_rss()
+            stime = time.time()
+            try:
+                with profiling.run(f"{stage.split('_')[0]}_{record['region_id']}_{record['year']}"):
+                    return func(*args, **kwargs)
+            except Exception as e:
+                record["status"] = "failed"
+                record["error"] = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                record["seconds"] = round(time.time() - stime, 3)
+                record["peak_rss_mb"] = _get_peak_rss_mb()
+                record["bytes_read"] = _get_size(input_pth)
+                record["bytes_written"] = sum(_get_size(pth) for pth in output_pths)
+                record.update(_CURRENT_COUNTS)
+                _CURRENT_COUNTS = outer_counts
+                try:
+                    record_metrics(record)
+                except OSError as e:
+                    print(f"Could not record the run metrics: {e}")
+
+        return wrapper
+
+    return decorator
+
+
+def read_metrics(metrics_pth=None):
+    """Reads all records of the metrics file into a DataFrame."""
+    metrics_pth = metrics_pth or METRICS_PTH
+
+    return pd.read_json(metrics_pth, lines=True, dtype={"region_id": str, "year": str})
+
+
+def summarize_metrics(df, group_by=("stage",)):
+    """
+    Aggregates the records per group: number of runs and failed runs, summed rows, wall time and data volume, the
+    throughput and the highest peak memory.
+
+    :param df: DataFrame of read_metrics.
+    :param group_by: Columns to group by, e.g. ("stage", "region_id"). "date" groups by the day of the runs.
+    :return: DataFrame with one row per group.
+    """
+    df = df.copy()
+    df["date"] = df["timestamp"].astype(str).str[:10]
+    df["failed"] = df["status"] == "failed"
+    for col in ["nrows_in", "nrows_out", "peak_rss_mb"]:
+        if col not in df.columns:
+            df[col] = float("nan")
+
+    summary = df.groupby(list(group_by)).agg(
+        runs=("stage", "size"), failed=("failed", "sum"), nrows_in=("nrows_in", "sum"),
+        nrows_out=("nrows_out", "sum"), seconds=("seconds", "sum"), mb_read=("bytes_read", "sum"),
+        mb_written=("bytes_written", "sum"), max_peak_rss_mb=("peak_rss_mb", "max")).reset_index()
+    summary["mb_read"] = summary["mb_read"] / 1024 ** 2
+    summary["mb_written"] = summary["mb_written"] / 1024 ** 2
+    summary["mb_read_per_s"] = summary["mb_read"] / summary["seconds"].where(summary["seconds"] > 0)
+    summary["rows_per_s"] = summary["nrows_in"] / summary["seconds"].where(summary["seconds"] > 0)
+
+    return summary.round(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarizes the run metrics of the processing stages.")
+    ## The scripts run in the parent directory of the repository, so the default path is resolved from there
+    default_pth = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               METRICS_PTH)
+    parser.add_argument("metrics_pth", nargs="?", default=default_pth, help="Path to the metrics file.")
+    parser.add_argument("--group_by", nargs="+", default=["stage"],
+                        help="Columns to group by, e.g. stage region_id year date.")
+    parser.add_argument("--stage", help="Only summarize the runs of this stage.")
+    parser.add_argument("--region_id", help="Only summarize the runs of this region.")
+    args = parser.parse_args()
+
+    df = read_metrics(args.metrics_pth)
+    if args.stage:
+        df = df.loc[df["stage"] == args.stage]
+    if args.region_id:
+        df = df.loc[df["region_id"] == args.region_id]
+    if df.empty:
+        print("No runs recorded.")
+        return
+
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 250):
+        print(summarize_metrics(df, args.group_by).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow.parquet as pq
+import pyogrio
+from pyogrio.raw import open_arrow
+
+from my_utils import atomic_files
+from my_utils import fingerprints
+
+## Probing is mostly waiting for the disk, so more threads than cores are used
+N_THREADS = min(16, 2 * (os.cpu_count() or 1))
+## Results of earlier probes, keyed by the file path. An entry is reused as long as the fingerprint of the file and the
+## encoding did not change.
+CACHE_PTH = os.path.join("data", "tables", "column_names", "schema_probe_cache.json")
+## Increase this number if the content of the probe results changes, so that all files are probed again
+PROBE_VERSION = 2
+
+
+def _to_json_value(value):
+    """Converts an example value to a value that can be stored in the json cache."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _probe_parquet(path):
+    pf = pq.ParquetFile(path)
+    ## The geometry columns are not listed, like in the OGR Parquet driver. The geo metadata are taken from the
+    ## key-value metadata of the file, where chunked_io.GeoParquetBatchWriter writes them.
+    geo = (pf.metadata.metadata or {}).get(b"geo")
+    geometry_columns = list(json.loads(geo).get("columns", {})) if geo else []
+    columns = [name for name in pf.schema_arrow.names if name not in geometry_columns]
+
+    examples = [None] * len(columns)
+    if pf.metadata.num_rows > 0 and columns:
+        batch = next(pf.iter_batches(batch_size=1, columns=columns))
+        examples = [batch.column(i)[0].as_py() for i in range(len(columns))]
+
+    return {"columns": columns, "examples": examples, "num_layers": 1}
+
+
+def _probe_ogr(path, encoding=None):
+    layers = pyogrio.list_layers(path)
+    if len(layers) > 1:
+        print(f"Warning: File '{path}' contains {len(layers)} layers. Only the first layer will be processed.")
+    layer = layers[0][0]
+
+    ## The encoding is only applied to shapefiles, like SHAPE_ENCODING before
+    if os.path.splitext(path)[1].lower() != ".shp":
+        encoding = None
+
+    ## Only the first batch of a single feature is read, without geometries
+    with open_arrow(path, layer=layer, encoding=encoding, read_geometry=False, batch_size=1,
+                    use_pyarrow=True) as (meta, reader):
+        columns = [str(name) for name in meta["fields"]]
+        examples = [None] * len(columns)
+        for batch in reader:
+            if batch.num_rows == 0:
+                continue
+            examples = [batch.column(name)[0].as_py() for name in columns]
+            break
+
+    return {"columns": columns, "examples": examples, "num_layers": len(layers)}
+
+
+def probe_file(path, encoding=None):
+    """
+    Reads the column names and the values of the first feature of a geodata file from its metadata and the first
+    record batch. Geometries and all other features are not read.
+
+    :param path: Path to the geodata file (all formats of helper_functions.list_geospatial_data_in_dir).
+    :param encoding: Encoding of the attributes of shapefiles. Ignored for other formats.
+    :return: Dictionary with the keys columns, examples (values of the first feature, None for empty files) and
+        num_layers.
+    """
+    if os.path.splitext(path)[1].lower() in [".parquet", ".geoparquet"]:
+        result = _probe_parquet(path)
+    else:
+        result = _probe_ogr(path, encoding)
+    result["examples"] = [_to_json_value(value) for value in result["examples"]]
+
+    return result
+
+
+def probe_files(paths, encodings=None, n_threads=N_THREADS, cache_pth=CACHE_PTH):
+    """
+    Probes several geodata files in parallel threads (see probe_file). Results of files that did not change since the
+    last probe are taken from the cache.
+
+    :param paths: List of paths.
+    :param encodings: Optional dictionary path -> encoding.
+    :param n_threads: Number of threads.
+    :param cache_pth: Path of the json cache. None disables the cache.
+    :return: Dictionary path -> result of probe_file.
+    """
+    stime = time.time()
+    encodings = encodings or {}
+    cache = atomic_files.load_json(cache_pth, {})
+
+    keys = {}
+    results = {}
+    to_probe = []
+    for path in paths:
+        fingerprint = fingerprints.get_file_fingerprint(path)
+        keys[path] = {"version": PROBE_VERSION, "size": fingerprint["size"], "mtime_ns": fingerprint["mtime_ns"],
+                      "encoding": encodings.get(path)}
+        entry = cache.get(os.path.normpath(path).replace(os.sep, "/"))
+        if entry is not None and entry["key"] == keys[path]:
+            results[path] = entry["result"]
+        else:
+            to_probe.append(path)
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=max(1, min(n_threads, len(to_probe)))) as executor:
+            probed = list(executor.map(lambda p: probe_file(p, encodings.get(p)), to_probe))
+        for path, result in zip(to_probe, probed):
+            results[path] = result
+            cache[os.path.normpath(path).replace(os.sep, "/")] = {"key": keys[path], "result": result}
+        if cache_pth:
+            atomic_files.save_json(cache, cache_pth)
+
+    print(f"Probed {len(to_probe)} of {len(paths)} files ({len(paths) - len(to_probe)} from cache) in "
+          f"{time.time() - stime:.1f}s.")
+
+    return {path: results[path] for path in paths}
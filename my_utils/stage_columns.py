@@ -0,0 +1,55 @@
+import os
+import pandas as pd
+
+from my_utils import schema_probe
+
+## Columns of the harmonized files (outputs of c3) that are read by the later stages. The geometry is read in
+## addition if a stage needs it.
+HARMONIZED_CROP_COLUMNS = ["crop_code", "crop_name", "EC_trans_n", "EC_hcat_n", "EC_hcat_c"]
+STAGE_COLUMNS = {
+    "c4_run_validity_check": HARMONIZED_CROP_COLUMNS,
+    "d1_count_number_features_per_year": ["field_size", "farm_id", "EC_hcat_n"]
+}
+
+## Unified columns of the original GSA data that are read by the earlier stages. They are translated to the original
+## column names with the translation table (see region_tables.RegionTableResolver.get_input_columns). None means all
+## unified columns of the translation table.
+RAW_STAGE_COLUMNS = {
+    "b4_check_unique_ids": ["field_id"],
+    "c3_classify_crops_and_unify_column_names": None
+}
+
+
+def get_file_columns(path, encoding=None, csv_sep=","):
+    """Returns the attribute columns of a geodata file (see schema_probe.probe_file) or the columns of a csv table."""
+    if os.path.splitext(path)[1].lower() == ".csv":
+        return pd.read_csv(path, sep=csv_sep, nrows=0, encoding=encoding).columns.tolist()
+
+    return schema_probe.probe_file(path, encoding)["columns"]
+
+
+def get_read_columns(path, columns, encoding=None, csv_sep=","):
+    """
+    Subsets the declared columns of a stage to the columns that exist in a file, so that they can be passed to
+    geodata_reader.read_geodata. Declared columns that are missing in the file are left out, like in a full read.
+
+    :param path: Path to the input.
+    :param columns: List of declared columns.
+    :return: List of columns in the declared order.
+    """
+    file_columns = set(get_file_columns(path, encoding, csv_sep))
+
+    return [col for col in dict.fromkeys(columns) if col in file_columns]
+
+
+def get_stage_columns(stage, path, encoding=None, csv_sep=","):
+    """Returns the columns of STAGE_COLUMNS[stage] that exist in a harmonized file."""
+    return get_read_columns(path, STAGE_COLUMNS[stage], encoding, csv_sep)
+
+
+def get_raw_stage_columns(stage, path, resolver, year, encoding=None, csv_sep=","):
+    """
+    Returns the original columns of a GSA file that a stage needs (RAW_STAGE_COLUMNS[stage] translated with the
+    resolver of the region) and that exist in the file.
+    """
+    return get_read_columns(path, resolver.get_input_columns(year, RAW_STAGE_COLUMNS[stage]), encoding, csv_sep)
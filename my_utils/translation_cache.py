@@ -0,0 +1,362 @@
+import os
+import sqlite3
+import time
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+## All translations are stored in one SQLite database, so that names are only translated once across runs and regions
+CACHE_PTH = os.path.join("data", "tables", "crop_names", "translation_cache.sqlite")
+## Maximum number of characters per request. Google accepts up to 5000 characters.
+MAX_REQUEST_CHARS = 4500
+## Separator between the texts of a bulk request. Each text is translated on its own line. Texts with line breaks
+## are therefore sent in their own request (see _chunk_texts).
+LINE_SEP = "\n"
+
+## Settings of the translation requests: number of parallel requests, allowed requests per second (token bucket),
+## number of retries and the delay before the first retry in seconds (doubled with every retry)
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 5
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+
+## Messages that providers of the package translate return instead of a translation (e.g. MyMemory when the daily quota
+## is used up). Responses that start with one of them are treated as failed requests and are not cached.
+PROVIDER_WARNINGS = ["MYMEMORY WARNING", "PLEASE SELECT TWO DISTINCT LANGUAGES", "INVALID LANGUAGE PAIR SPECIFIED",
+                     "QUERY LENGTH LIMIT EXCEEDED", "INVALID EMAIL PROVIDED", "NO QUERY SPECIFIED",
+                     "AUTHENTICATION FAILURE"]
+
+
+class LineCountError(ValueError):
+    """
+    The translation of a bulk request has a different number of lines than the request. Repeating the same request
+    gives the same result, so it is not retried and the texts are translated one by one instead.
+    """
+
+
+def normalize_text(text):
+    """Normalizes a text for the cache key: unicode normalization (NFC) and removal of surrounding whitespace."""
+    return unicodedata.normalize("NFC", str(text)).strip()
+
+
+def is_provider_warning(translation):
+    """Returns True if a translation is one of the PROVIDER_WARNINGS of the providers and not a translation."""
+    if not isinstance(translation, str):
+        return False
+    translation = translation.strip().upper()
+
+    return any(translation.startswith(warning) for warning in PROVIDER_WARNINGS)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Every request takes one token, tokens are refilled with the given rate and at most
+    capacity tokens can be collected, so that short bursts are possible.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate, 1)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ProviderStats:
+    """Collects the number of requests, texts, retries and failures and the latency of the requests of a provider."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency = 0.0
+        self.start = None
+        self.end = None
+
+    def add_request(self, num_texts, latency, failed=False):
+        with self.lock:
+            now = time.monotonic()
+            self.start = now - latency if self.start is None else min(self.start, now - latency)
+            self.end = now if self.end is None else max(self.end, now)
+            self.requests += 1
+            self.latency += latency
+            if failed:
+                self.failures += 1
+            else:
+                self.texts += num_texts
+
+    def add_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def summary(self):
+        duration = (self.end - self.start) if self.start is not None else 0
+        return {"requests": self.requests, "texts": self.texts, "retries": self.retries, "failures": self.failures,
+                "mean_latency_s": self.latency / self.requests if self.requests else 0,
+                "texts_per_s": self.texts / duration if duration > 0 else 0}
+
+
+## Statistics of all providers in this process
+_STATS = {}
+
+
+class GoogleBackend:
+    """Translates with deep_translator.GoogleTranslator. Multiple texts are sent as lines of one request."""
+
+    name = "google"
+    bulk = True
+
+    def translate_request(self, texts, source_lang, target_lang):
+        from deep_translator import GoogleTranslator
+
+        translated = GoogleTranslator(source=source_lang, target=target_lang).translate(LINE_SEP.join(texts))
+        ## A single text can have line breaks itself, so its translation is not split
+        if len(texts) == 1:
+            return [translated.strip() if translated else translated]
+        lines = translated.split(LINE_SEP) if translated else []
+        if len(lines) != len(texts):
+            raise LineCountError(f"Received {len(lines)} lines for {len(texts)} texts.")
+        return [line.strip() for line in lines]
+
+
+class TranslateLibBackend:
+    """
+    Translates with the providers of the package translate (mymemory, microsoft, deepl, libre). The key for providers
+    that need one is taken from the environment variable TRANSLATION_API_KEY. One text per request.
+    """
+
+    bulk = False
+
+    def __init__(self, provider):
+        self.name = provider
+
+    def translate_request(self, texts, source_lang, target_lang):
+        from translate import Translator
+
+        translator = Translator(provider=self.name, from_lang=source_lang, to_lang=target_lang,
+                                secret_access_key=os.environ.get("TRANSLATION_API_KEY"))
+        translations = []
+        for text in texts:
+            translation = translator.translate(text)
+            if is_provider_warning(translation):
+                raise ValueError(f"Provider {self.name} returned a warning instead of a translation: {translation}")
+            translations.append(translation)
+        return translations
+
+
+class StubBackend:
+    """Offline backend for tests. The translation is the text with the target language as prefix, e.g. "[en] Weizen"."""
+
+    name = "stub"
+    bulk = True
+
+    def translate_request(self, texts, source_lang, target_lang):
+        return [f"[{target_lang}] {text}" for text in texts]
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "stub": StubBackend,
+    "mymemory": lambda: TranslateLibBackend("mymemory"),
+    "microsoft": lambda: TranslateLibBackend("microsoft"),
+    "deepl": lambda: TranslateLibBackend("deepl"),
+    "libre": lambda: TranslateLibBackend("libre")
+}
+
+
+def _chunk_texts(texts, max_chars):
+    chunk = []
+    num_chars = 0
+    for text in texts:
+        ## Texts with line breaks would change the number of lines of a bulk request
+        if "\n" in text or "\r" in text:
+            yield [text]
+            continue
+        if chunk and num_chars + len(text) + len(LINE_SEP) > max_chars:
+            yield chunk
+            chunk = []
+            num_chars = 0
+        chunk.append(text)
+        num_chars += len(text) + len(LINE_SEP)
+    if chunk:
+        yield chunk
+
+
+def _request_with_retries(backend, texts, source_lang, target_lang, bucket, stats, max_retries, backoff_seconds):
+    """
+    Sends one request. Failed requests are repeated with exponential backoff, except for a LineCountError, which
+    would occur again. Returns None if all attempts fail.
+    """
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        stime = time.monotonic()
+        try:
+            result = backend.translate_request(texts, source_lang, target_lang)
+            stats.add_request(len(texts), time.monotonic() - stime)
+            return result
+        except Exception as e:
+            stats.add_request(len(texts), time.monotonic() - stime, failed=True)
+            if attempt == max_retries or isinstance(e, LineCountError):
+                if len(texts) == 1:
+                    print(f"Warning: Could not translate '{texts[0]}'. Error: {e}")
+                return None
+            stats.add_retry()
+            time.sleep(backoff_seconds * 2 ** attempt)
+
+
+def _translate_chunk(backend, texts, source_lang, target_lang, bucket, stats, max_retries, backoff_seconds):
+    result = _request_with_retries(backend, texts, source_lang, target_lang, bucket, stats, max_retries,
+                                   backoff_seconds)
+    if result is not None:
+        return dict(zip(texts, result))
+    if len(texts) == 1:
+        return {texts[0]: None}
+
+    ## The bulk request failed, therefore the texts are translated one by one
+    results = {}
+    for text in texts:
+        single = _request_with_retries(backend, [text], source_lang, target_lang, bucket, stats, max_retries,
+                                       backoff_seconds)
+        results[text] = single[0] if single else None
+    return results
+
+
+def translate_missing(missing, source_lang, backend="google", max_workers=MAX_WORKERS,
+                      requests_per_second=REQUESTS_PER_SECOND, max_retries=MAX_RETRIES,
+                      backoff_seconds=BACKOFF_SECONDS):
+    """
+    Translates texts into one or more target languages with parallel requests. All requests share one token bucket,
+    so that the provider receives at most requests_per_second requests.
+
+    :param missing: Dictionary target language -> list of texts.
+    :param source_lang: Source language.
+    :param backend: Name of the provider (see BACKENDS).
+    :return: Dictionary target language -> dictionary text -> translation (None if the translation failed).
+    """
+    provider = BACKENDS[backend]()
+    bucket = TokenBucket(requests_per_second)
+    stats = _STATS.setdefault(backend, ProviderStats())
+    max_chars = MAX_REQUEST_CHARS if provider.bulk else 0
+
+    tasks = [(target_lang, chunk) for target_lang, texts in missing.items()
+             for chunk in _chunk_texts(texts, max_chars)]
+    results = {target_lang: {} for target_lang in missing}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(target_lang, executor.submit(_translate_chunk, provider, chunk, source_lang, target_lang, bucket,
+                                                 stats, max_retries, backoff_seconds))
+                   for target_lang, chunk in tasks]
+        for target_lang, future in futures:
+            results[target_lang].update(future.result())
+
+    return results
+
+
+def _connect(cache_pth):
+    folder = os.path.dirname(cache_pth)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    con = sqlite3.connect(cache_pth, timeout=60)
+    con.execute("""CREATE TABLE IF NOT EXISTS translations (
+                   backend TEXT, source_lang TEXT, target_lang TEXT, text TEXT, translation TEXT, created REAL,
+                   PRIMARY KEY (backend, source_lang, target_lang, text))""")
+    return con
+
+
+def _read_cache(con, backend, source_lang, target_lang, keys):
+    ## Look up the cache in blocks, as the number of parameters of a query is limited
+    cached = {}
+    for i in range(0, len(keys), 500):
+        block = keys[i:i + 500]
+        rows = con.execute(
+            f"SELECT text, translation FROM translations WHERE backend = ? AND source_lang = ? AND target_lang = ? "
+            f"AND text IN ({','.join('?' * len(block))})", [backend, source_lang, target_lang] + block).fetchall()
+        ## Warnings that were cached by earlier versions are ignored, so that the texts are translated again
+        cached.update({text: translation for text, translation in rows if not is_provider_warning(translation)})
+    return cached
+
+
+def translate_texts_multi(values, source_lang, target_langs, backend="google", offline=False, cache_pth=CACHE_PTH):
+    """
+    Translates texts into several target languages with a persistent cache. Every unique text is only translated
+    once per language. Texts that are not in the cache are translated with parallel requests for all target
+    languages at once (see translate_missing) and stored in the cache. Failed translations are not stored, so that
+    they are tried again in the next run.
+
+    :param values: List, array or Series of texts. Missing and empty values are not translated (None).
+    :param source_lang: Source language (e.g. "fr").
+    :param target_langs: List of target languages (e.g. ["en", "de"]).
+    :param backend: Name of the provider (see BACKENDS). "stub" is an offline test backend (see StubBackend).
+    :param offline: If True, translations are only taken from the cache. Texts that are not in the cache get None.
+    :param cache_pth: Path to the SQLite cache.
+    :return: Dictionary target language -> list of translations in the order of values.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid translation backend: '{backend}'. Must be one of {list(BACKENDS)}.")
+
+    values = pd.Series(values, dtype=object)
+    keys = ["" if pd.isna(v) else normalize_text(v) for v in values]
+    unique_keys = sorted({key for key in keys if key})
+
+    con = _connect(cache_pth)
+    try:
+        cached = {target_lang: _read_cache(con, backend, source_lang, target_lang, unique_keys)
+                  for target_lang in target_langs}
+        missing = {target_lang: [key for key in unique_keys if key not in cached[target_lang]]
+                   for target_lang in target_langs}
+        missing = {target_lang: texts for target_lang, texts in missing.items() if texts}
+
+        for target_lang, texts in missing.items():
+            if offline:
+                print(f"Offline mode: {len(texts)} of {len(unique_keys)} texts are not in the translation cache "
+                      f"({source_lang} -> {target_lang}).")
+            else:
+                print(f"Translating {len(texts)} of {len(unique_keys)} texts ({source_lang} -> {target_lang}).")
+
+        if missing and not offline:
+            translated = translate_missing(missing, source_lang, backend=backend)
+            new_rows = [(backend, source_lang, target_lang, text, translation, time.time())
+                        for target_lang in translated for text, translation in translated[target_lang].items()
+                        if translation and not is_provider_warning(translation)]
+            with con:
+                con.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)", new_rows)
+            for row in new_rows:
+                cached[row[2]][row[3]] = row[4]
+    finally:
+        con.close()
+
+    return {target_lang: [cached[target_lang].get(key) if key else None for key in keys]
+            for target_lang in target_langs}
+
+
+def translate_texts(values, source_lang, target_lang, backend="google", offline=False, cache_pth=CACHE_PTH):
+    """
+    Translates texts into one target language. See translate_texts_multi.
+
+    :return: List of translations in the order of values.
+    """
+    return translate_texts_multi(values, source_lang, [target_lang], backend=backend, offline=offline,
+                                 cache_pth=cache_pth)[target_lang]
+
+
+def print_translation_stats():
+    """Prints the number of requests, texts, retries and failures, the latency and the throughput per provider."""
+    for backend, stats in _STATS.items():
+        summary = stats.summary()
+        print(f"Translation provider {backend}: {summary['requests']} requests, {summary['texts']} texts translated, "
+              f"{summary['retries']} retries, {summary['failures']} failed requests, "
+              f"mean latency {summary['mean_latency_s']:.2f}s, {summary['texts_per_s']:.1f} texts/s.")
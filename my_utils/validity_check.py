@@ -0,0 +1,153 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+
+from my_utils import geodata_reader
+from my_utils import stage_columns
+
+## Columns that identify an original crop and the column that is empty if a crop was not classified
+PAIR_COLUMNS = ["crop_code", "crop_name"]
+HCAT_COLUMN = "EC_hcat_n"
+
+
+def get_null_count(path, column):
+    """
+    Returns the number of missing values of a column of a parquet file from the statistics of its row groups, without
+    reading the column. Returns None if a row group has no statistics.
+    """
+    metadata = pq.ParquetFile(path).metadata
+    index = metadata.schema.to_arrow_schema().get_field_index(column)
+    if index < 0:
+        return None
+
+    null_count = 0
+    for i in range(metadata.num_row_groups):
+        statistics = metadata.row_group(i).column(index).statistics
+        if statistics is None or not statistics.has_null_count:
+            return None
+        null_count += statistics.null_count
+
+    return null_count
+
+
+def _get_codes(column):
+    """
+    Returns the dictionary indices of a column (-1 for missing values) and the dictionary. Dictionary-encoded columns
+    are used as they are, all others are encoded.
+    """
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if not pa.types.is_dictionary(column.type):
+        column = pc.dictionary_encode(column)
+    indices = column.indices.to_numpy(zero_copy_only=False)
+    indices = np.where(column.is_null().to_numpy(zero_copy_only=False), -1, indices).astype(np.int64)
+
+    return indices, column.dictionary
+
+
+def get_unique_pairs(path, filters=None):
+    """
+    Returns the unique combinations of crop code and crop name of a parquet file in the order of their first
+    occurrence. String columns are read as dictionaries, so that only the integer indices are compared and only the
+    unique values are decoded.
+
+    :param path: Path to a (geo)parquet file.
+    :param filters: Optional row filter (pyarrow expression).
+    :return: DataFrame with the columns crop_code, crop_name and row (position of the first occurrence).
+    """
+    schema = pq.read_schema(path)
+    read_dictionary = [col for col in PAIR_COLUMNS
+                       if pa.types.is_string(schema.field(col).type) or pa.types.is_large_string(schema.field(col).type)
+                       or pa.types.is_binary(schema.field(col).type)]
+    table = pq.read_table(path, columns=PAIR_COLUMNS, filters=filters, read_dictionary=read_dictionary)
+    table = table.unify_dictionaries()
+
+    code_indices, code_dictionary = _get_codes(table.column(PAIR_COLUMNS[0]))
+    name_indices, name_dictionary = _get_codes(table.column(PAIR_COLUMNS[1]))
+
+    ## One integer key per combination. The missing values (-1) are shifted to 0.
+    keys = (code_indices + 1) * (len(name_dictionary) + 1) + (name_indices + 1)
+    _, first_rows = np.unique(keys, return_index=True)
+    first_rows = np.sort(first_rows)
+
+    def decode(indices, dictionary):
+        indices = pa.array(indices[first_rows], mask=indices[first_rows] < 0)
+        return dictionary.take(indices)
+
+    pairs = pa.table({PAIR_COLUMNS[0]: decode(code_indices, code_dictionary),
+                      PAIR_COLUMNS[1]: decode(name_indices, name_dictionary)}).to_pandas()
+    pairs["row"] = first_rows
+
+    return pairs
+
+
+def get_code_name_conflicts(pairs):
+    """
+    Returns the rows of the unique crop code - crop name combinations whose crop code has more than one crop name,
+    sorted by the crop code.
+    """
+    names_per_code = pairs.groupby(PAIR_COLUMNS[0])[PAIR_COLUMNS[1]].nunique().reset_index()
+    conflict_codes = names_per_code[names_per_code[PAIR_COLUMNS[1]] > 1][PAIR_COLUMNS[0]].copy()
+    conflicts = pairs[pairs[PAIR_COLUMNS[0]].isin(conflict_codes)].copy()
+    conflicts.sort_values(by=PAIR_COLUMNS[0], inplace=True)
+
+    return conflicts
+
+
+def check_dataframe(df):
+    """
+    Validity check of a harmonized table that is already in memory.
+
+    :return: Tuple of the number of rows without HCAT class, the crops without HCAT class (unique crop code - crop
+        name combinations) and the crop codes with more than one crop name (see get_code_name_conflicts).
+    """
+    df_na = df.loc[df[HCAT_COLUMN].isna()]
+    missed = df_na.drop_duplicates(subset=PAIR_COLUMNS)[PAIR_COLUMNS].copy()
+    conflicts = get_code_name_conflicts(df.drop_duplicates(subset=PAIR_COLUMNS).copy())
+
+    return len(df_na), missed, conflicts
+
+
+def check_parquet(path, columns):
+    """
+    Validity check of a harmonized (geo)parquet file (see check_dataframe) that only reads what it needs:
+    files whose row group statistics have no missing HCAT class are not searched for missed crops, the crop code
+    and crop name are compared as dictionary indices and the other columns are only read for conflicting rows.
+
+    :param path: Path to the file.
+    :param columns: Columns of the file that are written to the conflict table.
+    """
+    num_na = get_null_count(path, HCAT_COLUMN)
+    if num_na == 0:
+        missed = pd.DataFrame(columns=PAIR_COLUMNS)
+    else:
+        missed = get_unique_pairs(path, filters=pc.field(HCAT_COLUMN).is_null())[PAIR_COLUMNS]
+        if num_na is None:
+            num_na = pq.read_table(path, columns=[HCAT_COLUMN], filters=pc.field(HCAT_COLUMN).is_null()).num_rows
+
+    conflicts = get_code_name_conflicts(get_unique_pairs(path))
+    other_columns = [col for col in columns if col not in PAIR_COLUMNS]
+    if len(conflicts) > 0 and other_columns:
+        others = pq.read_table(path, columns=other_columns).take(conflicts["row"].to_numpy()).to_pandas()
+        others.index = conflicts.index
+        conflicts = pd.concat([conflicts, others], axis=1)
+    conflicts = conflicts[[col for col in columns if col in conflicts.columns]]
+
+    return num_na, missed, conflicts
+
+
+def check_file(path):
+    """
+    Runs the validity check on a harmonized file. Geoparquet files are checked with check_parquet, csv tables are
+    read (only the columns of stage_columns.STAGE_COLUMNS) and checked with check_dataframe.
+
+    :return: See check_dataframe.
+    """
+    columns = stage_columns.get_stage_columns("c4_run_validity_check", path)
+    if os.path.splitext(path)[1].lower() in geodata_reader.PARQUET_EXTENSIONS:
+        return check_parquet(path, columns)
+
+    df = geodata_reader.read_geodata(path, columns=columns, read_geometry=False)
+    return check_dataframe(df)
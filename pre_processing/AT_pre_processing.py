@@ -7,9 +7,9 @@ import os
 from os.path import dirname, abspath
 import time
 import pandas as pd
-import geopandas as gpd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -78,8 +78,8 @@ def main():
         out_pth = os.path.join("data", "vector", "IACS", "AT", f"invekos_a{year}_sl_anonym_prepared.geoparquet")
 
         print("Reading input", corr_pth, incorr_pth)
-        iacs_corr = gpd.read_file(corr_pth)
-        iacs_inc = gpd.read_file(incorr_pth)
+        iacs_corr = geodata_reader.read_geodata(corr_pth)
+        iacs_inc = geodata_reader.read_geodata(incorr_pth)
 
         iacs = correct_crop_names(
             iacs_corr=iacs_corr,
@@ -108,7 +108,7 @@ def main():
         out_pth = os.path.join("data", "vector", "IACS", "AT", f"invekos_a{year}_sl_anonym_prepared.geoparquet")
 
         print("Reading input", iacs_pth)
-        iacs = gpd.read_file(iacs_pth)
+        iacs = geodata_reader.read_geodata(iacs_pth)
 
         iacs = add_organic_information(
             iacs=iacs,
@@ -130,7 +130,7 @@ def main():
                                f"INSPIRE_SCHLAEGE{year}-2_POLYGON_prepared.geoparquet")
 
         print("Reading input", iacs_pth)
-        iacs = gpd.read_file(iacs_pth)
+        iacs = geodata_reader.read_geodata(iacs_pth)
         iacs = helper_functions.drop_non_geometries_and_add_unique_fid(
             iacs=iacs
         )
@@ -143,7 +143,7 @@ def main():
     iacs_pth = os.path.join("data", "vector", "IACS", "AT", "Original", f"INSPIRE_SCHLAEGE_{year}-1_POLYGON.gpkg")
     out_pth = os.path.join("data", "vector", "IACS", "AT", f"INSPIRE_SCHLAEGE{year}-1_POLYGON_prepared.geoparquet")
     print("Reading input", iacs_pth)
-    iacs = gpd.read_file(iacs_pth)
+    iacs = geodata_reader.read_geodata(iacs_pth)
     iacs = helper_functions.drop_non_geometries_and_add_unique_fid(
         iacs=iacs
     )
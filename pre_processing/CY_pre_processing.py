@@ -6,9 +6,9 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -31,7 +31,7 @@ def main():
         out_pth = os.path.join("data", "vector", "IACS", "CY", f"GSA-CY-{year}.geoparquet")
 
         print("Reading input", iacs_pth)
-        iacs = gpd.read_file(iacs_pth)
+        iacs = geodata_reader.read_geodata(iacs_pth)
         id_col = "PLOT_NAME"
 
         ## Run this to get a feeling for the duplicate IDs
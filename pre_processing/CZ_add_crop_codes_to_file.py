@@ -10,11 +10,11 @@ project_root = dirname(script_dir)
 sys.path.append(project_root)
 
 import time
-import geopandas as gpd
 import pandas as pd
 import glob
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -48,7 +48,7 @@ def add_crops_clean_data_and_separate_parcels_within_field_blocks(in_dir, out_di
 
         print("Reading input")
         df = pd.read_excel(df_pth)
-        gdf = gpd.read_file(file, columns=gdf_cols)
+        gdf = geodata_reader.read_geodata(file, columns=gdf_cols)
 
         in_len = len(gdf)
         if int(year) < 2023:
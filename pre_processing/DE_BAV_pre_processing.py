@@ -10,7 +10,6 @@ import os
 from os.path import dirname, abspath
 import time
 import pandas as pd
-import geopandas as gpd
 from osgeo import gdal
 import sys
 script_dir = dirname(abspath(__file__))
@@ -20,6 +19,8 @@ sys.path.append(project_root)
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -45,7 +46,7 @@ def main():
         out_dir = os.path.join("data", "vector", "IACS", "DE", "BAV")
         id_col = "fid"
 
-        iacs = gpd.read_parquet(in_gdf_pth)
+        iacs = geodata_reader.read_geodata(in_gdf_pth)
         df_cr = pd.read_csv(in_cr_pth)
 
         in_len = len(iacs)
@@ -82,7 +83,7 @@ def main():
         print("Check if vector and accompanying file add up:", len(df_out) + len(gdf_out), out_len)
 
         ## Drop entries that have duplicate geometries
-        gdf_out["geom_id"] = gdf_out.geometry.to_wkb()
+        gdf_out["geom_id"] = geometry_dedup.get_geometry_ids(gdf_out.geometry)
         dups = gdf_out[gdf_out.duplicated("geom_id", "first")].copy()
         if len(dups) > 0:
             gdf_out.drop_duplicates(subset="geom_id", inplace=True)
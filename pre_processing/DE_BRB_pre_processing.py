@@ -9,7 +9,6 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 from osgeo import gdal
 import sys
 script_dir = dirname(abspath(__file__))
@@ -19,6 +18,8 @@ sys.path.append(project_root)
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -41,7 +42,7 @@ def main():
         out_pth = os.path.join("data", "vector", "IACS", "DE", "BRB", f"IACS_BB_{year}.geoparquet")
         id_col = "FLIK_SC"
 
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
 
         if year in [2017, 2018]:
             gdf.loc[gdf["PARZ_NR"].isna(), "PARZ_NR"] = 0
@@ -56,7 +57,7 @@ def main():
 
         in_len = len(gdf)
 
-        gdf["geom_id"] = gdf.geometry.to_wkb()
+        gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
         dups = gdf[gdf.duplicated("geom_id", "first")].copy()
         if len(dups) > 0:
             gdf.drop_duplicates(subset="geom_id", inplace=True)
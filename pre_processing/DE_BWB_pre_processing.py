@@ -9,13 +9,14 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 from osgeo import gdal
 import pandas as pd
 
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -25,8 +26,8 @@ os.chdir(WD)
 
 def count_duplicate_geometries(in_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -34,7 +35,7 @@ def count_duplicate_geometries(in_pth):
 
 
 def count_duplicate_geometries_v2(gdf):
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -45,8 +46,8 @@ def count_duplicate_geometries_v2(gdf):
 
 def extract_geometry_duplicates(in_pth, out_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -60,7 +61,7 @@ def extract_geometry_duplicates(in_pth, out_pth):
 def remove_geometry_duplicates(gdf):
 
     in_len = len(gdf)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     gdf.drop_duplicates(subset="geom_id", inplace=True)
     out_len = len(gdf)
@@ -190,7 +191,7 @@ def main():
         out_pth = os.path.join("data", "vector", "IACS", "DE", "BWB", "Original", f"DUPS-layer_bw_{year}.gpkg")
         # extract_geometry_duplicates(in_pth, out_pth)
 
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
         gdf = helper_functions.drop_non_geometries(gdf)
         gdf = remove_geometry_duplicates(gdf)
         gdf.drop_duplicates(subset="geo_id", inplace=True)
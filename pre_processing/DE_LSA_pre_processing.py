@@ -14,6 +14,8 @@ import pandas as pd
 import geopandas as gpd
 from osgeo import gdal
 
+from my_utils import geodata_reader
+
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
@@ -34,9 +36,9 @@ def prep_data(schlaege_csv_pth, schlaege_vec_pth, code_pth, land_ele_pth, out_pt
 
     # Open Data
     df_s = pd.read_csv(schlaege_csv_pth, sep=";", encoding="ISO-8859-1")
-    gdf_s = gpd.read_file(schlaege_vec_pth)
+    gdf_s = geodata_reader.read_geodata(schlaege_vec_pth)
     df_c = pd.read_excel(code_pth, sheet_name=str(year))
-    gdf_le = gpd.read_file(land_ele_pth)
+    gdf_le = geodata_reader.read_geodata(land_ele_pth)
 
     cols = list(df_s.columns)
     cols = [col.strip() for col in cols]
@@ -829,11 +831,11 @@ def main():
     # if len(gdf_out) == num_s:
     #     gdf_out.to_parquet(out_pth)
 
-    adm = gpd.read_file(r"data\vector\administrative\LSA_Bremen_Hamburg.gpkg")
+    adm = geodata_reader.read_geodata(r"data\vector\administrative\LSA_Bremen_Hamburg.gpkg")
 
     for year in range(2015, 2018): # the other don't need this cleaning
         pth = rf"Q:\Europe-LAND\data\vector\IACS\DE\LSA\prepared_data\Schlaege+LSE_{year}.geoparquet"
-        gdf = gpd.read_parquet(pth)
+        gdf = geodata_reader.read_geodata(pth)
         gdf_c = gdf.copy()
         gdf_c["geometry"] = gdf_c["geometry"].centroid
         adm = adm.to_crs(gdf_c.crs)
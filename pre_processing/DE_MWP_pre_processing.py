@@ -9,11 +9,17 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 from osgeo import gdal
+import sys
+script_dir = dirname(abspath(__file__))
+project_root = dirname(script_dir)
+sys.path.append(project_root)
 
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
+
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -24,8 +30,8 @@ os.chdir(WD)
 
 def count_duplicate_geometries(in_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -35,9 +41,9 @@ def count_duplicate_geometries(in_pth):
 def create_unique_id(in_pth):
     root, ext = os.path.splitext(in_pth)
     if ext in ['.gpkg', '.gdb', '.shp', '.geojson']:
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
     elif ext in ['.geoparquet']:
-        gdf = gpd.read_parquet(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
 
     gdf["uni_id"] = gdf["flik_flek"] + '_' + gdf["fl_kenng"].astype(str)
 
@@ -59,10 +65,10 @@ def create_unique_id(in_pth):
 def separate_subparcels_in_data():
     #### 2015
     print(2015)
-    gdf1 = gpd.read_file(r"data\vector\IACS\DE\MWP\TI_Original\layer_mv_2015.gpkg")
+    gdf1 = geodata_reader.read_geodata(r"data\vector\IACS\DE\MWP\TI_Original\layer_mv_2015.gpkg")
 
     ## Create a unique ID based on geometries
-    gdf1["geom_id"] = gdf1.geometry.to_wkb()
+    gdf1["geom_id"] = geometry_dedup.get_geometry_ids(gdf1.geometry)
 
     ## Drop all duplicates that have the same geometry, the same land use and the same reported area.
     gdf1.drop_duplicates(subset=["geom_id", "nutz_le_code_meldg", "fl_ha_meldg"], inplace=True)
@@ -106,10 +112,10 @@ def separate_subparcels_in_data():
 
     #### 2014
     print(2014)
-    gdf1 = gpd.read_file(r"data\vector\IACS\DE\MWP\TI_Original\layer_mv_2014.gpkg")
+    gdf1 = geodata_reader.read_geodata(r"data\vector\IACS\DE\MWP\TI_Original\layer_mv_2014.gpkg")
 
     ## Create a unique ID based on geometries
-    gdf1["geom_id"] = gdf1.geometry.to_wkb()
+    gdf1["geom_id"] = geometry_dedup.get_geometry_ids(gdf1.geometry)
 
     ## Drop all duplicates that have the same geometry, the same land use and the same reported area.
     gdf1.drop_duplicates(subset=["geom_id", "nutz_le_code_meldg", "fl_ha_meldg"], inplace=True)
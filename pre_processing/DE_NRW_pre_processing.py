@@ -16,6 +16,8 @@ import pandas as pd
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -26,8 +28,8 @@ os.chdir(WD)
 
 def count_duplicate_geometries(in_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -35,7 +37,7 @@ def count_duplicate_geometries(in_pth):
 
 
 def count_duplicate_geometries_v2(gdf):
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -46,8 +48,8 @@ def count_duplicate_geometries_v2(gdf):
 
 def extract_geometry_duplicates(in_pth, out_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -60,7 +62,7 @@ def extract_geometry_duplicates(in_pth, out_pth):
 def remove_geometry_duplicates(gdf):
 
     in_len = len(gdf)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     gdf.drop_duplicates(subset="geom_id", inplace=True)
     out_len = len(gdf)
@@ -88,7 +90,7 @@ def create_unique_id(gdf):
 
 def separate_subparcels_and_add_unique_id(gdf):
     ## Create a unique ID based on geometries
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     ## Create a unique ID that later can be used to link geometries with additional crops
     uni_ids = {gid: i for i, gid in enumerate(gdf["geom_id"].unique())}
@@ -132,7 +134,7 @@ def separate_subparcels_and_add_unique_id(gdf):
 def separate_file_by_years(in_pth, year_col, out_folder):
 
     print(f"Read {in_pth}")
-    gdf = gpd.read_file(in_pth)
+    gdf = geodata_reader.read_geodata(in_pth)
 
     uni_years = gdf[year_col].unique()
 
@@ -231,7 +233,7 @@ def main():
     #     out_pth = os.path.join("data", "vector", "IACS", "DE", "NRW", "Original", f"DUPS-layer_nw_{year}.gpkg")
     #     extract_geometry_duplicates(in_pth, out_pth)
 
-    adm = gpd.read_file(os.path.join("data", "vector", "administrative", "NRW.gpkg"))
+    adm = geodata_reader.read_geodata(os.path.join("data", "vector", "administrative", "NRW.gpkg"))
 
     ## Actual pre-processing
     # for year in range(2010, 2016):
@@ -257,7 +259,7 @@ def main():
         print(year)
         in_pth = os.path.join("data", "vector", "IACS", "DE", "NRW", "Original", f"layer_nw_{year}.gpkg")
         out_pth = os.path.join("data", "vector", "IACS", "DE", "NRW", f"layer_nw_{year}.geoparquet")
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
         # gdf = helper_functions.drop_non_geometries(gdf)
         # count_duplicate_geometries_v2(gdf=gdf)
 
@@ -9,13 +9,14 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 from osgeo import gdal
 import pandas as pd
 
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -26,8 +27,8 @@ os.chdir(WD)
 
 def count_duplicate_geometries(in_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -35,7 +36,7 @@ def count_duplicate_geometries(in_pth):
 
 
 def count_duplicate_geometries_v2(gdf):
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -46,8 +47,8 @@ def count_duplicate_geometries_v2(gdf):
 
 def extract_geometry_duplicates(in_pth, out_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -61,7 +62,7 @@ def extract_geometry_duplicates(in_pth, out_pth):
 def remove_geometry_duplicates(gdf):
 
     in_len = len(gdf)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     gdf.drop_duplicates(subset="geom_id", inplace=True)
     out_len = len(gdf)
@@ -90,7 +91,7 @@ def create_unique_id(gdf):
 
 def separate_subparcels_and_add_unique_id(gdf):
     ## Create a unique ID based on geometries
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     ## Create a simple unique ID that later can be used to link geometries with additional crops
     ## Use the running count for all unique geometries. Later on, each unique geometry should get a unique ID
@@ -212,7 +213,7 @@ def main():
         else:
             in_pth = os.path.join("data", "vector", "IACS", "DE", "SAA", "Original", f"layer_sl_{year}.gpkg")
         out_pth = os.path.join("data", "vector", "IACS", "DE", "SAA", f"layer_sl_{year}.geoparquet")
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
 
         if year in [2014]:
             gdf.loc[gdf["fl_kenng"].isna(), "fl_kenng"] = "0"
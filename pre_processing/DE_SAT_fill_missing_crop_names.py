@@ -1,13 +1,14 @@
-import geopandas as gpd
 import shutil
 import os
 import glob
 
+from my_utils import geodata_reader
+
 in_pth = r"Q:\Europe-LAND\data\vector\IACS\DE\SAT\Flächennutzung_Antrag\Antraege2013.shp"
 prep_pth = r"Q:\Europe-LAND\data\vector\IACS\DE\SAT\Flächennutzung_Antrag\Antraege2013_prep.gpkg"
 copy_to_pth = r"Q:\Europe-LAND\data\vector\IACS\DE\SAT\Referenz"
 
-gdf = gpd.read_file(in_pth)
+gdf = geodata_reader.read_geodata(in_pth)
 print(len(gdf))
 code_to_name = gdf.dropna(subset=["NU_CODE"]).drop_duplicates(subset=["NU_CODE"]).set_index("NU_CODE")["NU_BEZ"]
 gdf["NU_BEZ"] = gdf["NU_CODE"].map(code_to_name).fillna(gdf["NU_BEZ"])
@@ -9,13 +9,14 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 from osgeo import gdal
 import pandas as pd
 
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -26,8 +27,8 @@ os.chdir(WD)
 
 def count_duplicate_geometries(in_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -35,7 +36,7 @@ def count_duplicate_geometries(in_pth):
 
 
 def count_duplicate_geometries_v2(gdf):
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -46,8 +47,8 @@ def count_duplicate_geometries_v2(gdf):
 
 def extract_geometry_duplicates(in_pth, out_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -61,7 +62,7 @@ def extract_geometry_duplicates(in_pth, out_pth):
 def remove_geometry_duplicates(gdf):
 
     in_len = len(gdf)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     gdf.drop_duplicates(subset="geom_id", inplace=True)
     out_len = len(gdf)
@@ -321,7 +322,7 @@ def main():
         out_folder = os.path.join("data", "vector", "IACS", "DE", "SAT")
 
         ## Open files
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
 
         flik_col = col_dict[year]["flik_col"]
         fl_kenng = col_dict[year]["fl_kenng"]
@@ -342,7 +343,7 @@ def main():
 
         ## Add landscape elements to vector files
         if col_dict[year]["le_exist"]:
-            gdf_le = gpd.read_file(in_le_pth)
+            gdf_le = geodata_reader.read_geodata(in_le_pth)
 
             flek_col = col_dict[year]["flek_col"]
             le_bez_col = col_dict[year]["le_bez_col"]
@@ -17,6 +17,8 @@ import glob
 gdal.SetConfigOption("OGR_GEOMETRY_ACCEPT_UNCLOSED_RING", "NO")
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -27,8 +29,8 @@ os.chdir(WD)
 
 def count_duplicate_geometries(in_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -36,7 +38,7 @@ def count_duplicate_geometries(in_pth):
 
 
 def count_duplicate_geometries_v2(gdf):
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -47,8 +49,8 @@ def count_duplicate_geometries_v2(gdf):
 
 def extract_geometry_duplicates(in_pth, out_pth):
 
-    gdf = gpd.read_file(in_pth)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf = geodata_reader.read_geodata(in_pth)
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     dups = gdf[gdf.duplicated("geom_id", "first")].copy()
 
@@ -62,7 +64,7 @@ def extract_geometry_duplicates(in_pth, out_pth):
 def remove_geometry_duplicates(gdf):
 
     in_len = len(gdf)
-    gdf["geom_id"] = gdf.geometry.to_wkb()
+    gdf["geom_id"] = geometry_dedup.get_geometry_ids(gdf.geometry)
 
     gdf.drop_duplicates(subset="geom_id", inplace=True)
     out_len = len(gdf)
@@ -204,7 +206,7 @@ def main():
     in_dir = os.path.join("data", "vector", "IACS", "DE", "THU", "Original", "Shapes")
     iacs_files = glob.glob(os.path.join(in_dir, "*BDF_HN*.shp")) + glob.glob(os.path.join(in_dir, "layer_th*.gpkg"))
 
-    adm = gpd.read_file(os.path.join("data", "vector", "administrative", "THU.gpkg"))
+    adm = geodata_reader.read_geodata(os.path.join("data", "vector", "administrative", "THU.gpkg"))
 
     for i, in_pth in enumerate(iacs_files):
 
@@ -228,7 +230,7 @@ def main():
         out_folder = os.path.join("data", "vector", "IACS", "DE", "THU")
 
         ## Open files
-        gdf = gpd.read_file(in_pth)
+        gdf = geodata_reader.read_geodata(in_pth)
         gdf[farm_id_col] = gdf[farm_id_col].astype(str)
 
         if year in ["2015", "2016", "2017", "2018", "2019"]:
@@ -11,7 +11,9 @@ from os.path import dirname, abspath
 import time
 import glob
 import pandas as pd
-import geopandas as gpd
+
+from my_utils import geodata_reader
+
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -24,7 +26,7 @@ def list_crop_names(folder, country_code):
     print(country_code)
 
     lst = glob.glob(os.path.join(folder, "*.gpkg"))
-    dfs = [gpd.read_file(pth) for pth in lst]
+    dfs = [geodata_reader.read_geodata(pth) for pth in lst]
 
     print(len(dfs))
 
@@ -44,7 +46,7 @@ def list_crop_names_thu(folder, country_code):
     print(country_code)
 
     lst = glob.glob(os.path.join(folder, "*.shp"))
-    dfs = [gpd.read_file(pth) for pth in lst]
+    dfs = [geodata_reader.read_geodata(pth) for pth in lst]
 
     print(len(dfs))
 
@@ -10,9 +10,9 @@ import os
 from os.path import dirname, abspath
 import time
 import pandas as pd
-import geopandas as gpd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -55,7 +55,7 @@ def main():
 
         print(f"{i + 1}/{len(iacs_files)} - Processing - {in_pth}")
 
-        iacs = gpd.read_file(in_pth)
+        iacs = geodata_reader.read_geodata(in_pth)
 
         ## Create field_id
         if year < 2012:
@@ -105,7 +105,7 @@ def main():
             org_col = "OML"
 
             print("Reading organic", year)
-            gdf_organic = gpd.read_file(pth)
+            gdf_organic = geodata_reader.read_geodata(pth)
 
             ## This would be the merging by the spatial join, however this produces some duplicated
             # centr_org = gdf_organic.copy()
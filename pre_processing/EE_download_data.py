@@ -4,6 +4,7 @@ import requests
 import geopandas as gpd
 import geojson
 from my_utils import helper_functions
+from my_utils import geodata_reader
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -44,6 +45,6 @@ for i, in_pth in enumerate(iacs_files):
     out_pth = os.path.join("data", "vector", "IACS", "EE", "Original", f"DUPS-layer_ee_{year}.gpkg")
     # helper_functions.extract_geometry_duplicates(in_pth, out_pth)
 
-    gdf = gpd.read_file(in_pth)
+    gdf = geodata_reader.read_geodata(in_pth)
     gdf = helper_functions.drop_non_geometries(gdf)
     gdf = helper_functions.remove_geometry_duplicates(gdf)
\ No newline at end of file
@@ -13,9 +13,10 @@ import glob
 import pandas as pd
 import math
 import geopandas as gpd
-from osgeo import ogr
+from osgeo import ogr, gdal
 
 from my_utils import helper_functions
+from my_utils import encoding_detection
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -70,12 +71,10 @@ def separate_unique_crop_code_from_file(in_dir, region_id, col_translate_pth, ou
     # ToDo: It seems that I created an endless loop here. It works, but it should stop after the first round of corrections of files
     for path in iacs_files:
         year = helper_functions.get_year_from_path(path)
+        ## The encoding is passed as open option instead of setting SHAPE_ENCODING in os.environ
+        file_encoding = None
         if file_year_encoding:
-            if year in file_year_encoding:
-                year_encoding = file_year_encoding[year]
-                os.environ['SHAPE_ENCODING'] = year_encoding
-            else:
-                os.environ['SHAPE_ENCODING'] = encoding
+            file_encoding = encoding_detection.get_file_encoding(path, encoding, file_year_encoding, year=year)
 
         print(f"Processing: {year} - {path}")
 
@@ -87,8 +86,9 @@ def separate_unique_crop_code_from_file(in_dir, region_id, col_translate_pth, ou
             ".gpkg": "GPKG",
             ".shp": "ESRI Shapefile"
         }
-        driver = ogr.GetDriverByName(driver_dict[file_extension])
-        ds = driver.Open(path, 0)
+        open_options = [f"ENCODING={file_encoding}"] if file_encoding and file_extension == ".shp" else []
+        ds = gdal.OpenEx(path, gdal.OF_VECTOR, allowed_drivers=[driver_dict[file_extension]],
+                         open_options=open_options)
         lyr = ds.GetLayer(0)
         col_year = f"{region_id}_{year}"
         col_dict = dict(zip(tr_df["column_name"], tr_df[col_year]))
@@ -5,10 +5,11 @@ import glob
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 import pandas as pd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
+from my_utils import geometry_repair
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -66,10 +67,9 @@ def combine_subdistricts(in_dir, crop_names_pth, district, year, out_dir):
         if int(file_year) != int(year):
             continue
 
-        fields = gpd.read_file(pth, layer="linea_declaracion")
+        fields = geodata_reader.read_geodata(pth, layer="linea_declaracion")
         file = pd.merge(fields, crops, how="left", left_on="parc_producto", right_on="codigo")
-        file['geometry'] = file['geometry'].buffer(0)
-        file['geometry'] = file.normalize()
+        file['geometry'] = geometry_repair.repair_geometries(file['geometry'])
         file.drop_duplicates(subset="geometry", inplace=True)
         file_list.append(file)
 
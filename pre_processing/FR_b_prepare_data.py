@@ -15,6 +15,7 @@ import geopandas as gpd
 import glob
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -117,8 +118,8 @@ def main():
     #         os.rename(csv_pth, new_csv_path)
 
     #### 2024
-    gsa = gpd.read_file(os.path.join("data", "vector", "IACS", "FR", "FR", "2024", "Original", "RPG_Parcelles.gpkg"))
-    bio = gpd.read_file(os.path.join("data", "vector", "IACS", "FR", "FR", "2024", "Original", "RPG_BIO.gpkg"))
+    gsa = geodata_reader.read_geodata(os.path.join("data", "vector", "IACS", "FR", "FR", "2024", "Original", "RPG_Parcelles.gpkg"))
+    bio = geodata_reader.read_geodata(os.path.join("data", "vector", "IACS", "FR", "FR", "2024", "Original", "RPG_BIO.gpkg"))
 
     gsa["temp_id"] = range(len(gsa))
     bio["organic"] = 1
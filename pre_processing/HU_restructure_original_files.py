@@ -9,6 +9,7 @@ import geopandas as gpd
 import pandas as pd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -27,8 +28,8 @@ def restructure_data():
         pth2 = fr"Q:\Europe-LAND\data\vector\IACS\HU_temp\{year}\ige_blokk_metszet_{year}_2.shp"
 
         print("Reading input", year)
-        gdf1 = gpd.read_file(pth1)
-        gdf2 = gpd.read_file(pth2)
+        gdf1 = geodata_reader.read_geodata(pth1)
+        gdf2 = geodata_reader.read_geodata(pth2)
 
         block_col = "blosz"
 
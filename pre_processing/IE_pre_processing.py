@@ -4,12 +4,14 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 import pandas as pd
 import shutil
 import glob
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
+from my_utils import geometry_repair
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -36,7 +38,7 @@ def combine_provinces(in_dir, year, out_dir):
         return
 
     print("Reading data")
-    file_list = [gpd.read_file(pth) for i, pth in enumerate(iacs_files)]
+    file_list = [geodata_reader.read_geodata(pth) for i, pth in enumerate(iacs_files)]
 
     print("Combining.")
     out_file = pd.concat(file_list)
@@ -47,12 +49,12 @@ def combine_provinces(in_dir, year, out_dir):
     out_file.to_file(out_pth, driver="GPKG")
 
 def separate_fields(in_pth, reported_area_col, gdf_out_pth, csv_out_pth):
-    gdf1 = gpd.read_file(in_pth)
+    gdf1 = geodata_reader.read_geodata(in_pth)
 
     gdf1 = helper_functions.drop_non_geometries(gdf1)
 
     ## Create a unique ID based on geometries
-    gdf1["geom_id"] = gdf1.geometry.to_wkb()
+    gdf1["geom_id"] = geometry_dedup.get_geometry_ids(gdf1.geometry)
 
     ## Create a unique ID that later can be used to link geometries with additional crops
     uni_ids = {gid: i for i, gid in enumerate(gdf1["geom_id"].unique())}
@@ -80,8 +82,7 @@ def separate_fields(in_pth, reported_area_col, gdf_out_pth, csv_out_pth):
     df_others.sort_values(by="uni_id", inplace=True)
     df_others["uni_id"] = df_others["uni_id"].map(id_dict)
 
-    gdf_unique['geometry'] = gdf_unique['geometry'].buffer(0)
-    gdf_unique['geometry'] = gdf_unique.normalize()
+    gdf_unique['geometry'] = geometry_repair.repair_geometries(gdf_unique['geometry'])
 
     # gdf_others.drop(columns="uni_id", inplace=True)
     # gdf_unique.drop(columns="uni_id", inplace=True)
@@ -4,11 +4,13 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 import pandas as pd
 import glob
 
 from my_utils import helper_functions
+from my_utils import geometry_dedup
+from my_utils import geodata_reader
+from my_utils import geometry_repair
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -38,7 +40,7 @@ def combine_provinces(in_dir, region, year, out_dir):
         return
 
     print("Reading data")
-    file_list = [gpd.read_file(pth) for i, pth in enumerate(iacs_files)]
+    file_list = [geodata_reader.read_geodata(pth) for i, pth in enumerate(iacs_files)]
 
     print("Combining.")
     out_file = pd.concat(file_list)
@@ -56,7 +58,7 @@ def separate_fields(gdf1, gdf_out_pth, csv_out_pth, reported_area_col=None, fiel
     gdf1 = helper_functions.drop_non_geometries(gdf1)
 
     # Create a unique ID based on geometries
-    gdf1["geom_id"] = gdf1.geometry.to_wkb()
+    gdf1["geom_id"] = geometry_dedup.get_geometry_ids(gdf1.geometry)
 
     # Create a unique ID to link geometries with additional crops
     uni_ids = {gid: i for i, gid in enumerate(gdf1["geom_id"].unique())}
@@ -97,8 +99,7 @@ def separate_fields(gdf1, gdf_out_pth, csv_out_pth, reported_area_col=None, fiel
     df_others = gdf1.loc[~mask_kept].drop(columns=["geom_id", "geometry"]).copy()
     df_others[field_id_col] = df_others["uni_id"].map(id_dict)
 
-    gdf_unique["geometry"] = gdf_unique["geometry"].buffer(0)
-    gdf_unique["geometry"] = gdf_unique.normalize()
+    gdf_unique["geometry"] = geometry_repair.repair_geometries(gdf_unique["geometry"])
 
     print("Number Unique IDs:", gdf_unique["uni_id"].nunique())
     print("Number Parcels:", len(gdf_unique))
@@ -212,7 +213,7 @@ def main():
         gdf_out_pth = os.path.join(out_dir, f"GSA-{year}.geoparquet")
         csv_out_pth = os.path.join(out_dir, f"GSA-{year}.csv")
 
-        gdf1 = gpd.read_file(in_pth)
+        gdf1 = geodata_reader.read_geodata(in_pth)
 
         separate_fields(gdf1=gdf1, reported_area_col=None, gdf_out_pth=gdf_out_pth, csv_out_pth=csv_out_pth,
                         field_id_col="objectid")
@@ -5,10 +5,10 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 import glob
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -25,7 +25,7 @@ def add_organic_information():
         org_col = "BIOLOGISCHEPRODUCTIEWIJZE"
 
         print("Reading input", year)
-        gdf = gpd.read_file(pth)
+        gdf = geodata_reader.read_geodata(pth)
 
         gdf["organic"] = 0
         gdf.loc[gdf[org_col] == "01", "organic"] = 1
@@ -9,9 +9,9 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 import glob
 
 
@@ -43,7 +43,7 @@ def main():
     #     helper_functions.extract_geometry_duplicates(in_pth, out_pth)
 
     pth = os.path.join("data", "vector", "IACS", "PL", "Original", "GSAA_Poland_2024.shp")
-    iacs = gpd.read_file(pth)
+    iacs = geodata_reader.read_geodata(pth)
 
     ## Get unique names
     uni_crops = iacs[["crop"]].drop_duplicates()
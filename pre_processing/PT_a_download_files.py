@@ -9,12 +9,13 @@ WD = dirname(dirname(dirname(abspath(__file__))))
 os.chdir(WD)
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
 
 # ## Portugal
 def download_pt_parcelas():
     url = "https://www.ifap.pt/isip/ows/isip.data/wms"
 
-    grid = gpd.read_file(os.path.join("data", "vector", "IACS", "PT", "download_grid2_4326.gpkg"))
+    grid = geodata_reader.read_geodata(os.path.join("data", "vector", "IACS", "PT", "download_grid2_4326.gpkg"))
 
     for year in range(2025, 2026):
         print(year)
@@ -65,7 +66,7 @@ def download_pt_parcelas():
 def download_pt_ocupacoes_solo():
     url = "https://www.ifap.pt/isip/ows/isip.data/wms"
 
-    grid = gpd.read_file(os.path.join("data", "vector", "IACS", "PT", "download_grid2_4326.gpkg"))
+    grid = geodata_reader.read_geodata(os.path.join("data", "vector", "IACS", "PT", "download_grid2_4326.gpkg"))
 
     for year in range(2025, 2026):
         print(year)
@@ -116,7 +117,7 @@ def download_pt_ocupacoes_solo():
 def download_pt_culturas():
     url = "https://www.ifap.pt/isip/ows/isip.data/wms"
 
-    grid = gpd.read_file(os.path.join("data", "vector", "IACS", "PT", "download_grid2_4326.gpkg"))
+    grid = geodata_reader.read_geodata(os.path.join("data", "vector", "IACS", "PT", "download_grid2_4326.gpkg"))
 
     for year in range(2025, 2026):
         print(year)
@@ -11,10 +11,11 @@ import os
 from os.path import dirname, abspath
 import time
 import pandas as pd
-import geopandas as gpd
 import glob
 
 from my_utils import helper_functions
+from my_utils import geodata_reader
+from my_utils import geometry_repair
 
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
@@ -42,15 +43,15 @@ def combine_information_from_wfs(year):
             parc_pth = os.path.join("data", "vector", "IACS", "PT", "PT_temp", "parcelas", str(year), f"parcelas_sub{sub}_{year}.gpkg")
             ocup_pth = os.path.join("data", "vector", "IACS", "PT", "PT_temp", "ocupacoes_solo", str(year), f"ocupacoes_solo_sub{sub}_{year}.gpkg")
             cult_pth = os.path.join("data", "vector", "IACS", "PT", "PT_temp", "culturas", str(year), f"culturas_sub{sub}_{year}.gpkg")
-            ocup = gpd.read_file(ocup_pth)
+            ocup = geodata_reader.read_geodata(ocup_pth)
 
             if not os.path.exists(parc_pth):
                 continue
             elif not os.path.exists(cult_pth):
                 continue
 
-            cult = gpd.read_file(cult_pth)
-            parc = gpd.read_file(parc_pth)
+            cult = geodata_reader.read_geodata(cult_pth)
+            parc = geodata_reader.read_geodata(parc_pth)
 
             ## derive crop df
             cult = cult.drop_duplicates(subset=["PUN_CUL_COD", "PUN_CUL_DESC"])
@@ -84,8 +85,7 @@ def combine_information_from_wfs(year):
 
             first_entries = first_entries[['OSA_ID', 'PAR_ID', 'ENT_ID', 'PUN_CUL', 'PUN_CUL_DESC', 'geometry']]
             # first_entries['geometry'] = first_entries['geometry'].apply(make_valid)
-            first_entries['geometry'] = first_entries['geometry'].buffer(0)
-            first_entries['geometry'] = first_entries.normalize()
+            first_entries['geometry'] = geometry_repair.repair_geometries(first_entries['geometry'])
             remaining_entries = remaining_entries[['OSA_ID', 'PAR_ID', 'ENT_ID', 'PUN_CUL',  'PUN_CUL_DESC',
                                                    'crop_number']]
 
@@ -117,15 +117,15 @@ def combine_information_from_wfs(year):
             parc_pth = os.path.join("data", "vector", "IACS", "PT", "PT_temp", "parcelas", str(year), f"parcelas_sub{sub}_{year}.gpkg")
             ocup_pth = os.path.join("data", "vector", "IACS", "PT", "PT_temp", "ocupacoes_solo", str(year), f"ocupacoes_solo_sub{sub}_{year}.gpkg")
             cult_pth = os.path.join("data", "vector", "IACS", "PT", "PT_temp", "culturas", str(year), f"culturas_sub{sub}_{year}.gpkg")
-            cult = gpd.read_file(cult_pth)
+            cult = geodata_reader.read_geodata(cult_pth)
 
             if not os.path.exists(parc_pth):
                 continue
             elif not os.path.exists(ocup_pth):
                 continue
 
-            ocup = gpd.read_file(ocup_pth)
-            parc = gpd.read_file(parc_pth)
+            ocup = geodata_reader.read_geodata(ocup_pth)
+            parc = geodata_reader.read_geodata(parc_pth)
 
             ## Combine ocupacoes solo with parcelas
             ocup = pd.merge(ocup[["OSA_ID", "PAR_ID", "geometry"]], parc[["PAR_ID", "ENT_ID"]], "left",
@@ -135,8 +135,7 @@ def combine_information_from_wfs(year):
                               ocup[["OSA_ID", "PAR_ID", "ENT_ID"]], "left", "OSA_ID")
 
             # fields['geometry'] = fields['geometry'].apply(make_valid)
-            fields['geometry'] = fields['geometry'].buffer(0)
-            fields['geometry'] = fields.normalize()
+            fields['geometry'] = geometry_repair.repair_geometries(fields['geometry'])
 
             fields_lst.append(fields)
 
@@ -291,7 +290,7 @@ def main():
                 print("Multiple crop columns provided. Separating them into csv.")
                 ## Create separated file
                 ## Open file and layer
-                gdf = gpd.read_parquet(path)
+                gdf = geodata_reader.read_geodata(path)
                 cols = list(gdf.columns)
                 cols_csv = []
 
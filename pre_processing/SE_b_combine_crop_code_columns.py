@@ -5,10 +5,11 @@
 import os
 from os.path import dirname, abspath
 import time
-import geopandas as gpd
 import pandas as pd
 import glob
 
+from my_utils import geodata_reader
+
 # ------------------------------------------ USER VARIABLES ------------------------------------------------#
 # Get parent directory of current directory where script is located
 WD = dirname(dirname(dirname(abspath(__file__))))
@@ -81,7 +82,7 @@ def combine_crop_codes_and_add_organic_information():
         df_org = pd.concat(list_of_dfs, ignore_index=True)
         df_org["organic_applied"] = df_org["Organic applied?"].map({"Y": 1, "N": 0})
 
-        gdf = gpd.read_file(pth)
+        gdf = geodata_reader.read_geodata(pth)
         gdf["individid"] = gdf[blockid] + gdf[skiftesbok]
 
         print("Adding organic information")
@@ -132,7 +133,7 @@ def create_applicant_id():
         kund_lan = year_dict[year]["kund_lan"]
         kund_lopnr = year_dict[year]["kund_lopnr"]
 
-        gdf = gpd.read_file(pth)
+        gdf = geodata_reader.read_geodata(pth)
         gdf["kundnummer"] = gdf[kund_lan].astype(str) + gdf[kund_lopnr].astype(str)
 
         gdf.to_parquet(os.path.splitext(pth)[0] + ".geoparquet")
@@ -166,7 +167,7 @@ def combine_crop_codes_in_public_data(min_year, max_year):
         main_crop_id = year_dict[year]["main_crop_id"]
         sub_crop_id = year_dict[year]["sub_crop_id"]
 
-        gdf = gpd.read_file(pth)
+        gdf = geodata_reader.read_geodata(pth)
         gdf["individid"] = gdf[blockid] + gdf[skiftesbok]
 
         print("Combining crop codes and assigning crop names")
@@ -0,0 +1,41 @@
+import os
+from os.path import dirname, abspath
+import sys
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+project_root = dirname(dirname(abspath(__file__)))
+sys.path.append(project_root)
+import d4_export_partitioned_dataset as d4
+
+
+def test_integer_codes_with_missing_values_are_written_without_decimals():
+    ## c3 keeps the dtype of the input, so integer codes with missing values arrive as floats
+    gdf = gpd.GeoDataFrame({"crop_code": [115.0, np.nan, 602.0], "field_id": [1.0, 2.0, np.nan],
+                            "EC_hcat_c": [3301011101.0, np.nan, 3301030100.0], "crop_name": ["a", None, "c"],
+                            "share": [0.5, 1.0, np.nan]},
+                           geometry=shapely.points([0, 1, 2], [0, 1, 2]), crs=3035)
+
+    gdf = d4.to_canonical_schema(gdf)
+
+    assert gdf["crop_code"].tolist() == ["115", pd.NA, "602"]
+    assert gdf["field_id"].tolist() == ["1", "2", pd.NA]
+    assert gdf["EC_hcat_c"].tolist() == [3301011101, pd.NA, 3301030100]
+    assert gdf["crop_name"].tolist() == ["a", pd.NA, "c"]
+    ## Columns with decimals keep them
+    assert gdf["share"].tolist() == ["0.5", "1.0", pd.NA]
+
+
+def test_codes_are_equal_across_partitions(tmp_path):
+    in_folder = tmp_path / "in"
+    for region, codes in [("DE_BRB", [115.0, np.nan]), ("DE_BAV", [115, 602])]:
+        gdf = gpd.GeoDataFrame({"crop_code": codes}, geometry=shapely.points([0, 1], [0, 1]), crs=3035)
+        os.makedirs(in_folder / "DE", exist_ok=True)
+        gdf.to_parquet(in_folder / "DE" / f"GSA-{region}-2021.geoparquet")
+
+    d4.export_partitioned_dataset(str(in_folder), str(tmp_path / "out"))
+    df = d4.read_partitioned_dataset(str(tmp_path / "out"))
+
+    assert sorted(df.loc[df["crop_code"] == "115", "region"]) == ["DE_BAV", "DE_BRB"]